@@ -4,6 +4,10 @@ import time
 import streamlit as st
 from datetime import datetime
 
+from lead_model import project_lead
+from provider_urls import base_url
+import http_metrics
+
 class AirtableManager:
     # Maps internal profile keys -> Airtable column names for individual fields
     # These columns should exist in the "Users" table in Airtable
@@ -65,7 +69,11 @@ class AirtableManager:
 
     def setup_from_secrets(self):
         """Attempts to load configuration from st.secrets."""
-        if "airtable" in st.secrets:
+        try:
+            has_config = "airtable" in st.secrets
+        except Exception:
+            has_config = False  # No secrets.toml (scripts, benchmarks)
+        if has_config:
             self.api_key = st.secrets["airtable"].get("api_key")
             self.base_id = st.secrets["airtable"].get("base_id")
             self.table_name = st.secrets["airtable"].get("table_name", "Leads")
@@ -82,7 +90,7 @@ class AirtableManager:
 
     def _get_url(self, table_name=None):
         t_name = table_name if table_name else self.table_name
-        return f"https://api.airtable.com/v0/{self.base_id}/{t_name}"
+        return f"{base_url('airtable')}/v0/{self.base_id}/{t_name}"
 
     def _request_with_retry(self, method, url, **kwargs):
         """
@@ -92,7 +100,8 @@ class AirtableManager:
         last_error = None
         for attempt in range(1, self.MAX_RETRIES + 1):
             try:
-                response = method(url, **kwargs)
+                with http_metrics.attempt(attempt):
+                    response = method(url, **kwargs)
 
                 # Rate limit (429) — wait and retry
                 if response.status_code == 429:
@@ -247,18 +256,19 @@ class AirtableManager:
             
         return None
 
-    def save_user_profile(self, email, name, profile_data):
+    def save_user_profile(self, email, name, profile_data, record_id=None):
         """
         Create or Update user in 'Users' table.
         Saves individual columns + Profile JSON backup.
         Includes retry logic and read-back verification.
+        record_id: known Airtable Record ID for this email (skips the lookup).
         Returns (success: bool, error_message: str or None)
         """
         if not self.is_configured():
             return False, "Airtable not configured"
         
         # Check existence
-        existing = self.get_user_by_email(email)
+        existing = {"id": record_id} if record_id else self.get_user_by_email(email)
         
         # Build fields with individual columns + JSON backup
         fields = self._build_profile_fields(email, name, profile_data)
@@ -322,109 +332,143 @@ class AirtableManager:
             return True  # Don't fail the save if verification itself errors
 
 
-    def get_leads(self, user_email):
+    def get_leads(self, user_email, fields=None):
         """
         Fetch all leads for a specific user email.
         Uses filterByFormula to isolate user data.
+        fields: optional list of app-level keys (e.g. ["Business Name", "Status"]);
+        only those columns are requested via fields[] and returned.
+        Notes JSON is decoded lazily on first access.
         """
-        if not self.is_configured():
+        try:
+            return [lead for page in self.iter_lead_pages(user_email, fields) for lead in page]
+        except Exception as e:
+            # st.error(f"Airtable Fetch Error: {e}")
+            print(f"Airtable Error: {e}")
             return []
 
+    def iter_lead_pages(self, user_email, fields=None, page_size=100):
+        """
+        Streams the user's leads one API page (up to 100 records) at a time.
+        Yields lists of leads (same shape as get_leads); raises on request errors.
+        """
+        if not self.is_configured():
+            return
+
         # Formula: case-insensitive match with whitespace trimming
         # Note: We must use the mapped AIRTABLE column name here
         at_col = self.FIELD_MAP["User Email"]
         safe_email = user_email.strip()
         filter_formula = f"LOWER(TRIM({{{at_col}}})) = LOWER('{safe_email}')"
         params = {
-            "filterByFormula": filter_formula
+            "filterByFormula": filter_formula,
+            "pageSize": min(page_size, 100),
         }
+        if fields is not None:
+            params["fields[]"] = self._external_fields(fields)
 
-        all_records = []
         offset = None
-
-        try:
-            while True:
-                if offset:
-                    params["offset"] = offset
-                
-                response = requests.get(self._get_url(), headers=self.headers, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                all_records.extend(data.get("records", []))
-                
-                offset = data.get("offset")
-                if not offset:
-                    break
+        while True:
+            if offset:
+                params["offset"] = offset
+            
+            response = requests.get(self._get_url(), headers=self.headers, params=params)
+            response.raise_for_status()
+            data = response.json()
             
             # Convert Airtable records to App format
-            leads = []
-            for r in all_records:
-                fields = r.get("fields", {})
-                
-                # Helper to get field via Lowercase key
-                def get_f(internal_key, default=""):
-                    external_key = self.FIELD_MAP.get(internal_key, internal_key)
-                    return fields.get(external_key, default)
-
-                # Parse Notes
-                notes_raw = get_f("Notes JSON", "{}")
-                try:
-                    notes = json.loads(notes_raw)
-                except:
-                    notes = {"raw": notes_raw} # Fallback if not JSON
-                if not isinstance(notes, dict): notes = {}
-
-                leads.append({
-                    "id": r.get("id"), # Use Airtable Record ID
-                    "Business Name": get_f("Business Name"),
-                    "Sector": get_f("Sector"),
-                    "Address": get_f("Address"),
-                    "Website": get_f("Website"),
-                    "Status": get_f("Status", "Pipeline"),
-                    "Contact Name": get_f("Contact Name"),
-                    "Last Contact": get_f("Last Contact", "Never"),
-                    "Next Action": get_f("Next Action"),
-                    "Notes": notes,
-                    "Value": get_f("Value", 0)
-                })
-            return leads
+            yield [self._record_to_lead(r, fields) for r in data.get("records", [])]
+            
+            offset = data.get("offset")
+            if not offset:
+                break
 
+    def get_lead(self, record_id, user_email=None):
+        """
+        Fetch a single lead by Record ID (one GET, no table scan).
+        Returns None if the record doesn't exist, belongs to someone other
+        than user_email (when given), or the request fails.
+        """
+        if not self.is_configured() or not record_id:
+            return None
+
+        try:
+            response = self._request_with_retry(requests.get, f"{self._get_url()}/{record_id}", headers=self.headers)
+            record = response.json()
+            if user_email is not None:
+                owner = record.get("fields", {}).get(self.FIELD_MAP["User Email"], "")
+                if str(owner).strip().lower() != user_email.strip().lower():
+                    return None
+            return self._record_to_lead(record)
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                print(f"Airtable Error: {e}")
+            return None
         except Exception as e:
-            # st.error(f"Airtable Fetch Error: {e}")
             print(f"Airtable Error: {e}")
-            return []
+            return None
+
+    def _external_fields(self, fields):
+        """Maps app-level lead keys to Airtable column names for fields[]."""
+        columns = []
+        for key in fields:
+            internal_key = "Notes JSON" if key == "Notes" else key
+            if internal_key in self.FIELD_MAP:
+                columns.append(self.FIELD_MAP[internal_key])
+        return columns
+
+    def _record_to_lead(self, record, fields=None):
+        """Converts one Airtable record into an app lead (Notes parsed lazily)."""
+        rec_fields = record.get("fields", {})
+
+        # Helper to get field via Lowercase key
+        def get_f(internal_key, default=""):
+            external_key = self.FIELD_MAP.get(internal_key, internal_key)
+            return rec_fields.get(external_key, default)
+
+        values = {
+            "Business Name": get_f("Business Name"),
+            "Sector": get_f("Sector"),
+            "Address": get_f("Address"),
+            "Website": get_f("Website"),
+            "Status": get_f("Status", "Pipeline"),
+            "Contact Name": get_f("Contact Name"),
+            "Last Contact": get_f("Last Contact", "Never"),
+            "Next Action": get_f("Next Action"),
+            "Value": get_f("Value", 0)
+        }
+        # Use Airtable Record ID
+        return project_lead(record.get("id"), values, fields, get_f("Notes JSON", "{}"), keep_raw=True)
 
-    def add_lead(self, user_email, lead_data):
+    def find_lead(self, user_email, business_name):
         """
-        Adds a new lead for the user.
-        Checks for duplicates by business name before creating.
+        Returns the user's lead record with this business name ({"id", "createdTime", ...}), or None.
+        Raises on request errors so callers can decide whether to proceed.
         """
-        if not self.is_configured():
-            return False
-
-        # --- DUPLICATE CHECK ---
-        biz_name = lead_data.get("Business Name", "")
-        if biz_name:
-            at_email_col = self.FIELD_MAP.get("User Email", "user email")
-            at_biz_col = self.FIELD_MAP.get("Business Name", "business name")
-            safe_email = user_email.strip()
-            filter_formula = f"AND(LOWER(TRIM({{{at_email_col}}})) = LOWER('{safe_email}'), LOWER(TRIM({{{at_biz_col}}})) = LOWER('{biz_name}'))"
-            try:
-                response = requests.get(
-                    self._get_url(),
-                    headers=self.headers,
-                    params={"filterByFormula": filter_formula, "maxRecords": 1}
-                )
-                response.raise_for_status()
-                existing = response.json().get("records", [])
-                if existing:
-                    # Already exists — return False (duplicate)
-                    return False
-            except Exception as e:
-                # If the check fails, log but continue with the add
-                print(f"Airtable duplicate check warning: {e}")
+        at_email_col = self.FIELD_MAP.get("User Email", "user email")
+        at_biz_col = self.FIELD_MAP.get("Business Name", "business name")
+        safe_email = user_email.strip()
+        safe_name = business_name.strip().replace("\\", "\\\\").replace("'", "\\'")
+        filter_formula = f"AND(LOWER(TRIM({{{at_email_col}}})) = LOWER('{safe_email}'), LOWER(TRIM({{{at_biz_col}}})) = LOWER('{safe_name}'))"
+        response = requests.get(
+            self._get_url(),
+            headers=self.headers,
+            params={"filterByFormula": filter_formula, "maxRecords": 1, "fields[]": [at_biz_col]}
+        )
+        response.raise_for_status()
+        existing = response.json().get("records", [])
+        return existing[0] if existing else None
+
+    def find_lead_id(self, user_email, business_name):
+        """
+        Returns the Record ID of the user's lead with this business name, or None.
+        Raises on request errors so callers can decide whether to proceed.
+        """
+        record = self.find_lead(user_email, business_name)
+        return record.get("id") if record else None
 
+    def _lead_fields(self, user_email, lead_data):
+        """Airtable fields for a new lead (mapped names, Notes serialized)."""
         # Validate Last Contact (Airtable DATE field cannot take "Never")
         lc = lead_data.get("Last Contact", "")
         if lc in ["Never", ""]:
@@ -464,6 +508,29 @@ class AirtableManager:
             # Skip None values — Airtable date fields reject null
             if app_key in self.FIELD_MAP and val is not None:
                  fields[self.FIELD_MAP[app_key]] = val
+        return fields
+
+    def add_lead(self, user_email, lead_data, check_duplicate=True):
+        """
+        Adds a new lead for the user.
+        Checks for duplicates by business name before creating
+        (skip with check_duplicate=False when the caller already did).
+        """
+        if not self.is_configured():
+            return False
+
+        # --- DUPLICATE CHECK ---
+        biz_name = lead_data.get("Business Name", "")
+        if biz_name and check_duplicate:
+            try:
+                if self.find_lead_id(user_email, biz_name):
+                    # Already exists — return False (duplicate)
+                    return False
+            except Exception as e:
+                # If the check fails, log but continue with the add
+                print(f"Airtable duplicate check warning: {e}")
+
+        fields = self._lead_fields(user_email, lead_data)
 
         payload = {
             "records": [
@@ -487,6 +554,30 @@ class AirtableManager:
             print(f"Airtable Add Error: {e}")
             return False
 
+    def add_leads_bulk(self, user_email, leads_list, progress=None):
+        """
+        Creates several leads, one POST per 10 records (Airtable's batch limit).
+        No duplicate check — callers dedupe first (see lead_import.py).
+        progress: optional callback(added, total)
+        Returns (number added, error message or None); stops at the first failed batch.
+        """
+        if not self.is_configured():
+            return 0, "Airtable not configured"
+
+        added = 0
+        for i in range(0, len(leads_list), 10):
+            records = [{"fields": self._lead_fields(user_email, lead)} for lead in leads_list[i:i + 10]]
+            try:
+                self._request_with_retry(requests.post, self._get_url(), headers=self.headers,
+                                         json={"records": records})
+            except Exception as e:
+                print(f"Airtable Bulk Add Error: {e}")
+                return added, f"Failed to create records after {added} of {len(leads_list)} leads: {e}"
+            added += len(records)
+            if progress:
+                progress(added, len(leads_list))
+        return added, None
+
     def update_lead_status(self, lead_id, new_status, next_date=None):
         """
         Updates the status and optionally next action date.
@@ -582,6 +673,37 @@ class AirtableManager:
             print(f"Airtable Value Update Error: {e}")
             return False 
 
+    def update_leads(self, changes):
+        """
+        Applies several field changes in as few requests as possible.
+        changes: {record_id: {app_key: value}} — e.g. {"Status": "Active", "Notes": {...}}.
+        Sends one PATCH per 10 records (Airtable's batch limit).
+        """
+        if not self.is_configured(): return False
+
+        records = []
+        for lead_id, lead_fields in changes.items():
+            fields = {}
+            for key, val in lead_fields.items():
+                internal_key = "Notes JSON" if key == "Notes" else key
+                if internal_key not in self.FIELD_MAP:
+                    continue
+                if key == "Notes" and not isinstance(val, str):
+                    val = json.dumps(val)
+                fields[self.FIELD_MAP[internal_key]] = val
+            if fields:
+                records.append({"id": lead_id, "fields": fields})
+
+        ok = True
+        for i in range(0, len(records), 10):
+            payload = {"records": records[i:i + 10]}
+            try:
+                self._request_with_retry(requests.patch, self._get_url(), headers=self.headers, json=payload)
+            except Exception as e:
+                print(f"Airtable Batch Update Error: {e}")
+                ok = False
+        return ok
+
     def delete_lead(self, lead_id):
         """
         Deletes a record.
@@ -603,5 +725,44 @@ class AirtableManager:
             print(f"Airtable Delete Error: {e}")
             return False
 
+    def delete_leads(self, lead_ids):
+        """
+        Deletes several records, 10 per request (Airtable's batch limit).
+        Returns True only if every request succeeded.
+        """
+        if not self.is_configured():
+            return False
+
+        ok = True
+        for i in range(0, len(lead_ids), 10):
+            params = [("records[]", rid) for rid in lead_ids[i:i + 10]]
+            try:
+                self._request_with_retry(requests.delete, self._get_url(), headers=self.headers, params=params)
+            except Exception as e:
+                print(f"Airtable Batch Delete Error: {e}")
+                ok = False
+        return ok
+
+    def get_modified_since(self, record_times):
+        """
+        Conflict check for queued writes.
+        record_times: {record_id: ISO-8601 UTC timestamp}.
+        Returns the set of record IDs whose LAST_MODIFIED_TIME() is after the
+        given timestamp (no extra column needed in the base).
+        """
+        if not self.is_configured() or not record_times:
+            return set()
+
+        clauses = [
+            f"AND(RECORD_ID() = '{rid}', IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{ts}')))"
+            for rid, ts in record_times.items()
+        ]
+        params = {
+            "filterByFormula": f"OR({', '.join(clauses)})",
+            "fields[]": [self.FIELD_MAP["Status"]],
+        }
+        response = self._request_with_retry(requests.get, self._get_url(), headers=self.headers, params=params)
+        return {r.get("id") for r in response.json().get("records", [])}
+
 # Singleton
 airtable_manager = AirtableManager()
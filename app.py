@@ -1,22 +1,45 @@
 import streamlit as st
 import pandas as pd
 import time
+import functools
 import random
+import uuid
 from datetime import datetime, timedelta
 import urllib.parse
+import io
+import tempfile
 import db_manager as db
-import facebook_finder as fb_finder
 import json
-from search_service import mock_search_places, search_google_places, search_google_legacy_nearby, search_outscraper
 from sheets_manager import sheet_manager
 from airtable_manager import airtable_manager
-from enrichment_service import search_apollo_people, search_outscraper_contacts, extract_domain, find_linkedin_company_page, search_companies_house, scrape_website_social_links
-from streamlit_calendar import calendar
+# search_service, enrichment_service and streamlit_calendar are imported by the
+# tabs that use them, so a cold start only loads what the first screen needs
+# (python bench_startup.py checks this)
+from dashboard_analytics import get_lead_analytics
+from template_engine import MailMerge, build_email, write_eml_zip, write_mbox
+from reply_triage import classify_reply, read_replies, triage, apply_triage
+from lead_import import CsvLeadImport
+from survey_ingest import SurveyExport, load_export
+from search_results import SearchResults
+import doc_index
+import lead_export
+import http_metrics
+
+_APP_RUN_STARTED = time.perf_counter()
 
 # --- CONFIGURATION ---
 # Last System Update: Force Reload
 st.set_page_config(page_title="Sponsor Finder V2.5", page_icon="🏍️", layout="wide")
 
+# Outbound API calls made during this run are tagged with the session and the
+# interaction (see http_metrics); add ?metrics=1 to the URL to see them.
+if "trace_session" not in st.session_state:
+    st.session_state.trace_session = uuid.uuid4().hex[:8]
+st.session_state.trace_runs = st.session_state.get("trace_runs", 0) + 1
+http_metrics.set_context(session=st.session_state.trace_session, user="",
+                         interaction=f"app #{st.session_state.trace_runs}")
+_IN_FULL_RUN = True  # cleared once the tab has run, so later fragment reruns count as their own interactions
+
 # Initialize DB
 db.init_db()
 
@@ -309,55 +332,8 @@ Many [Sector] companies find we offer a unique way to stand out compared to stan
 }
 
 def handle_objection(reply_text):
-    reply_lower = reply_text.lower()
-    
-    # 1. Ready to book / strong positive — they want to proceed
-    book_phrases = ["let's do it", "let's go", "book a call", "book a chat", "set up a call",
-                    "arrange a call", "schedule a call", "when are you free", "when can we",
-                    "let's set something up", "put something in the diary", "get something booked",
-                    "happy to jump on a call", "i'm in", "count me in", "let's talk"]
-    if any(phrase in reply_lower for phrase in book_phrases):
-        return "book a call"
-    
-    # 2. Check negative intent BEFORE warm interest (avoid "interested" matching "not interested")
-    if "not interested" in reply_lower or "no thanks" in reply_lower or "no thank you" in reply_lower:
-        return "not interested"
-    
-    # 3. Warm interest — positive but not yet committed to a call
-    warm_phrases = ["sounds good", "sounds great", "sounds interesting", "that sounds",
-                    "yes", "yeah", "yep", "sure", "absolutely", "definitely",
-                    "i'd be open", "open to", "i'm open", "why not", "go on",
-                    "interested", "love to", "would love", "i'd love",
-                    "sounds like a plan", "i like the sound", "great idea",
-                    "brilliant", "awesome", "amazing", "perfect",
-                    "thanks for reaching out", "glad you reached out",
-                    "could work", "might work", "worth a chat", "worth exploring"]
-    if any(phrase in reply_lower for phrase in warm_phrases):
-        return "warm interest"
-    
-    # 4. Tell me more — curious but needs info before committing
-    info_phrases = ["tell me more", "more info", "more details", "more information",
-                    "what does it involve", "what's involved", "what would it look like",
-                    "how does it work", "how would it work", "what do you offer",
-                    "what are the options", "what packages", "what do partners get",
-                    "can you explain", "walk me through", "what exactly",
-                    "what would we get", "what's included", "what kind of"]
-    if any(phrase in reply_lower for phrase in info_phrases):
-        return "tell me more"
-    
-    # 5. Check for Price/Cost questions (strong buying signal)
-    if "how much" in reply_lower or "price" in reply_lower or ("cost" in reply_lower and "expensive" not in reply_lower):
-        return "how much"
-        
-    # 6. Standard Objections
-    elif "email" in reply_lower or "send info" in reply_lower:
-        return "send email"
-    elif "budget" in reply_lower or "expensive" in reply_lower or "cost" in reply_lower:
-        return "budget"
-    elif "busy" in reply_lower or "later" in reply_lower or "not a good time" in reply_lower or "bad time" in reply_lower:
-        return "call me later"
-    else:
-        return "fallback"
+    """Intent key for a pasted reply (matches OBJECTION_SCRIPTS, or "fallback")."""
+    return classify_reply(reply_text)
 
 @st.dialog("Are You Sure?")
 def delete_confirmation_dialog(lid, business_name):
@@ -378,12 +354,7 @@ def delete_confirmation_dialog(lid, business_name):
 def calendar_contact_card(lead_id):
     """Opens a contact card with the current message stage, reply handler, and profile URL."""
     # Load lead data
-    leads = db.get_leads(st.session_state.user_id)
-    lead = None
-    for l in leads:
-        if l['id'] == lead_id:
-            lead = l
-            break
+    lead = db.get_lead(lead_id, st.session_state.user_id)
     
     if not lead:
         st.error("Contact not found.")
@@ -568,9 +539,10 @@ def calendar_contact_card(lead_id):
     with adv_cols[3]:
         if current_pipeline < 3:
             if st.button("🏆 Secured", key=f"card_to_sec_{lead_id}", type="primary", use_container_width=True):
-                db.update_lead_status(lead_id, "Secured")
-                if lead.get('Value', 0):
-                    db.update_lead_value(lead_id, lead['Value'])
+                with db.LeadUpdates() as batch:
+                    batch.set_status(lead_id, "Secured")
+                    if lead.get('Value', 0):
+                        batch.set_value(lead_id, lead['Value'])
                 st.toast("🏆 SPONSOR SECURED!")
                 st.balloons()
                 time.sleep(1)
@@ -597,10 +569,11 @@ def calendar_contact_card(lead_id):
             
             if st.button("✅ Confirm — Book Discovery Call", key=f"disc_confirm_{lead_id}", type="primary"):
                 call_date_str = disc_date.strftime("%Y-%m-%d")
-                db.update_lead_status(lead_id, "Call Booked", call_date_str)
                 lead_notes['call_time'] = disc_time.strftime("%H:%M")
                 lead_notes['call_date'] = call_date_str
-                db.update_lead_notes(lead_id, lead_notes)
+                with db.LeadUpdates() as batch:
+                    batch.set_status(lead_id, "Call Booked", call_date_str)
+                    batch.set_notes(lead_id, lead_notes)
                 st.toast(f"📞 Call booked: {call_date_str} at {disc_time.strftime('%H:%M')}")
                 st.session_state.pop(f"show_disc_picker_{lead_id}", None)
                 time.sleep(0.5)
@@ -673,16 +646,17 @@ def calendar_contact_card(lead_id):
             if st.button("✅ Sent & Scheduled", type="primary", key=f"card_sent_{lead_id}"):
                 st.balloons()
                 
-                # Update status
-                db.update_lead_status(lead_id, "Active", final_date)
-                
                 # Update notes with step + salutation + URL
                 lead_notes['outreach_step'] = current_step_idx
                 lead_notes['last_template'] = current_template
                 lead_notes['salutation'] = salutation
                 if contact_url:
                     lead_notes['contact_url'] = contact_url
-                db.update_lead_notes(lead_id, lead_notes)
+                
+                # Status + notes in one write
+                with db.LeadUpdates() as batch:
+                    batch.set_status(lead_id, "Active", final_date)
+                    batch.set_notes(lead_id, lead_notes)
                 
                 st.success(f"🎉 Done! Next follow-up: {final_date}")
                 time.sleep(2)
@@ -873,51 +847,22 @@ def _get_time_greeting():
 
 def extract_audit_stats(df):
     """
-    Parses the Social Media Audit CSV.
+    Parses the Social Media Audit CSV (first response).
     Returns total followers and platform breakdown string.
+    Whole exports: see survey_ingest.SurveyExport.
     """
     try:
-        # Columns like "What is your current number of followers on Facebook?"
-        # We'll just look for 'followers' in column name and sum the values
-        total = 0
-        breakdown = []
-        
-        # Simple heuristic: find columns with 'number of followers'
-        cols = [c for c in df.columns if "number of followers" in c.lower()]
-        
-        row = df.iloc[0] # Assuming single user response per file or taking first row
-        
-        for c in cols:
-            val_str = str(row[c]).replace(",", "").replace("nan", "0")
-            if val_str.isdigit():
-                val = int(val_str)
-                total += val
-                platform = c.split("on")[-1].replace("?", "").strip()
-                breakdown.append(f"{platform}: {val}")
-        
-        return total, ", ".join(breakdown)
+        return SurveyExport(df).audit_stats(df.index[0])
     except Exception as e:
         return 0, f"Error parsing: {str(e)}"
 
 def extract_product_offers(df):
     """
-    Parses "I'm a Product" CSV.
-    Extracts the key offer points.
+    Parses "I'm a Product" CSV (first response).
+    Returns the top 5 offer points as a string.
     """
     try:
-        # Columns: "List 10 things you can offer..."
-        offer_cols = [c for c in df.columns if "List 10 things" in c]
-        row = df.iloc[0]
-        
-        all_offers = []
-        for c in offer_cols:
-            text = str(row[c])
-            # Just take the first 3 lines/points from each section to avoid huge prompts
-            lines = text.split(".")[:3] 
-            all_offers.extend([l.strip() for l in lines if len(l) > 5])
-            
-        return "; ".join(all_offers[:5]) # Return top 5 offers as a string
-        
+        return SurveyExport(df).product_offers(df.index[0])
     except Exception as e:
         return ""
 
@@ -990,82 +935,83 @@ def _format_contact_name(full_name, template_type, salutation="Mr"):
         # LinkedIn messages and follow-ups: first name only
         return first_name
 
-def generate_message(template_type, business_name, rider_name, sector, context_answers=None, town="MyTown", championship="Championship", extra_context={}, contact_name="", salutation="Mr"):
-    template = TEMPLATES.get(template_type, "")
-    hook = get_sector_hook(sector)
-    
-    # Format contact name based on message type (formal vs first-name)
-    formatted_name = _format_contact_name(contact_name, template_type, salutation)
-    
-    # Rider name: full name for intro, first name only after that
-    rider_first = rider_name.split()[0] if rider_name else rider_name
-    
-    msg = template.replace("[Business Name]", business_name)\
-                  .replace("[Sector]", sector)\
-                  .replace("[Town]", town)\
-                  .replace("[Championship Name]", championship)\
-                  .replace("[Sector Hook]", hook)\
-                  .replace("[Contact Name/Business Name]", formatted_name)\
-                  .replace("[Contact Name]", formatted_name)\
-                  .replace("[Current Year]", "2026")\
-                  .replace("Good morning", _get_time_greeting())
-    
-    # Replace first [Rider Name] with full name, rest with first name only
-    if "[Rider Name]" in msg:
-        msg = msg.replace("[Rider Name]", rider_name, 1)  # First occurrence: full name
-        msg = msg.replace("[Rider Name]", rider_first)     # All remaining: first name only
-                  
-    msg = msg.replace("[Season Goal]", extra_context.get("goal", ""))\
-             .replace("[Previous Champ]", extra_context.get("prev_champ", ""))\
-             .replace("[Achievements]", extra_context.get("achievements", ""))\
-             .replace("[Audience Size]", extra_context.get("audience", ""))\
-             .replace("[TV Viewers]", extra_context.get("tv", ""))\
-             .replace("[Team Name]", extra_context.get("team", ""))
-    
+def _sender_values(template_type, rider_name, town, championship, extra_context, context_answers=None):
+    """Slot values shared by every lead a sender writes to."""
+    values = {
+        "Town": town,
+        "Championship Name": championship,
+        "Current Year": "2026",
+        "Greeting": _get_time_greeting(),
+        # Rider name: full name for intro, first name only after that
+        "Rider Name": rider_name,
+        "Rider First": rider_name.split()[0] if rider_name else rider_name,
+        "Season Goal": extra_context.get("goal", ""),
+        "Previous Champ": extra_context.get("prev_champ", ""),
+        "Achievements": extra_context.get("achievements", ""),
+        "Audience Size": extra_context.get("audience", ""),
+        "TV Viewers": extra_context.get("tv", ""),
+        "Team Name": extra_context.get("team", ""),
+    }
     if template_type == "Proposal" and context_answers:
-        msg = msg.replace("[Goal Answer]", context_answers.get("Q1", "growth"))\
-                 .replace("[Audience Answer]", context_answers.get("Q2", "locals"))\
-                 .replace("[Success Answer]", context_answers.get("Q5", "brand awareness"))
-                 
-    
-    # [NEW] Representation/Parent Mode Logic
-    if extra_context.get("rep_mode"):
-        rep_name = extra_context.get("rep_name", "Manager")
-        rep_role = extra_context.get("rep_role", "Manager")
-        
-        # 1. Intro Override (Email)
-        target_intro = f"My name is {rider_name} and I am based in"
-        new_intro = f"My name is {rep_name} and I am the {rep_role} of {rider_name}. We are based in"
-        msg = msg.replace(target_intro, new_intro)
-        
-        # Fallback for other intro patterns
-        target_intro_2 = f"My name is {rider_name}"
-        new_intro_2 = f"My name is {rep_name} and I am the {rep_role} of {rider_name}"
-        msg = msg.replace(target_intro_2, new_intro_2)
-        
+        values.update({
+            "Goal Answer": context_answers.get("Q1", "growth"),
+            "Audience Answer": context_answers.get("Q2", "locals"),
+            "Success Answer": context_answers.get("Q5", "brand awareness"),
+        })
+    return values
+
+def _rep_rewrites(rider_name, extra_context):
+    """(replacements, signature) for Representation/Parent Mode, or ((), None)."""
+    if not extra_context.get("rep_mode"):
+        return (), None
+    rep_name = extra_context.get("rep_name", "Manager")
+    rep_role = extra_context.get("rep_role", "Manager")
+    replacements = [
+        # 1. Intro Override (Email), then the fallback for other intro patterns
+        (f"My name is {rider_name} and I am based in", f"My name is {rep_name} and I am the {rep_role} of {rider_name}. We are based in"),
+        (f"My name is {rider_name}", f"My name is {rep_name} and I am the {rep_role} of {rider_name}"),
         # 2. Activity Pronoun Overrides
-        substitutions = [
-            ("I am racing this season", f"{rider_name} is racing this season"),
-            ("I am racing in", f"{rider_name} is racing in"),
-            ("I am deep into pre-season", f"{rider_name} is deep into pre-season"),
-            ("I compete in the", f"{rider_name} competes in the"),
-            ("I am reaching out to", f"I am reaching out on behalf of {rider_name} to"),
-            ("I have launched", f"{rider_name} has launched"),
-            ("I have 2 partnership spots", f"{rider_name} has 2 partnership spots"),
-            ("I have reached out because I believe", f"I have reached out because we believe"),
-            ("I would rather have one great", f"{rider_name} would rather have one great"),
-            ("my race helmet", f"{rider_name}'s race helmet"),
-            ("expand my network", "expand our network"),
-        ]
-        
-        for old_phrase, new_phrase in substitutions:
-            msg = msg.replace(old_phrase, new_phrase)
-            
-        # 3. Signature Override
-        if msg.strip().endswith(rider_name):
-             msg = rep_name.join(msg.rsplit(rider_name, 1))
+        ("I am racing this season", f"{rider_name} is racing this season"),
+        ("I am racing in", f"{rider_name} is racing in"),
+        ("I am deep into pre-season", f"{rider_name} is deep into pre-season"),
+        ("I compete in the", f"{rider_name} competes in the"),
+        ("I am reaching out to", f"I am reaching out on behalf of {rider_name} to"),
+        ("I have launched", f"{rider_name} has launched"),
+        ("I have 2 partnership spots", f"{rider_name} has 2 partnership spots"),
+        ("I have reached out because I believe", f"I have reached out because we believe"),
+        ("I would rather have one great", f"{rider_name} would rather have one great"),
+        ("my race helmet", f"{rider_name}'s race helmet"),
+        ("expand my network", "expand our network"),
+    ]
+    # 3. Signature Override
+    return replacements, (rider_name, rep_name)
+
+def get_mail_merge(template_type, rider_name, town="MyTown", championship="Championship", extra_context={}, context_answers=None):
+    """
+    Compiled template for one sender. Render leads with
+    merge.render((business_name, sector, contact_name, salutation)) or render_batch([...]).
+    """
+    replacements, signature = _rep_rewrites(rider_name, extra_context)
+
+    def lead_slots(lead):
+        business_name, sector, contact_name, salutation = lead
+        return {
+            "Business Name": business_name,
+            "Sector": sector,
+            "Sector Hook": get_sector_hook(sector),
+            # Format contact name based on message type (formal vs first-name)
+            "Contact Name": _format_contact_name(contact_name, template_type, salutation),
+        }
+
+    return MailMerge(
+        TEMPLATES.get(template_type, ""),
+        _sender_values(template_type, rider_name, town, championship, extra_context, context_answers),
+        replacements, signature, lead_slots=lead_slots, name=template_type,
+    )
 
-    return msg
+def generate_message(template_type, business_name, rider_name, sector, context_answers=None, town="MyTown", championship="Championship", extra_context={}, contact_name="", salutation="Mr"):
+    merge = get_mail_merge(template_type, rider_name, town, championship, extra_context, context_answers)
+    return merge.render((business_name, sector, contact_name, salutation))
 
 # --- UI LAYOUT ---
 
@@ -1229,6 +1175,34 @@ def onboarding_screen(user_data, is_edit_mode=False):
 
     st.divider()
     
+    if is_edit_mode:
+        with st.expander("📋 Survey Responses (Typeform exports)", expanded=False):
+            st.caption("Upload Social Media Audit or \"I'm a Product\" response exports (responses-*.csv). Each file is parsed once; riders are matched by email or name.")
+            survey_files = st.file_uploader("Response exports", type="csv", accept_multiple_files=True, key="survey_files")
+            survey_lookup = st.text_input("Look up a rider (name or email)", key="survey_lookup", placeholder="Leave blank for your own response")
+            for survey_file in survey_files or []:
+                try:
+                    export = load_export(survey_file.getvalue())
+                except Exception as e:
+                    st.error(f"Could not read {survey_file.name}: {e}")
+                    continue
+                st.markdown(f"**{survey_file.name}** — {export.kind.title()} export, {len(export)} responses")
+                if survey_lookup:
+                    row = export.find(name=survey_lookup, email=survey_lookup if "@" in survey_lookup else None)
+                else:
+                    row = export.find(name=raw_name, email=user_data.get('email'))
+                    if row is None and profile.get('first_name'):
+                        row = export.find(name=f"{profile.get('first_name', '')} {profile.get('last_name', '')}")
+                if row is None:
+                    st.info("No matching response in this file.")
+                elif export.kind == "audit":
+                    total, breakdown = export.audit_stats(row)
+                    st.metric(f"Total followers — {export.names[row]}", f"{total:,}")
+                    st.caption(breakdown)
+                elif export.kind == "product":
+                    st.write(f"**Top offers — {export.names[row]}:** {export.product_offers(row)}")
+                st.dataframe(export.summary(), width="stretch", hide_index=True)
+
     st.subheader("6. Database Setup")
     if airtable_manager.is_configured():
          st.success("✅ Central Database Connected")
@@ -1322,6 +1296,7 @@ user_profile = user_data.get('profile', {}) or {}
 st.session_state.user_profile = user_profile
 st.session_state.user_email = user_data.get('email', '')
 st.session_state.user_name = user_data.get('name', '')
+http_metrics.set_context(user=st.session_state.user_email)
 
 # Check Onboarding
 if not user_profile.get("onboarding_complete"):
@@ -1350,7 +1325,7 @@ with st.sidebar:
     st.caption(f"Logged in as: {user_data['email']}")
     if st.button("Logout"):
         st.session_state.user_id = None
-        st.session_state.leads = pd.DataFrame()
+        st.session_state.leads = SearchResults()
         st.rerun()
         
     st.header("👤 Rider Profile")
@@ -1482,6 +1457,30 @@ with st.sidebar:
                          st.toast("Apollo Key Saved!")
 
     
+    # Offline-first writes: show queued changes that haven't reached the cloud yet
+    sync_state = db.outbox_status(st.session_state.user_id)
+    if sync_state["failed"]:
+        st.warning(f"⚠️ {sync_state['failed']} change(s) could not be synced.")
+        if st.button("🔁 Retry Sync", key="retry_sync"):
+            db.retry_failed_writes(st.session_state.user_id)
+            st.rerun()
+    elif sync_state["pending"]:
+        st.caption(f"☁️ Syncing {sync_state['pending']} change(s)...")
+    if sync_state["conflict"]:
+        with st.expander(f"⚠️ {sync_state['conflict']} change(s) conflict with newer edits", expanded=True):
+            st.caption("These leads were changed elsewhere after you edited them. Keep your edit or the newer version?")
+            for conflict in db.outbox_conflicts(st.session_state.user_id):
+                lead = db.get_lead(conflict["lead_id"], st.session_state.user_id) or {}
+                changed = ", ".join(f"{k}: {v if not isinstance(v, dict) else '(notes)'}" for k, v in conflict["fields"].items())
+                st.markdown(f"**{lead.get('Business Name') or conflict['lead_id']}** — {changed}")
+                keep_mine, keep_theirs = st.columns(2)
+                if keep_mine.button("Keep mine", key=f"conflict_mine_{conflict['id']}"):
+                    db.resolve_conflicts([conflict["id"]], keep_local=True)
+                    st.rerun()
+                if keep_theirs.button("Keep newer", key=f"conflict_theirs_{conflict['id']}"):
+                    db.resolve_conflicts([conflict["id"]], keep_local=False)
+                    st.rerun()
+    
     if airtable_manager.is_configured():
         st.success("✅ Connected to Central Database (Airtable)")
     else:
@@ -1564,14 +1563,92 @@ current_tab = st.session_state.current_tab
 
 # STATE MANAGEMENT
 if 'leads' not in st.session_state:
-    st.session_state.leads = pd.DataFrame() # Temporary search results
+    st.session_state.leads = SearchResults() # Temporary search results
 if 'selected_lead_id' not in st.session_state:
     st.session_state.selected_lead_id = None
 
+# --- TAB FRAGMENTS ---
+# Each main tab runs as a Streamlit fragment: a widget interaction inside a tab
+# reruns only that tab, not the login, profile loading, Sheets check and sidebar
+# above. st.rerun() inside a tab still reruns the whole app (tab switches, saves
+# that change the sidebar...). The tabs read the shared context (user_profile,
+# search settings...) from the last full run.
+# Run times land in st.session_state.run_timings; add ?timing=1 to the URL to show them.
+RUN_TIMING_SAMPLES = 50
+
+def _record_run_time(scope, started):
+    timings = st.session_state.setdefault("run_timings", {})
+    samples = timings.setdefault(scope, [])
+    samples.append((time.perf_counter() - started) * 1000)
+    del samples[:-RUN_TIMING_SAMPLES]
+
+def _run_time_caption(scope):
+    timings = st.session_state.get("run_timings", {})
+    parts = []
+    for label, key in (("this tab", scope), ("full app run", "app")):
+        samples = timings.get(key)
+        if samples:
+            parts.append(f"{label}: {samples[-1]:.0f} ms (median {sorted(samples)[len(samples) // 2]:.0f} ms over {len(samples)})")
+    if parts:
+        st.caption("⏱️ " + " · ".join(parts))
+
+def _is_metrics_admin():
+    """Process-wide call metrics are for the emails listed in admin_emails (secrets.toml)."""
+    admins = {str(e).strip().lower() for e in st.secrets.get("admin_emails", [])}
+    return st.session_state.get("user_email", "").strip().lower() in admins
+
+def _outbound_calls_view():
+    """http_metrics for ?metrics=1: this session's own calls; admins also get every endpoint across sessions."""
+    with st.expander("📡 Outbound API calls", expanded=True):
+        session_calls = http_metrics.recent(session=st.session_state.trace_session)
+        interactions = http_metrics.by_interaction(st.session_state.trace_session)
+        if interactions:
+            st.markdown("**This session** (latest interaction first)")
+            st.dataframe(pd.DataFrame([{
+                "Interaction": row["interaction"], "Calls": row["calls"], "Errors": row["errors"],
+                "API time (ms)": round(row["ms"]), "Dominant": row["dominant"],
+                "By provider (ms)": " · ".join(f"{p} {ms:.0f}" for p, ms in row["providers"].items()),
+            } for row in interactions]), width="stretch", hide_index=True)
+            st.download_button("⬇️ This session's calls (.jsonl)", "".join(json.dumps(c) + "\n" for c in session_calls),
+                               file_name="outbound_calls.jsonl", mime="application/x-ndjson")
+        else:
+            st.caption("No outbound calls in this session yet.")
+        if not _is_metrics_admin():
+            return
+        endpoints = http_metrics.snapshot()
+        if endpoints:
+            st.markdown("**All sessions, by endpoint** (admin · slowest total first)")
+            st.dataframe(pd.DataFrame(endpoints).assign(
+                statuses=lambda df: df["statuses"].map(lambda counts: ", ".join(f"{k}×{v}" for k, v in counts.items()))),
+                width="stretch", hide_index=True)
+            st.download_button("⬇️ Metrics (Prometheus text)", http_metrics.prometheus_text(),
+                               file_name="metrics.txt", mime="text/plain")
+
+def tab_fragment(render):
+    """Runs a tab as a fragment (reruns on its own widgets) and times each run."""
+    @st.fragment
+    @functools.wraps(render)
+    def run():
+        started = time.perf_counter()
+        if not _IN_FULL_RUN:
+            st.session_state.trace_runs += 1
+            http_metrics.set_context(session=st.session_state.trace_session, user=st.session_state.user_email,
+                                     interaction=f"{render.__name__} #{st.session_state.trace_runs}")
+        try:
+            render()
+        finally:
+            _record_run_time(render.__name__, started)
+        if st.query_params.get("timing"):
+            _run_time_caption(render.__name__)
+        if st.query_params.get("metrics"):
+            _outbound_calls_view()
+    return run
+
 # TAB 3: DASHBOARD (Active Campaign) - Moved to end
 # TAB 3: DASHBOARD (Active Campaign)
 # TAB 3: DASHBOARD (Active Campaign)
-if current_tab == "📊 Active Campaign":
+@tab_fragment
+def active_campaign_tab():
     st.subheader("Your Active Campaign")
     
     # Load Leads from DB for THIS user
@@ -1583,25 +1660,15 @@ if current_tab == "📊 Active Campaign":
              st.info("Click the 'Search & Add' tab on the left!")
     else:
         # --- SMART DASHBOARD LOGIC ---
-        df_leads = pd.DataFrame(my_leads)
-        
-        # Date Handling
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        df_leads['Next Action'] = pd.to_datetime(df_leads['Next Action'], errors='coerce')
+        # Typed frame, stats and views are rebuilt only when the lead set changes
+        analytics = get_lead_analytics(my_leads, st.session_state)
+        df_leads = analytics.df
         
         # 1. Calculate Stats
-        # Due Today or Overdue
-        due_mask = (df_leads['Next Action'] <= pd.Timestamp.now()) & (df_leads['Status'] != 'Secured') & (df_leads['Status'] != 'Lost')
-        due_leads = df_leads[due_mask]
-        num_due = len(due_leads)
-        
-        num_active = len(df_leads[df_leads['Status'] == 'Active'])
-        num_secured = len(df_leads[df_leads['Status'] == 'Secured'])
-        
-        # Calculate Revenue
-        # Ensure Value col is numeric
-        df_leads['Value'] = pd.to_numeric(df_leads.get('Value', 0), errors='coerce').fillna(0)
-        total_revenue = df_leads[df_leads['Status'] == 'Secured']['Value'].sum()
+        num_due = analytics.num_due
+        num_active = analytics.num_active
+        num_secured = analytics.num_secured
+        total_revenue = analytics.total_revenue
         
         # Display Revenue Top Level
         r1, r2 = st.columns([3, 1])
@@ -1617,8 +1684,7 @@ if current_tab == "📊 Active Campaign":
         f1, f2 = st.columns(2)
         
         # Filter 1: Active Pipeline (Anything NOT Secured or Lost)
-        active_mask = ~df_leads['Status'].isin(['Secured', 'Lost'])
-        count_active = len(df_leads[active_mask])
+        count_active = analytics.count_pipeline
         label_1 = f"🔥 Active Pipeline ({count_active})"
         if f1.button(label_1, type="primary" if st.session_state.dashboard_filter == "Pipeline" else "secondary", use_container_width=True):
              st.session_state.dashboard_filter = "Pipeline"
@@ -1636,15 +1702,8 @@ if current_tab == "📊 Active Campaign":
         
         st.divider()
         
-        # APPLY FILTER
-        df_view = df_leads.copy()
-        if st.session_state.dashboard_filter == "Pipeline":
-             df_view = df_view[active_mask]
-        elif st.session_state.dashboard_filter == "Secured":
-             df_view = df_view[df_leads['Status'] == 'Secured']
-        
-        # Sort by Next Action
-        df_view = df_view.sort_values(by="Next Action")
+        # APPLY FILTER (cached view, sorted by Next Action)
+        df_view = analytics.view(st.session_state.dashboard_filter)
         
         # VIEW TOGGLE
         v_col1, v_col2 = st.columns([1, 4])
@@ -1723,76 +1782,82 @@ if current_tab == "📊 Active Campaign":
             # Statuses that should NOT appear in the calendar (user moved them forward)
             _EXCLUDED_STATUSES = {'Call Booked', 'Discovery Call', 'Proposal', 'Secured', 'Lost', 'Not Interested'}
             
-            events = []
-            for _, row in df_leads.iterrows():
-                if pd.notnull(row['Next Action']):
-                    # Skip leads that have been moved to a future stage
-                    if row['Status'] in _EXCLUDED_STATUSES:
-                        continue
+            # Built once per lead set; filter clicks and view toggles reuse it
+            def _build_calendar_events():
+                events = []
+                for _, row in df_leads.iterrows():
+                    if pd.notnull(row['Next Action']):
+                        # Skip leads that have been moved to a future stage
+                        if row['Status'] in _EXCLUDED_STATUSES:
+                            continue
                     
-                    # Determine next message step from notes
-                    notes = row.get('Notes', {})
-                    if isinstance(notes, str):
+                        # Determine next message step from notes
+                        notes = row.get('Notes', {})
+                        if isinstance(notes, str):
+                            try:
+                                notes = json.loads(notes)
+                            except:
+                                notes = {}
+                        last_step = notes.get('outreach_step', -1) if isinstance(notes, dict) else -1
                         try:
-                            notes = json.loads(notes)
+                            last_step = int(last_step)
                         except:
-                            notes = {}
-                    last_step = notes.get('outreach_step', -1) if isinstance(notes, dict) else -1
-                    try:
-                        last_step = int(last_step)
-                    except:
-                        last_step = -1
-                    next_step = last_step + 1
+                            last_step = -1
+                        next_step = last_step + 1
                     
-                    if next_step < len(_MSG_SEQUENCE):
-                        # Show full step label with day info for stage visibility
-                        step_name = _MSG_SEQUENCE[next_step]
-                        # Extract short label like "LI Msg 2" and day info like "(Day 2)"
-                        day_info = ""
-                        if "(Day" in step_name:
-                            day_info = " " + step_name[step_name.index("("):step_name.index(")")+1]
-                        next_msg_label = step_name.split(":")[0].strip() + day_info
-                    elif last_step >= 0:
-                        next_msg_label = "✅ Sequence Done"
-                    else:
-                        next_msg_label = "Opener"
+                        if next_step < len(_MSG_SEQUENCE):
+                            # Show full step label with day info for stage visibility
+                            step_name = _MSG_SEQUENCE[next_step]
+                            # Extract short label like "LI Msg 2" and day info like "(Day 2)"
+                            day_info = ""
+                            if "(Day" in step_name:
+                                day_info = " " + step_name[step_name.index("("):step_name.index(")")+1]
+                            next_msg_label = step_name.split(":")[0].strip() + day_info
+                        elif last_step >= 0:
+                            next_msg_label = "✅ Sequence Done"
+                        else:
+                            next_msg_label = "Opener"
                     
-                    # Show contact name + company + stage
-                    contact_display = (row.get('Contact Name', '') or '').strip()
-                    company = row['Business Name']
+                        # Show contact name + company + stage
+                        contact_display = (row.get('Contact Name', '') or '').strip()
+                        company = row['Business Name']
                     
-                    # Determine stage label based on status
-                    status = row.get('Status', 'Pipeline')
-                    if status in ('Pipeline', 'Active'):
-                        stage_label = f"Connect: {next_msg_label}"
-                    elif status == 'Call Booked':
-                        stage_label = "Discovery Call"
-                    elif status == 'Proposal':
-                        stage_label = "Proposal"
-                    elif status == 'Secured':
-                        stage_label = "✅ Secured"
-                    else:
-                        stage_label = next_msg_label
+                        # Determine stage label based on status
+                        status = row.get('Status', 'Pipeline')
+                        if status in ('Pipeline', 'Active'):
+                            stage_label = f"Connect: {next_msg_label}"
+                        elif status == 'Call Booked':
+                            stage_label = "Discovery Call"
+                        elif status == 'Proposal':
+                            stage_label = "Proposal"
+                        elif status == 'Secured':
+                            stage_label = "✅ Secured"
+                        else:
+                            stage_label = next_msg_label
                     
-                    if contact_display:
-                        cal_title = f"{contact_display} | {company} | {stage_label}"
-                    else:
-                        cal_title = f"{company} | {stage_label}"
+                        if contact_display:
+                            cal_title = f"{contact_display} | {company} | {stage_label}"
+                        else:
+                            cal_title = f"{company} | {stage_label}"
                     
-                    # Extract contact URL from notes if available
-                    event_notes = row.get('Notes', {})
-                    if isinstance(event_notes, str):
-                        try: event_notes = json.loads(event_notes)
-                        except: event_notes = {}
-                    event_contact_url = event_notes.get('contact_url', '') if isinstance(event_notes, dict) else ''
+                        # Extract contact URL from notes if available
+                        event_notes = row.get('Notes', {})
+                        if isinstance(event_notes, str):
+                            try: event_notes = json.loads(event_notes)
+                            except: event_notes = {}
+                        event_contact_url = event_notes.get('contact_url', '') if isinstance(event_notes, dict) else ''
                     
-                    events.append({
-                        "title": cal_title,
-                        "start": row['Next Action'].strftime("%Y-%m-%d"),
-                        "backgroundColor": get_status_color(row['Status']),
-                        "borderColor": get_status_color(row['Status']),
-                        "extendedProps": {"id": row['id'], "contact_url": event_contact_url, "contact_name": contact_display}
-                    })
+                        events.append({
+                            "title": cal_title,
+                            "start": row['Next Action'].strftime("%Y-%m-%d"),
+                            "backgroundColor": get_status_color(row['Status']),
+                            "borderColor": get_status_color(row['Status']),
+                            "extendedProps": {"id": row['id'], "contact_url": event_contact_url, "contact_name": contact_display}
+                        })
+            
+                return events
+            
+            events = analytics.memo("calendar_events", _build_calendar_events)
             
             calendar_options = {
                 "headerToolbar": {
@@ -1805,6 +1870,7 @@ if current_tab == "📊 Active Campaign":
                 "navLinks": True,
             }
             
+            from streamlit_calendar import calendar
             cal_data = calendar(events=events, options=calendar_options)
             
             if cal_data.get("eventClick"):
@@ -1816,17 +1882,12 @@ if current_tab == "📊 Active Campaign":
         # --- MODE: LIST TABLE (Legacy) ---
         else:
             # Filter by Status (Optional)
-            status_filter = st.multiselect("Filter by Status", df_leads['Status'].unique(), default=df_leads['Status'].unique())
-            if status_filter:
-                df_view = df_leads[df_leads['Status'].isin(status_filter)]
-            else:
-                df_view = df_leads
+            status_filter = st.multiselect("Filter by Status", analytics.status_values, default=analytics.status_values)
+            # Cached view, already sorted by Next Action so urgent stuff is top
+            df_view = analytics.status_view(status_filter)
                 
-            # Format date for display
-            df_view['Next Action'] = df_view['Next Action'].dt.strftime('%Y-%m-%d')
-            
-            # Sort by Next Action so urgent stuff is top
-            df_view = df_view.sort_values(by="Next Action")
+            # Format date for display (on a copy; the view is shared)
+            df_view = df_view.assign(**{"Next Action": df_view['Next Action'].dt.strftime('%Y-%m-%d')})
                 
             st.dataframe(df_view[["Business Name", "Sector", "Status", "Contact Name", "Next Action"]], width="stretch")
             
@@ -1852,10 +1913,41 @@ if current_tab == "📊 Active Campaign":
                 if st.button("❌ Delete"):
                     delete_confirmation_dialog(lid, lead_choice)
 
+        # --- EXPORT ---
+        with st.expander("📤 Export Leads (CSV / Parquet)", expanded=False):
+            st.caption("Streams your leads straight to a file, with contact details from the notes as their own columns. Use Parquet for analysis tools, CSV for spreadsheets or moving to another backend (include Notes JSON).")
+            ex_cols = st.multiselect("Columns", lead_export.ALL_COLUMNS, default=lead_export.DEFAULT_COLUMNS, key="export_cols")
+            xf1, xf2, xf3 = st.columns(3)
+            ex_statuses = xf1.multiselect("Status", analytics.status_values, key="export_statuses", placeholder="All statuses")
+            ex_sectors = xf2.multiselect("Sector", sorted(df_leads["Sector"].dropna().astype(str).unique()), key="export_sectors", placeholder="All sectors")
+            ex_email = xf3.selectbox("Email", ["Any", "With email", "Without email"], key="export_email")
+            ex_format = st.radio("Format", ["CSV", "Parquet"], horizontal=True, key="export_format")
+
+            if ex_cols and st.button("Prepare Export", key="export_go"):
+                ex_pages = db.iter_leads(
+                    st.session_state.user_id,
+                    with_email={"Any": None, "With email": True, "Without email": False}[ex_email],
+                    statuses=ex_statuses or None,
+                    sectors=ex_sectors or None,
+                    fields=lead_export.lead_fields(ex_cols),
+                )
+                ex_file = tempfile.TemporaryFile()
+                with st.spinner("Exporting leads..."):
+                    ex_count = lead_export.write_export(ex_pages, ex_cols, ex_file, ex_format.lower())
+                ex_file.seek(0)
+                ext = "parquet" if ex_format == "Parquet" else "csv"
+                st.download_button(f"⬇️ Download {ex_count} leads (.{ext})", ex_file, file_name=f"leads.{ext}",
+                                   mime="application/vnd.apache.parquet" if ext == "parquet" else "text/csv", key="export_download")
+
 
 # TAB 1: SEARCH (DISCOVERY)
 # TAB 1: SEARCH (DISCOVERY)
-if current_tab == " Search & Add":
+@tab_fragment
+def search_tab():
+    # Set by the sidebar in Company Scout mode, by the sector picker below otherwise
+    global selected_sector, search_query
+    from search_service import search_google_places, search_google_legacy_nearby, search_outscraper
+    from enrichment_service import search_apollo_people, search_outscraper_contacts, extract_domain, find_linkedin_company_page, search_companies_house
     
     # --- SECTION A: ADD EXISTING LEADS ---
     with st.expander("➕ Import Existing Leads (Manual or CSV)", expanded=False):
@@ -1898,45 +1990,46 @@ if current_tab == " Search & Add":
                         st.error("Business Name is required.")
         
         with tab_csv:
-            st.info("Upload a CSV with columns: 'Business Name', 'Sector', 'Contact Name', 'Email', 'Website'")
+            st.info("Upload a CSV with columns: 'Business Name', 'Sector', 'Contact Name', 'Email', 'Website' ('Company', 'Name' and 'Contact' work too)")
             up_file = st.file_uploader("Upload CSV", type="csv")
             
             if up_file:
-                if st.button("Process Import"):
+                col_preview, col_import = st.columns(2)
+                do_preview = col_preview.button("👀 Preview (dry run)")
+                do_import = col_import.button("Process Import", type="primary")
+                if do_preview or do_import:
                     try:
-                        import_df = pd.read_csv(up_file)
-                        # Normalize cols
-                        # Expect users to have random col names, try to map standard ones
-                        # Simple mapping strategy:
-                        leads_batch = []
-                        for _, row in import_df.iterrows():
-                            # Flexible get
-                            b_name = row.get("Business Name") or row.get("Company") or row.get("Name")
-                            if b_name:
-                                leads_batch.append({
-                                    "Business Name": str(b_name),
-                                    "Sector": str(row.get("Sector", "Imported")),
-                                    "Address": str(row.get("Address", "Unknown")),
-                                    "Website": str(row.get("Website", "")),
-                                    "Contact Name": str(row.get("Contact Name") or row.get("Contact") or ""),
-                                    "Notes": {"source": "csv_import"}
-                                })
-                        
-                        if leads_batch:
-                            # Use Sheets Manager directly if in sheets mode, else loop db
-                            if st.session_state.get("use_sheets"):
-                                ok, msg = sheet_manager.add_leads_bulk(leads_batch)
-                                if ok: st.success(msg)
-                                else: st.error(msg)
-                            else:
-                                count = 0
-                                for l in leads_batch:
-                                    db.add_lead(st.session_state.user_id, l["Business Name"], l["Sector"], l["Address"], website=l["Website"], contact_name=l["Contact Name"])
-                                    count += 1
-                                st.success(f"Imported {count} leads to Local DB.")
+                        existing_names = [l.get("Business Name") for l in db.get_leads(st.session_state.user_id, fields=["Business Name"])]
+                        csv_import = CsvLeadImport(up_file, existing_names)
+
+                        if do_preview:
+                            with st.spinner("Scanning CSV..."):
+                                sample = csv_import.preview()
+                            stats = csv_import.stats
+                            st.caption("Columns used: " + ", ".join(
+                                f"{field} ← {' / '.join(map(str, cols))}" for field, cols in csv_import.columns.items() if cols))
+                            st.dataframe(sample, width="stretch", hide_index=True)
+                            st.info(f"{stats['new']} of {stats['rows']} rows would be imported "
+                                    f"({stats['existing']} already in your leads, {stats['duplicate']} repeated in the file, "
+                                    f"{stats['blank']} without a business name). Nothing has been saved.")
                         else:
-                            st.warning("Could not find a 'Business Name', 'Company', or 'Name' column in your CSV.")
-                            
+                            import_bar = st.progress(0.0, text="Importing leads...")
+                            imported, error = 0, None
+                            for batch in csv_import.batches():
+                                added, error = db.add_leads_bulk(st.session_state.user_id, batch)
+                                imported += added
+                                import_bar.progress(csv_import.progress(), text=f"Imported {imported} leads")
+                                if error:
+                                    break
+                            stats = csv_import.stats
+                            skipped = stats["existing"] + stats["duplicate"] + stats["blank"]
+                            if error:
+                                st.error(f"{error} Imported {imported} leads so far. Re-run the import to resume — leads already added are skipped.")
+                            else:
+                                import_bar.progress(1.0, text=f"Imported {imported} leads")
+                                st.success(f"Imported {imported} leads ({skipped} skipped as duplicates or blank).")
+                    except ValueError as e:
+                        st.warning(str(e))
                     except Exception as e:
                         st.error(f"Error reading CSV: {e}")
 
@@ -1971,7 +2064,7 @@ if current_tab == " Search & Add":
     
     # NEW SEARCH (Reset)
     if st.button("Run Search (Scout)", type="primary"):
-        st.session_state.leads = pd.DataFrame() # Clear old
+        st.session_state.leads = SearchResults() # Clear old
         st.session_state.next_page_token = None
         
         if search_mode == "Company Scout" and not scout_company:
@@ -2039,21 +2132,11 @@ if current_tab == " Search & Add":
                                     if st.button(f"🔄 Widen to {search_radius + 100} miles"):
                                         st.session_state.widen_radius = search_radius + 100
                                         st.rerun()
-                                st.session_state.leads = pd.DataFrame()
+                                st.session_state.leads = SearchResults()
                                 st.session_state.next_page_token = None
                         else:
-                                # Deduplicate
-                                temp_df = pd.DataFrame(all_os_results)
-                                before_count = len(temp_df)
-                                temp_df.drop_duplicates(subset=["Business Name"], keep="first", inplace=True)
-                                
-                                st.session_state.leads = temp_df
-                                if "Distance" in st.session_state.leads.columns:
-                                     st.session_state.leads.sort_values(by="Distance", inplace=True)
-                                
-                                # Strict Limit: Max 50 Results per Page
-                                if len(st.session_state.leads) > 50:
-                                    st.session_state.leads = st.session_state.leads.head(50)
+                                # Deduplicate, closest first. Strict Limit: Max 50 Results per Page
+                                st.session_state.leads = SearchResults(all_os_results, sort=True, limit=50)
                                 
                                 # Enable Load More for Outscraper
                                 st.session_state.next_page_token = "outscraper_more" 
@@ -2085,11 +2168,9 @@ if current_tab == " Search & Add":
                         
                         # Dedupe and set
                         if combined_results:
-                             temp_df = pd.DataFrame(combined_results)
-                             temp_df.drop_duplicates(subset=["Business Name"], keep="first", inplace=True)
-                             st.session_state.leads = temp_df
+                             st.session_state.leads = SearchResults(combined_results)
                              st.session_state.next_page_token = None
-                             st.success(f"Proximity Search found {len(temp_df)} unique results.")
+                             st.success(f"Proximity Search found {len(st.session_state.leads)} unique results.")
                         else:
                              st.warning("No results found.")
 
@@ -2127,18 +2208,15 @@ if current_tab == " Search & Add":
                     
                     if not combined_results:
                          st.warning("No results found.")
-                         st.session_state.leads = pd.DataFrame()
+                         st.session_state.leads = SearchResults()
                          st.session_state.next_page_token = None
                     else:
                          # Deduplicate by Name
-                         # Create DF first for easier drop_duplicates
-                         temp_df = pd.DataFrame(combined_results)
-                         if not temp_df.empty:
-                             before = len(temp_df)
-                             temp_df.drop_duplicates(subset=["Business Name"], keep="first", inplace=True)
-                             after = len(temp_df)
+                         results = SearchResults(combined_results)
+                         if not results.empty:
+                             after = len(results)
                              
-                             st.session_state.leads = temp_df
+                             st.session_state.leads = results
                              # If we ran multiple queries, setting a single next_page_token is tricky 
                              # because it only applies to one. We'll disable it for Multi-Search for now to avoid confusion.
                              # Or just keep the last one.
@@ -2146,14 +2224,14 @@ if current_tab == " Search & Add":
                              
                              st.success(f"Found {after} unique targets! (Merged {len(queries)} searches)")
                          else:
-                             st.session_state.leads = pd.DataFrame()
+                             st.session_state.leads = SearchResults()
                              st.session_state.next_page_token = None
                              
                 else:
                     # MOCK SEARCH (unchanged)
                     mode_arg = "previous" if search_mode == "Company Scout" else "sector"
                     results = mock_search_places(location_search_ctx, search_radius, search_query, mode=mode_arg)
-                    st.session_state.leads = pd.DataFrame(results)
+                    st.session_state.leads = SearchResults(results)
                     st.session_state.next_page_token = None
                     st.info("ℹ️ Demo Mode.")
 
@@ -2190,21 +2268,9 @@ if current_tab == " Search & Add":
                             new_os_results.extend(res_batch)
                      
                      if new_os_results:
-                         new_df = pd.DataFrame(new_os_results)
-                         
-                         # Limit new batch to 50
-                         if len(new_df) > 50:
-                             new_df = new_df.head(50)
-                             
-                         # Concat
-                         st.session_state.leads = pd.concat([st.session_state.leads, new_df], ignore_index=True)
-                         # Dedupe again just in case
-                         st.session_state.leads.drop_duplicates(subset=["Business Name"], keep="first", inplace=True)
-                         
-                         if "Distance" in st.session_state.leads.columns:
-                             st.session_state.leads.sort_values(by="Distance", inplace=True)
-                             
-                         st.success(f"Added {len(new_df)} more! Total: {len(st.session_state.leads)}")
+                         # Append up to 50 new (deduped) results, keeping closest first
+                         added = st.session_state.leads.extend(new_os_results, sort=True, limit=50)
+                         st.success(f"Added {added} more! Total: {len(st.session_state.leads)}")
                          st.rerun()
                      else:
                          st.warning("No more results found.")
@@ -2223,10 +2289,9 @@ if current_tab == " Search & Add":
                          # Google tokens usually expire if used.
                          # Let's keep the token for a retry if it was a network error, but if it was Invalid Argument, it is dead.
                      elif new_results:
-                         # Append to existing DataFrame
-                         new_df = pd.DataFrame(new_results)
-                         st.session_state.leads = pd.concat([st.session_state.leads, new_df], ignore_index=True)
-                         st.success(f"Added {len(new_results)} more! Total: {len(st.session_state.leads)}")
+                         # Append to existing results
+                         added = st.session_state.leads.extend(new_results)  # skips names already listed
+                         st.success(f"Added {added} more! Total: {len(st.session_state.leads)}")
                          
                          st.session_state.next_page_token = new_token # Update token (or None if done)
                          if not new_token:
@@ -2239,12 +2304,12 @@ if current_tab == " Search & Add":
 
     # Post-Processing: Check for Duplicates (Run always if leads exist)
     if not st.session_state.leads.empty:
-        # 1. Fetch current user leads
-        my_leads = db.get_leads(st.session_state.user_id)
+        # 1. Fetch current user leads (names only — no notes payload needed)
+        my_leads = db.get_leads(st.session_state.user_id, fields=["Business Name"])
         existing_names = {l["Business Name"].lower() for l in my_leads}
         
         # 2. Add "In List" column
-        df_results = st.session_state.leads.copy()
+        df_results = st.session_state.leads.frame()
         df_results["In List"] = df_results["Business Name"].apply(lambda x: "✅" if str(x).lower() in existing_names else "")
         
         # --- QUALITY SCORE DISPLAY ---
@@ -2256,7 +2321,8 @@ if current_tab == " Search & Add":
             df_results["Size"] = "—"
         
         # --- SOCIAL PRESENCE INDICATOR ---
-        if "Social" in df_results.columns:
+        social = st.session_state.leads.social()
+        if social.notna().any():
             def _social_icons(social_dict):
                 if not social_dict or not isinstance(social_dict, dict):
                     return "—"
@@ -2268,16 +2334,18 @@ if current_tab == " Search & Add":
                 if social_dict.get("youtube"): icons.append("🎥")
                 if social_dict.get("tiktok"): icons.append("🎵")
                 return " ".join(icons) if icons else "—"
-            df_results["Socials"] = df_results["Social"].apply(_social_icons)
+            df_results["Socials"] = social.apply(_social_icons)
         
         # --- MAP DISPLAY (If lat/lon ok) ---
         if "lat" in df_results.columns:
-                st.map(df_results)
+                st.map(df_results[["lat", "lon"]].astype("float64"))  # the map serializer can't take float32
         
         # --- RESULTS SUMMARY ---
         total = len(df_results)
         high_q = len(df_results[df_results.get("Quality", 0) >= 4]) if "Quality" in df_results.columns else 0
         st.caption(f"📊 **{total} results** found • {high_q} high-quality leads (4+⭐)")
+        if st.query_params.get("timing"):
+            st.caption(f"🧠 Search results held for this session: {st.session_state.leads.memory_bytes() / 1024:,.0f} KB")
         
         with st.expander("ℹ️ What do the Quality Score & Reviews mean?"):
             st.markdown("""
@@ -2354,7 +2422,7 @@ if current_tab == " Search & Add":
                     if is_in_list:
                         st.error("Already in your list!")
                     else:
-                        row = df_results.iloc[selected_idx]
+                        row = st.session_state.leads.record(df_results.index[selected_idx])
                     
                         b_name = row["Business Name"]
                         b_sect = row["Sector"]
@@ -2607,14 +2675,19 @@ if current_tab == " Search & Add":
 # TAB 2: OUTREACH
 # TAB 2: OUTREACH
 # TAB 2: OUTREACH
-if current_tab == "✉️ Outreach Assistant":
+@tab_fragment
+def outreach_tab():
+    from enrichment_service import scrape_website_social_links
     st.subheader("✉️ Outreach Assistant")
     
-    # 1. LOAD ALL LEADS FOR SELECTOR
-    all_leads = db.get_leads(st.session_state.user_id)
+    # 1. LOAD ALL LEADS FOR SELECTOR (header fields only)
+    all_leads = db.get_leads(st.session_state.user_id, fields=["Business Name", "Status", "Last Contact", "Next Action", "Value"])
     if not all_leads:
         st.info("No leads found. Go to 'Search & Add' to build your list.")
     else:
+        # A lead added moments ago may have synced and swapped its temp ID for a real one
+        st.session_state.selected_lead_id = db.resolve_lead_id(st.session_state.selected_lead_id)
+        
         # Auto-select: if no lead selected, pick the most recent one
         lead_ids = [l["id"] for l in all_leads]
         if not st.session_state.selected_lead_id or st.session_state.selected_lead_id not in lead_ids:
@@ -2661,9 +2734,7 @@ if current_tab == "✉️ Outreach Assistant":
 
     if st.session_state.selected_lead_id:
         # Get fresh lead data
-        all_leads = db.get_leads(st.session_state.user_id)
-        # simplistic filter
-        lead = next((l for l in all_leads if l['id'] == st.session_state.selected_lead_id), None)
+        lead = db.get_lead(st.session_state.selected_lead_id, st.session_state.user_id)
         
         if lead:
             st.header(f"Strategy: {lead['Business Name']} ({lead['Status']})")
@@ -2673,6 +2744,40 @@ if current_tab == "✉️ Outreach Assistant":
             stage = st.radio("Stage", ["1. Connect", "2. Discovery Call", "3. Proposal"], horizontal=True)
             st.divider()
 
+            # --- PLAYBOOK PASSAGES (course PDFs + .docx playbooks, full-text index) ---
+            # Off by default: nothing touches the index until the panel is switched on,
+            # then it searches on switch-on and on submit (hits kept in session_state).
+            if not st.toggle("📚 Playbook Passages", key="pb_open"):
+                st.session_state.pop("pb_hits", None)
+            elif not doc_index.indexed_documents():
+                st.caption("Search the course PDFs and playbooks for advice on this stage. The library is indexed once (takes a minute or two).")
+                if st.button("Build Playbook Index", key="build_doc_index"):
+                    with st.spinner("Indexing the coaching library..."):
+                        doc_index.ensure_index(max_age=0)
+                    st.rerun()
+            else:
+                # Picks up added or changed library files without blocking this run
+                doc_index.refresh_in_background()
+                stage_topics = {
+                    "1. Connect": "first outreach message connect",
+                    "2. Discovery Call": "discovery call questions",
+                    "3. Proposal": "sponsorship proposal",
+                }
+                with st.form(f"pb_form_{stage}", border=False):
+                    q_col, btn_col = st.columns([4, 1], vertical_alignment="bottom")
+                    pb_query = q_col.text_input("Search the playbooks", value=f"{stage_topics[stage]} {lead.get('Sector', '')}".strip(), key=f"pb_query_{stage}")
+                    pb_submitted = btn_col.form_submit_button("🔎 Search")
+                pb_context = (stage, str(lead.get("id")))
+                cached = st.session_state.get("pb_hits")
+                if pb_submitted or cached is None or cached[0] != pb_context:
+                    cached = st.session_state.pb_hits = (pb_context, doc_index.search(pb_query, limit=4))
+                pb_hits = cached[1]
+                if not pb_hits:
+                    st.caption("No matching passages.")
+                for hit in pb_hits:
+                    st.markdown(f"**{hit['title']}** · {doc_index.page_label(hit)}")
+                    st.caption(hit["snippet"].replace("\n", " "))
+
             col1, col2 = st.columns([1, 1.5], gap="large")
 
             # --- STAGE 1: CONNECT ---
@@ -2889,10 +2994,11 @@ if current_tab == "✉️ Outreach Assistant":
                                 # Auto-fix ALL CAPS names from Companies House
                                 if new_name == new_name.upper():
                                     new_name = new_name.title()
-                                db.update_lead_contact(lead['id'], new_name)
                                 save_notes = lead_notes_data.copy()
                                 save_notes['salutation'] = contact_salutation
-                                db.update_lead_notes(lead['id'], save_notes)
+                                with db.LeadUpdates() as batch:
+                                    batch.set_contact(lead['id'], new_name)
+                                    batch.set_notes(lead['id'], save_notes)
                                 st.toast(f"✅ Contact set: {contact_salutation} {new_name} → Stage 2 unlocked!")
                                 time.sleep(0.5)
                                 st.rerun()
@@ -3104,8 +3210,6 @@ if current_tab == "✉️ Outreach Assistant":
                         st.write("")
                         if st.button("✅ Mark as Sent & Schedule", use_container_width=True):
                             st.balloons()
-                            db.update_lead_status(lead['id'], "Active", final_date)
-                            
                             current_step_idx = seq_options.index(tpl) if tpl in seq_options else 0
                             mark_notes = lead_notes_data.copy()
                             mark_notes['outreach_step'] = current_step_idx
@@ -3113,7 +3217,9 @@ if current_tab == "✉️ Outreach Assistant":
                             mark_notes['salutation'] = contact_salutation
                             if contact_url:
                                 mark_notes['contact_url'] = contact_url
-                            db.update_lead_notes(lead['id'], mark_notes)
+                            with db.LeadUpdates() as batch:
+                                batch.set_status(lead['id'], "Active", final_date)
+                                batch.set_notes(lead['id'], mark_notes)
                             
                             st.success(f"🎉 Done! Next follow-up: {final_date}")
                             time.sleep(3)
@@ -3222,8 +3328,7 @@ if current_tab == "✉️ Outreach Assistant":
                         if revenue:
                             st.markdown(f"**Revenue:** {revenue}")
                         if founded:
-                            import datetime
-                            years_old = datetime.datetime.now().year - int(founded) if founded else 0
+                            years_old = datetime.now().year - int(founded) if founded else 0
                             st.markdown(f"**Founded:** {founded} ({years_old} years)")
                         
                         desc = existing_notes.get('description', '')
@@ -4029,70 +4134,32 @@ Custom packages available — let's build something that fits your exact objecti
 # =============================================================================
 # TAB 4: BULK MAILER
 # =============================================================================
-if current_tab == "📰 Bulk Mailer":
+@tab_fragment
+def bulk_mailer_tab():
     st.subheader("📰 Bulk Mailer")
     st.caption("Send newsletters and follow-up emails in batches through your email app.")
     
-    # Load all leads
-    all_leads_mail = db.get_leads(st.session_state.user_id)
+    # Recipient index: built once, then kept current by lead writes
+    mail_index = db.get_recipient_index(st.session_state.user_id)
+    total_leads_mail, leads_with_email = mail_index.total_leads, mail_index.recipients
     
-    if not all_leads_mail:
+    if not total_leads_mail:
         st.info("No leads found. Go to 'Search & Add' to build your list first.")
     else:
-        # --- EXTRACT EMAILS FROM LEADS ---
-        def _extract_lead_emails(leads_list):
-            """Extract leads that have email addresses from notes."""
-            leads_with_email = []
-            for lead in leads_list:
-                notes = lead.get('Notes', {})
-                if isinstance(notes, str):
-                    try: notes = json.loads(notes)
-                    except: notes = {}
-                if not isinstance(notes, dict): notes = {}
-                
-                email = notes.get('email', '')
-                emails_list = notes.get('emails', [])
-                
-                # Collect all valid emails
-                all_emails = []
-                if email and '@' in str(email):
-                    all_emails.append(str(email).strip())
-                if isinstance(emails_list, list):
-                    for e in emails_list:
-                        if e and '@' in str(e) and str(e).strip() not in all_emails:
-                            all_emails.append(str(e).strip())
-                
-                if all_emails:
-                    leads_with_email.append({
-                        'id': lead['id'],
-                        'name': lead['Business Name'],
-                        'contact': lead.get('Contact Name', ''),
-                        'sector': lead.get('Sector', ''),
-                        'email': all_emails[0],  # Primary email
-                        'all_emails': all_emails,
-                        'status': lead.get('Status', 'Pipeline'),
-                        'next_action': lead.get('Next Action', ''),
-                        'notes': notes
-                    })
-            return leads_with_email
-        
-        leads_with_email = _extract_lead_emails(all_leads_mail)
-        
         # Stats bar
         stat_c1, stat_c2, stat_c3, stat_c4 = st.columns(4)
-        stat_c1.metric("Total Leads", len(all_leads_mail))
+        stat_c1.metric("Total Leads", total_leads_mail)
         stat_c2.metric("With Email", len(leads_with_email))
-        stat_c3.metric("Without Email", len(all_leads_mail) - len(leads_with_email))
+        stat_c3.metric("Without Email", total_leads_mail - len(leads_with_email))
         
         # Count follow-ups due today
         today_str = datetime.now().strftime("%Y-%m-%d")
-        due_today = [l for l in leads_with_email if l['next_action'] and l['next_action'] <= today_str]
-        stat_c4.metric("Follow-ups Due", len(due_today))
+        stat_c4.metric("Follow-ups Due", mail_index.count_due(today_str))
         
         st.divider()
         
         # --- SUB-MODES ---
-        mail_mode = st.radio("Mode", ["📰 Newsletter Blast", "📬 Follow-Up Emails"], horizontal=True, key="mail_mode")
+        mail_mode = st.radio("Mode", ["📰 Newsletter Blast", "📬 Follow-Up Emails", "📥 Reply Triage"], horizontal=True, key="mail_mode")
         
         # =================================================================
         # MODE 1: NEWSLETTER BLAST
@@ -4110,21 +4177,19 @@ if current_tab == "📰 Bulk Mailer":
                     with filter_col1:
                         status_filter = st.multiselect(
                             "Filter by Status",
-                            options=list(set(l['status'] for l in leads_with_email)),
-                            default=list(set(l['status'] for l in leads_with_email)),
+                            options=mail_index.statuses,
+                            default=mail_index.statuses,
                             key="nl_status_filter"
                         )
                     with filter_col2:
                         sector_filter = st.multiselect(
                             "Filter by Sector",
-                            options=list(set(l['sector'] for l in leads_with_email if l['sector'])),
-                            default=list(set(l['sector'] for l in leads_with_email if l['sector'])),
+                            options=mail_index.sectors,
+                            default=mail_index.sectors,
                             key="nl_sector_filter"
                         )
                     
-                    filtered = [l for l in leads_with_email 
-                               if l['status'] in status_filter 
-                               and (l['sector'] in sector_filter or not l['sector'])]
+                    filtered = mail_index.select(statuses=status_filter, sectors=sector_filter)
                     
                     st.info(f"**{len(filtered)} contacts** selected → **{(len(filtered) + 9) // 10} batches** of up to 10")
                     
@@ -4263,9 +4328,7 @@ Best regards,
                         sender_email = st.text_input("Your 'From' email (for mailto):", value=st.session_state.user_email, key="sender_email")
                     
                     # Create batches
-                    batches = []
-                    for i in range(0, len(filtered), batch_size):
-                        batches.append(filtered[i:i+batch_size])
+                    batches = mail_index.batches(filtered, batch_size)
                     
                     # Track sent batches
                     if "sent_batches" not in st.session_state:
@@ -4360,9 +4423,9 @@ Best regards,
                 fu_filter = st.radio("Show", ["📅 Due Today & Overdue", "📋 All Leads with Email", "🔴 Overdue Only"], horizontal=True, key="fu_filter")
                 
                 if fu_filter == "📅 Due Today & Overdue":
-                    followup_leads = [l for l in leads_with_email if l['next_action'] and l['next_action'] <= today_str]
+                    followup_leads = mail_index.select(due_on_or_before=today_str)
                 elif fu_filter == "🔴 Overdue Only":
-                    followup_leads = [l for l in leads_with_email if l['next_action'] and l['next_action'] < today_str]
+                    followup_leads = mail_index.select(due_before=today_str)
                 else:
                     followup_leads = leads_with_email
                 
@@ -4397,9 +4460,7 @@ Best regards,
                         if fu_subject and fu_body:
                             # Create batches
                             fu_batch_size = st.number_input("Contacts per batch", min_value=1, max_value=20, value=10, key="fu_batch_size")
-                            fu_batches = []
-                            for i in range(0, len(followup_leads), fu_batch_size):
-                                fu_batches.append(followup_leads[i:i+fu_batch_size])
+                            fu_batches = mail_index.batches(followup_leads, fu_batch_size)
                             
                             if "fu_sent_batches" not in st.session_state:
                                 st.session_state.fu_sent_batches = set()
@@ -4455,31 +4516,77 @@ Best regards,
                         st.markdown("#### 📝 Individual Follow-Ups")
                         st.caption("Each lead gets a personalised message based on their current outreach step.")
                         
-                        for idx, lead_fu in enumerate(followup_leads):
-                            notes = lead_fu['notes']
-                            contact_name_fu = lead_fu['contact'] or ''
-                            first_name_fu = contact_name_fu.split()[0] if contact_name_fu else "there"
-                            
-                            # Determine which template step they're on
-                            seq_options_fu = [
-                                "LI Connect: Request",
-                                "Email: Cold Opener",
-                                "LI Msg 1: Intro (Day 2)",
-                                "LI Msg 2: Homework (Day 7)",
-                                "LI Msg 3: Momentum (Day 14)",
-                                "LI Msg 4: Scarcity (Day 21)",
-                                "LI Msg 5: Final (Day 28)"
-                            ]
-                            
-                            last_step = notes.get('outreach_step', -1)
+                        # Determine which template step each lead is on
+                        seq_options_fu = [
+                            "LI Connect: Request",
+                            "Email: Cold Opener",
+                            "LI Msg 1: Intro (Day 2)",
+                            "LI Msg 2: Homework (Day 7)",
+                            "LI Msg 3: Momentum (Day 14)",
+                            "LI Msg 4: Scarcity (Day 21)",
+                            "LI Msg 5: Final (Day 28)"
+                        ]
+                        ctx_fu = {
+                            "goal": season_goal,
+                            "prev_champ": prev_champ,
+                            "achievements": achievements,
+                            "audience": audience_size,
+                            "tv": tv_viewers,
+                            "team": team_name,
+                            "rep_mode": user_profile.get("rep_mode", False),
+                            "rep_name": user_profile.get("rep_name", ""),
+                            "rep_role": user_profile.get("rep_role", "")
+                        }
+                        
+                        fu_plan = []
+                        for lead_fu in followup_leads:
+                            last_step = lead_fu['notes'].get('outreach_step', -1)
                             try: last_step = int(last_step)
                             except: last_step = -1
                             
                             next_step_idx = min(last_step + 1, len(seq_options_fu) - 1)
                             if next_step_idx < 0: next_step_idx = 0
-                            next_template = seq_options_fu[next_step_idx]
-                            
-                            salutation_fu = notes.get('salutation', 'Mr')
+                            fu_plan.append((next_step_idx, seq_options_fu[next_step_idx]))
+                        
+                        # Personalised messages: one compiled template per step, rendered for all leads in one pass
+                        fu_merges = {tpl: get_mail_merge(tpl, rider_name, saved_town, championship, ctx_fu) for _, tpl in fu_plan}
+                        fu_messages = [
+                            fu_merges[tpl].render((l['name'], l['sector'], l['contact'] or '', l['notes'].get('salutation', 'Mr')))
+                            for l, (_, tpl) in zip(followup_leads, fu_plan)
+                        ]
+                        
+                        def _fu_subject(lead_fu, next_template):
+                            if "Cold Opener" in next_template:
+                                return f"{rider_name} — A local partnership opportunity for {lead_fu['name']}"
+                            return f"Re: {rider_name} — Partnership Opportunity | {lead_fu['name']}"
+                        
+                        # Whole campaign as draft emails, built one message at a time
+                        if st.toggle("📦 Export all as email drafts (.eml / mbox)", key="fu_export"):
+                            fu_format = st.radio("Format", [".eml (zipped)", "mbox"], horizontal=True, key="fu_export_format")
+                            sender = st.session_state.user_email
+
+                            # Built only when the download is clicked (Streamlit runs the callable off the rerun path)
+                            def _fu_export():
+                                drafts = (build_email(sender, l['email'], _fu_subject(l, tpl), body)
+                                          for l, (_, tpl), body in zip(followup_leads, fu_plan, fu_messages))
+                                buf = io.BytesIO()
+                                if fu_format == "mbox":
+                                    write_mbox(drafts, buf)
+                                else:
+                                    write_eml_zip(drafts, buf)
+                                return buf.getvalue()
+
+                            if fu_format == "mbox":
+                                st.download_button("⬇️ Mailbox (.mbox)", _fu_export, file_name="follow_ups.mbox", mime="application/mbox")
+                            else:
+                                st.download_button("⬇️ Drafts (.eml, zipped)", _fu_export, file_name="follow_ups.zip", mime="application/zip")
+                            st.caption("Open the .eml files (or import the mbox) in your email app: each one is a ready-to-send draft.")
+                        
+                        for idx, lead_fu in enumerate(followup_leads):
+                            notes = lead_fu['notes']
+                            contact_name_fu = lead_fu['contact'] or ''
+                            first_name_fu = contact_name_fu.split()[0] if contact_name_fu else "there"
+                            next_step_idx, next_template = fu_plan[idx]
                             
                             # Card styling
                             overdue = lead_fu['next_action'] and lead_fu['next_action'] < today_str
@@ -4496,30 +4603,10 @@ Best regards,
                                     st.caption(f"Status: {lead_fu['status']}")
                                     st.caption(f"Sector: {lead_fu['sector']}")
                                 
-                                # Generate personalised message
-                                ctx_fu = {
-                                    "goal": season_goal,
-                                    "prev_champ": prev_champ,
-                                    "achievements": achievements,
-                                    "audience": audience_size,
-                                    "tv": tv_viewers,
-                                    "team": team_name,
-                                    "rep_mode": user_profile.get("rep_mode", False),
-                                    "rep_name": user_profile.get("rep_name", ""),
-                                    "rep_role": user_profile.get("rep_role", "")
-                                }
-                                
-                                # Generate the personalised email using existing template system
-                                personalised_msg = generate_message(
-                                    next_template, lead_fu['name'], rider_name, lead_fu['sector'],
-                                    town=saved_town, championship=championship, extra_context=ctx_fu,
-                                    contact_name=contact_name_fu, salutation=salutation_fu
-                                )
+                                personalised_msg = fu_messages[idx]
                                 
                                 # Subject line for individual
-                                individual_subject = f"Re: {rider_name} — Partnership Opportunity | {lead_fu['name']}"
-                                if "Cold Opener" in next_template:
-                                    individual_subject = f"{rider_name} — A local partnership opportunity for {lead_fu['name']}"
+                                individual_subject = _fu_subject(lead_fu, next_template)
                                 
                                 i_subject = st.text_input("Subject", value=individual_subject, key=f"fu_subj_{idx}")
                                 final_fu_msg = st.text_area("Message", value=personalised_msg, height=200, key=f"fu_msg_{idx}")
@@ -4543,20 +4630,62 @@ Best regards,
                                         
                                         next_date = (datetime.now() + timedelta(days=fu_days)).strftime("%Y-%m-%d")
                                         
-                                        # Update DB
-                                        db.update_lead_status(lead_fu['id'], "Active", next_date)
-                                        
                                         # Update notes with step
                                         update_notes = notes.copy()
                                         update_notes['outreach_step'] = next_step_idx
                                         update_notes['last_template'] = next_template
-                                        db.update_lead_notes(lead_fu['id'], update_notes)
+                                        
+                                        # Update DB (status + notes in one write)
+                                        with db.LeadUpdates() as batch:
+                                            batch.set_status(lead_fu['id'], "Active", next_date)
+                                            batch.set_notes(lead_fu['id'], update_notes)
                                         
                                         st.balloons()
                                         st.success(f"🎉 Sent! Next follow-up: {next_date}")
                                         time.sleep(1.5)
                                         st.rerun()
         
+        # =================================================================
+        # MODE 3: REPLY TRIAGE
+        # =================================================================
+        elif mail_mode == "📥 Reply Triage":
+            st.markdown("### 📥 Reply Triage")
+            st.caption("Import replies exported from your email app, see what each one is asking for, and update all the matching leads at once.")
+            
+            replies_file = st.file_uploader("Replies (.mbox, or .csv with 'email' and 'reply' columns)", type=["mbox", "csv"], key="triage_file")
+            if replies_file:
+                try:
+                    triage_results = triage(read_replies(replies_file.getvalue(), replies_file.name), leads_with_email)
+                except Exception as e:
+                    st.error(f"Could not read replies: {e}")
+                    triage_results = None
+                
+                if triage_results:
+                    matched_results = [r for r in triage_results if r['lead_id'] is not None]
+                    tc1, tc2, tc3 = st.columns(3)
+                    tc1.metric("Replies", len(triage_results))
+                    tc2.metric("Matched to Leads", len(matched_results))
+                    tc3.metric("Ready to Book", sum(1 for r in matched_results if r['intent'] == "book a call"))
+                    
+                    st.dataframe(pd.DataFrame([{
+                        "From": r['email'],
+                        "Lead": r['lead_name'] or "— no matching lead —",
+                        "Intent": r['intent'].title(),
+                        "Matched Phrases": ", ".join(r['matched']),
+                        "New Status": r['status'] or "",
+                        "Reply": r['text'][:200],
+                    } for r in triage_results]), use_container_width=True, hide_index=True)
+                    
+                    if matched_results and st.button("✅ Apply Status Changes", type="primary", key="triage_apply"):
+                        with db.LeadUpdates() as batch:
+                            changed = apply_triage(matched_results, batch)
+                        st.success(f"Updated {changed} leads.")
+                        time.sleep(1)
+                        st.rerun()
+                    st.caption("Use the Coach Mode on each contact card for the suggested response to every intent.")
+                elif triage_results is not None:
+                    st.info("No replies found in that file.")
+        
         st.divider()
         
         # --- TIPS ---
@@ -4585,3 +4714,16 @@ Best regards,
 - ⚠️ Gmail Web — may truncate long URLs. Use the copy method instead.
 """)
 
+
+# --- RUN THE ACTIVE TAB ---
+TAB_VIEWS = {
+    " Search & Add": search_tab,
+    "✉️ Outreach Assistant": outreach_tab,
+    "📊 Active Campaign": active_campaign_tab,
+    "📰 Bulk Mailer": bulk_mailer_tab,
+}
+try:
+    TAB_VIEWS[current_tab]()
+finally:
+    _IN_FULL_RUN = False
+_record_run_time("app", _APP_RUN_STARTED)
@@ -0,0 +1,80 @@
+"""
+Offline-first outbox benchmark against the local Airtable stand-in.
+
+Queues new leads together with edits made before their first sync (the
+common case for leads added in the field), replays them with sync_outbox and
+reports the time and requests taken. Also checks the outcome: every edit must
+land without being flagged as a conflict, and an edit made after a remote
+change must still be caught as one.
+
+Usage: python bench_outbox.py [--leads 50] [--latency-ms 80]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import streamlit as st
+
+from standin_servers import StandinServer
+
+USER_EMAIL = "outbox@example.com"
+
+
+def _drain(db, user_id):
+    """Runs sweeps until nothing is pending; returns the sweep count."""
+    sweeps = 0
+    while db.outbox_status(user_id)["pending"] and sweeps < 20:
+        db.sync_outbox()
+        sweeps += 1
+    return sweeps
+
+
+def run(leads, latency):
+    with StandinServer(latency=latency) as server:
+        server.export_env()
+        import db_manager as db
+        from airtable_manager import airtable_manager as am
+
+        am.api_key, am.base_id, am.table_name = "standin", "appBench", "Leads"
+        am.headers = {"Authorization": f"Bearer {am.api_key}", "Content-Type": "application/json"}
+        db.DB_FILE = os.path.join(tempfile.mkdtemp(prefix="sf_outbox_"), "outbox.db")
+        db.init_db()
+        # Sweeps are driven here, so the queue is fully built before the first one
+        db.start_sync_worker = lambda: None
+        user_id = db.save_user_profile(USER_EMAIL, "Bench", {})
+        # Edits are queued for the signed-in user, as in the app
+        st.session_state["user_id"], st.session_state["user_email"] = user_id, USER_EMAIL
+        print(f"Outbox benchmark: {leads} leads, {latency * 1000:.0f} ms per request\n")
+
+        # 1. Add + edit before the first sync
+        temp_ids = [db.add_lead(user_id, f"Outbox Lead {i}", "Motorsport", "Silverstone, UK") for i in range(leads)]
+        for temp_id in temp_ids:
+            db.update_lead_status(temp_id, "Active")
+        before = sum(server.counts.values())
+        t0 = time.perf_counter()
+        sweeps = _drain(db, user_id)
+        status = db.outbox_status(user_id)
+        print(f"{'add + edit, then sync':<28} {time.perf_counter() - t0:7.2f}s  "
+              f"{sum(server.counts.values()) - before:>4} requests  {sweeps} sweeps  {status}")
+        assert status == {"pending": 0, "failed": 0, "conflict": 0}, f"queued edits did not all land: {status}"
+        remote = {lead["Business Name"]: lead["Status"] for lead in am.get_leads(USER_EMAIL)}
+        assert len(remote) == leads and set(remote.values()) == {"Active"}, "edits missing on the backend"
+
+        # 2. A remote change after the local edit is still a conflict
+        lead_id = db.resolve_lead_id(temp_ids[0])
+        db.update_lead_status(lead_id, "Proposal")
+        time.sleep(0.05)
+        am.update_leads({lead_id: {"Status": "Lost"}})
+        _drain(db, user_id)
+        status = db.outbox_status(user_id)
+        print(f"{'edit vs remote change':<28} {status}")
+        assert status["conflict"] == 1, "remote change after the edit was not flagged"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    args = parser.parse_args()
+    run(args.leads, args.latency_ms / 1000)
@@ -0,0 +1,165 @@
+"""
+Repeatable search / enrichment / dashboard scenario on top of http_fixtures.
+
+record  runs the scenario against the configured providers (live, or the local
+        stand-ins with --standin) and saves every HTTP exchange to the fixture,
+        plus a digest of each step's output next to it.
+replay  runs the same scenario from the fixture with no network, either with
+        zero latency (default) or the recorded timing (--realtime), and checks
+        each step's output against the recorded digest.
+
+Usage:
+    python bench_replay.py record --fixture fixtures/scenario.json.gz --standin
+    python bench_replay.py replay --fixture fixtures/scenario.json.gz [--realtime]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import http_fixtures
+
+QUERY = "Transport & haulage"
+LOCATION = "Silverstone, UK"
+RADIUS = 20
+ENRICH_COUNT = 5
+DASHBOARD_EMAIL = "bench@example.com"
+
+# Fixed stand-in port, so recorded URLs match on replay
+STANDIN_PORT = 8799
+
+
+def _keys(standin):
+    if standin:
+        return {"google": "standin", "outscraper": "standin", "apollo": "standin",
+                "companies_house": "standin", "airtable": "standin"}
+    import streamlit as st
+    try:
+        return {
+            "google": st.secrets.get("google_api_key", ""),
+            "outscraper": st.secrets.get("outscraper_api_key", ""),
+            "apollo": st.secrets.get("apollo_api_key", ""),
+            "companies_house": st.secrets.get("companies_house_api_key", ""),
+            "airtable": st.secrets.get("airtable", {}).get("api_key", ""),
+        }
+    except Exception:
+        sys.exit("No secrets.toml found: use --standin or run from the app directory.")
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def _airtable(keys, standin, seed):
+    from airtable_manager import AirtableManager
+    am = AirtableManager()
+    if standin:
+        am.api_key, am.base_id, am.table_name = keys["airtable"], "appBench", "Leads"
+        am.headers = {"Authorization": f"Bearer {am.api_key}", "Content-Type": "application/json"}
+        if seed:
+            # The stand-in starts empty; seed a dashboard's worth of leads while recording
+            for i in range(120):
+                am.add_lead(DASHBOARD_EMAIL, {
+                    "Business Name": f"Bench Lead {i}",
+                    "Status": ["Pipeline", "Active", "Proposal", "Secured"][i % 4],
+                    "Notes": {"email": f"lead{i}@example.com"},
+                }, check_duplicate=False)
+    return am
+
+
+def scenario(keys, standin, seed):
+    """Yields (step name, output) in a fixed order."""
+    import enrichment_service as es
+    import search_service as ss
+
+    places, token = ss.search_google_places(keys["google"], QUERY, LOCATION, RADIUS, sector_name=QUERY)
+    if token:
+        more, _ = ss.search_google_places(keys["google"], QUERY, LOCATION, RADIUS, sector_name=QUERY, pagetoken=token)
+        places = places + (more if isinstance(more, list) else [])
+    yield "places search", places
+
+    results, _ = ss.search_outscraper(keys["outscraper"], QUERY, LOCATION, radius=RADIUS, limit=40,
+                                      google_api_key=keys["google"])
+    yield "outscraper search", results
+
+    domains = [es.extract_domain(r.get("Website", "")) for r in results if r.get("Website")][:ENRICH_COUNT]
+    yield "outscraper contacts", [es.search_outscraper_contacts(keys["outscraper"], d) for d in domains]
+    yield "apollo people", [es.search_apollo_people(keys["apollo"], d) for d in domains]
+    names = [r.get("Business Name", "") for r in results[:ENRICH_COUNT]]
+    yield "companies house", [es.search_companies_house(keys["companies_house"], n) for n in names]
+
+    am = _airtable(keys, standin, seed)
+    if am.is_configured():
+        leads = am.get_leads(DASHBOARD_EMAIL)
+        yield "dashboard leads", [dict(lead) for lead in leads]
+
+
+def run(mode, fixture, standin, realtime):
+    fixture = os.path.abspath(fixture)
+    digests_path = fixture + ".digests.json"
+    keys = _keys(standin)
+
+    server = None
+    if standin:
+        from standin_servers import StandinServer
+        server = StandinServer(port=STANDIN_PORT, latency=0.08, jitter=0.04)
+        server.export_env()
+        if mode == "record":
+            server.start()
+        else:
+            # Replay only needs the same base URLs, not a running server
+            server.httpd.server_close()
+            server = None
+
+    # Keep the search disk cache out of the way so every run really hits the providers
+    os.chdir(tempfile.mkdtemp(prefix="sf_replay_"))
+
+    expected = {}
+    if mode == "replay":
+        with open(digests_path) as f:
+            expected = json.load(f)
+
+    digests = {}
+    print(f"{mode}{' (recorded timing)' if realtime else ''}: {fixture}\n")
+    try:
+        with (http_fixtures.recording(fixture) if mode == "record"
+              else http_fixtures.replaying(fixture, realtime=realtime)) as cassette:
+            t0 = time.perf_counter()
+            steps = scenario(keys, standin, seed=mode == "record")
+            while True:
+                step_start = time.perf_counter()
+                try:
+                    name, output = next(steps)
+                except StopIteration:
+                    break
+                elapsed = time.perf_counter() - step_start
+                digests[name] = _digest(output)
+                check = ""
+                if expected:
+                    check = "match" if expected.get(name) == digests[name] else f"MISMATCH (recorded {expected.get(name)})"
+                count = len(output) if isinstance(output, list) else 1
+                print(f"{name:<22} {elapsed:7.2f}s  {count:>4} items  {digests[name]}  {check}")
+            total = time.perf_counter() - t0
+        print(f"\n{'total':<22} {total:7.2f}s  {len(cassette.interactions)} recorded requests")
+    finally:
+        if server:
+            server.stop()
+
+    if mode == "record":
+        with open(digests_path, "w") as f:
+            json.dump(digests, f, indent=2)
+    elif any(expected.get(k) != v for k, v in digests.items()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--fixture", default=os.path.join("fixtures", "scenario.json.gz"))
+    parser.add_argument("--standin", action="store_true", help="use the local stand-in servers and dummy keys")
+    parser.add_argument("--realtime", action="store_true", help="replay with the recorded response times")
+    args = parser.parse_args()
+    run(args.mode, args.fixture, args.standin, args.realtime)
@@ -0,0 +1,93 @@
+"""
+Per-interaction server time for app.py, with and without tab fragments.
+
+Drives the real app with Streamlit's AppTest against a throwaway SQLite
+database (no Airtable, Sheets or search APIs). For each main tab it runs
+the script several times and reads the timings app.py records in
+st.session_state.run_timings:
+
+- full run: the whole script (login, profile, sidebar, then the tab). Before
+  the tabs were fragments, every widget interaction cost this.
+- tab only: the tab's fragment, which is all a widget interaction inside
+  the tab reruns now.
+
+Usage: python bench_reruns.py [--leads 500] [--runs 5]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
+
+import db_manager as db
+from airtable_manager import airtable_manager
+
+TABS = {
+    " Search & Add": "search_tab",
+    "✉️ Outreach Assistant": "outreach_tab",
+    "📊 Active Campaign": "active_campaign_tab",
+    "📰 Bulk Mailer": "bulk_mailer_tab",
+}
+STATUSES = ["Pipeline", "Active", "Call Booked", "Proposal", "Secured", "Lost"]
+
+
+def _seed(leads):
+    db.init_db()
+    profile = {"onboarding_complete": True, "first_name": "Sam", "last_name": "Rider",
+               "championship": "British Superbikes", "town": "Leeds", "country": "UK"}
+    with db._db() as conn:
+        user_id = conn.execute("INSERT INTO users (email, name, profile_json) VALUES (?, ?, ?)",
+                               ("rider@example.com", "Sam Rider", json.dumps(profile))).lastrowid
+    db.add_leads_bulk(user_id, [
+        {"Business Name": f"Business {i}", "Sector": "Motorcycle dealers", "Address": "Leeds",
+         "Status": STATUSES[i % len(STATUSES)], "Notes": {"email": f"info{i}@example.com"}}
+        for i in range(leads)])
+    return user_id
+
+
+def run(leads, runs):
+    from streamlit.testing.v1 import AppTest
+
+    # Seeding the database runs outside a script run, which Streamlit warns about
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+    tmp_dir = tempfile.mkdtemp(prefix="sf_bench_reruns_")
+    db.DB_FILE = os.path.join(tmp_dir, "bench.db")
+    airtable_manager.api_key = None  # never touch a configured Airtable base
+    cwd = os.getcwd()
+    try:
+        user_id = _seed(leads)
+        os.chdir(APP_DIR)  # app.py loads logo.png etc. relative to its folder
+
+        print(f"{leads} leads, {runs} runs per tab (median ms)\n")
+        print(f"{'Tab':<24}{'full run':>10}{'tab only':>10}{'saved':>8}")
+        for label, scope in TABS.items():
+            at = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=120)
+            at.secrets["google_api_key"] = ""
+            at.session_state["user_id"] = user_id
+            at.session_state["nav_radio"] = label
+            for _ in range(runs + 1):  # first run warms caches
+                at.run()
+            if at.exception:
+                print(f"{label.strip():<24}failed: {at.exception[0].value}")
+                continue
+            timings = at.session_state["run_timings"]
+            full = statistics.median(timings["app"][1:])
+            tab = statistics.median(timings[scope][1:])
+            print(f"{label.strip():<24}{full:>10.0f}{tab:>10.0f}{1 - tab / full:>8.0%}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    run(args.leads, args.runs)
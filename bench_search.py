@@ -0,0 +1,299 @@
+"""
+Benchmark for search result post-processing at scale.
+
+Generates synthetic Outscraper search-v3 payloads (100 / 1k / 10k / 100k rows
+by default) with realistic text fields - chains, junk categories, irrelevant
+businesses, duplicates, mixed employee/review formats - and times each stage
+separately:
+
+    name + distance    result_name + haversine per item
+    filters            junk / chain / relevance / negative keyword checks
+    map                map_outscraper_item (full extraction incl. size + quality)
+    size estimation    estimate_company_size on its own
+    quality scoring    lead_quality_score on its own
+    process (total)    process_outscraper_results end to end
+    sort               sort_search_results
+    frame + dedupe     DataFrame build, drop_duplicates, sort by Distance (app.py, first page)
+    load-more merge    concat onto existing results, dedupe, sort (app.py, Deeper Search)
+    in-list flag       "In List" column against the rider's saved lead names (app.py)
+
+The website social scan is network-bound and not included.
+
+Each stage is timed (best of --repeat) and, in a separate pass, measured for
+peak traced memory. Results are written as JSON so runs can be compared
+between versions with --compare.
+
+Usage:
+    python bench_search.py [--sizes 100 1000 10000 100000] [--repeat 3]
+                           [--out bench_results/search.json] [--compare previous.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+CENTER = (52.088, -1.025)  # Silverstone
+RADIUS = 50
+SEARCH_TERMS = ["Transport & haulage", "Logistics company", "Freight forwarding"]
+SAVED_LEADS = 1000
+
+SURNAMES = ["Smith", "Jones", "Taylor", "Brown", "Wilson", "Evans", "Walker", "Wright", "Hughes", "Green",
+            "Hall", "Wood", "Clarke", "Turner", "Hill", "Cooper", "Ward", "Morris", "King", "Baker"]
+TRADES = ["Haulage", "Transport", "Logistics", "Freight", "Removals", "Couriers", "Distribution", "Fleet Services"]
+SUFFIXES = ["Ltd", "& Sons", "Group", "UK", "Services", "Limited", "Partners", "Express"]
+CATEGORIES = ["Trucking company", "Logistics service", "Freight forwarding service", "Moving company",
+              "Courier service", "Transportation service", "Warehouse", "Haulage company"]
+JUNK = ["Taxi service", "Minicab service", "Church", "Airport shuttle service"]
+NEGATIVE = ["Restaurant", "Cafe", "Hair salon", "Pharmacy", "Chinese takeaway"]
+CHAINS = ["DHL Depot", "Royal Mail Delivery Office", "Tesco Extra", "Halfords Autocentre", "UPS Access Point"]
+TOWNS = ["Silverstone", "Towcester", "Brackley", "Banbury", "Northampton", "Milton Keynes", "Buckingham", "Daventry"]
+DESC_PHRASES = [
+    "Family-run business established in 1987", "serving the Midlands and the South East",
+    "specialising in temperature-controlled and ambient loads", "with a modern fleet of Euro 6 vehicles",
+    "offering same-day and next-day pallet delivery", "fully FORS Gold accredited",
+    "providing warehousing and cross-docking", "trusted by motorsport teams for event logistics",
+]
+
+
+def generate_payload(rows, seed=7):
+    """Synthetic search-v3 items around CENTER; roughly a third survive distance and filters."""
+    rng = random.Random(seed)
+    items = []
+    names = []
+    for i in range(rows):
+        roll = rng.random()
+        if names and roll < 0.08:
+            name = rng.choice(names)  # duplicate across keyword batches
+        elif roll < 0.12:
+            name = f"{rng.choice(CHAINS)} {rng.choice(TOWNS)}"
+        else:
+            surname = rng.choice(SURNAMES)
+            if rng.random() < 0.6:
+                surname = f"{surname}-{rng.choice(SURNAMES)}"
+            name = f"{surname} {rng.choice(TRADES)} {rng.choice(TOWNS)} {rng.choice(SUFFIXES)}"
+            names.append(name)
+        category = rng.choices([rng.choice(CATEGORIES), rng.choice(JUNK), rng.choice(NEGATIVE)], [90, 4, 6])[0]
+        # Spread to ~1.3x the radius so the distance filter has work to do
+        lat = CENTER[0] + rng.uniform(-1.0, 1.0)
+        lon = CENTER[1] + rng.uniform(-1.5, 1.5)
+        reviews = rng.choice([None, rng.randint(0, 900), str(rng.randint(0, 900)), "n/a"])
+        employees = rng.choice([None, None, rng.randint(1, 800), f"{rng.randint(10, 500)}+", "1,200", "unknown"])
+        slug = "".join(c for c in name.lower() if c.isalnum())[:30]
+        item = {
+            "name": name,
+            "full_address": f"Unit {rng.randint(1, 40)}, {rng.choice(TOWNS)} Industrial Estate, {rng.choice(TOWNS)} NN{rng.randint(1, 18)} {rng.randint(1, 9)}AB, UK",
+            "latitude": round(lat, 6),
+            "longitude": round(lon, 6),
+            "category": category,
+            "subtypes": rng.choice([", ".join(rng.sample(CATEGORIES, 2)), rng.sample(CATEGORIES, 3), None]),
+            "type": category,
+            "site": f"https://www.{slug}.co.uk" if rng.random() < 0.75 else "",
+            "phone": f"+44 1327 {rng.randint(100000, 999999)}" if rng.random() < 0.85 else None,
+            "rating": round(rng.uniform(2.5, 5.0), 1) if rng.random() < 0.9 else None,
+            "reviews": reviews,
+            "reviews_per_score": {str(s): rng.randint(0, 120) for s in range(1, 6)},
+            "employees": employees,
+            "place_id": f"ChIJ{rng.getrandbits(64):016x}",
+            "owner_title": name,
+            "email_1": f"info@{slug}.co.uk" if rng.random() < 0.4 else "",
+            "email_2": f"sales@{slug}.co.uk" if rng.random() < 0.15 else "",
+            "facebook": f"https://www.facebook.com/{slug}" if rng.random() < 0.5 else "",
+            "linkedin": f"https://www.linkedin.com/company/{slug}" if rng.random() < 0.3 else "",
+        }
+        if rng.random() < 0.7:
+            item["description"] = ". ".join(rng.sample(DESC_PHRASES, rng.randint(1, 4))) + "."
+        else:
+            item["about"] = {
+                "Service options": {"Onsite services": rng.random() < 0.5, "Delivery": rng.random() < 0.8},
+                "Accessibility": {"Wheelchair accessible entrance": rng.random() < 0.6},
+            }
+        items.append(item)
+    return items
+
+
+def _stages(ss, payload, saved_names):
+    """Returns [(stage name, callable, rows in)]; each callable returns rows out, rows in is read after it runs."""
+    state = {}
+
+    def name_distance():
+        named = [(item, ss.result_name(item)) for item in payload]
+        state["scored"] = [(item, name, ss.result_distance(item, *CENTER)) for item, name in named if name]
+        return len(state["scored"])
+
+    def filters():
+        rel_words = ss.relevance_words(SEARCH_TERMS)
+        state["kept"] = [
+            (item, name, dist) for item, name, dist in state["scored"]
+            if not ss.filter_reason(item, name, dist, RADIUS, rel_words)
+        ]
+        return len(state["kept"])
+
+    def map_items():
+        state["mapped"] = [ss.map_outscraper_item(item, name, dist) for item, name, dist in state["kept"]]
+        return len(state["mapped"])
+
+    def size_estimation():
+        return len([ss.estimate_company_size(item.get("employees"), m["Reviews"])
+                    for (item, _, _), m in zip(state["kept"], state["mapped"])])
+
+    def quality_scoring():
+        return len([ss.lead_quality_score(m["Website"], m["Phone"], m["Distance"], m["Reviews"], m["Rating"])
+                    for m in state["mapped"]])
+
+    def process_total():
+        results, _, _ = ss.process_outscraper_results(payload, CENTER[0], CENTER[1], RADIUS, SEARCH_TERMS)
+        return len(results)
+
+    def sort_results():
+        # Sort a copy so every repeat starts from the same unsorted order
+        return len(ss.sort_search_results(list(state["mapped"])))
+
+    def frame_dedupe():
+        temp_df = pd.DataFrame(state["mapped"])
+        temp_df.drop_duplicates(subset=["Business Name"], keep="first", inplace=True)
+        temp_df.sort_values(by="Distance", inplace=True)
+        state["frame"] = temp_df
+        return len(temp_df)
+
+    def load_more_merge():
+        half = len(state["mapped"]) // 2
+        leads = pd.DataFrame(state["mapped"][:half])
+        new_df = pd.DataFrame(state["mapped"][half:])
+        leads = pd.concat([leads, new_df], ignore_index=True)
+        leads.drop_duplicates(subset=["Business Name"], keep="first", inplace=True)
+        leads.sort_values(by="Distance", inplace=True)
+        return len(leads)
+
+    def in_list_flag():
+        df_results = state["frame"].copy()
+        df_results["In List"] = df_results["Business Name"].apply(lambda x: "✅" if str(x).lower() in saved_names else "")
+        return int((df_results["In List"] != "").sum())
+
+    payload_rows = lambda: len(payload)
+    named_rows = lambda: len(state["scored"])
+    mapped_rows = lambda: len(state["mapped"])
+    return [
+        ("name + distance", name_distance, payload_rows),
+        ("filters", filters, named_rows),
+        ("map", map_items, lambda: len(state["kept"])),
+        ("size estimation", size_estimation, mapped_rows),
+        ("quality scoring", quality_scoring, mapped_rows),
+        ("process (total)", process_total, payload_rows),
+        ("sort", sort_results, mapped_rows),
+        ("frame + dedupe", frame_dedupe, mapped_rows),
+        ("load-more merge", load_more_merge, mapped_rows),
+        ("in-list flag", in_list_flag, lambda: len(state["frame"])),
+    ]
+
+
+def bench_size(ss, rows, repeat):
+    payload = generate_payload(rows)
+    rng = random.Random(rows)
+    saved_names = {item["name"].lower() for item in rng.sample(payload, min(SAVED_LEADS, len(payload)))}
+
+    results = {}
+    for name, func, rows_in in _stages(ss, payload, saved_names):
+        best = None
+        for _ in range(repeat):
+            gc.collect()
+            t0 = time.perf_counter()
+            out = func()
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+
+        # Separate pass for memory, since tracing slows everything down
+        gc.collect()
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rows_in = rows_in()
+        results[name] = {
+            "seconds": round(best, 6),
+            "rows_in": rows_in,
+            "rows_out": out,
+            "rows_per_sec": round(rows_in / best) if best else None,
+            "peak_kb": round(peak / 1024, 1),
+        }
+    return results
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _print(report, baseline=None):
+    for size, stages in report["results"].items():
+        print(f"\n{int(size):,} rows")
+        for name, r in stages.items():
+            line = (f"  {name:<18} {r['seconds'] * 1000:10.2f} ms  {r['rows_in']:>7,} -> {r['rows_out']:<7,}"
+                    f"  peak {r['peak_kb'] / 1024:8.2f} MB")
+            prev = ((baseline or {}).get("results", {}).get(size) or {}).get(name)
+            if prev and prev["seconds"]:
+                ratio = r["seconds"] / prev["seconds"]
+                flag = "  REGRESSION" if ratio > 1.2 else ""
+                line += f"  x{ratio:5.2f} vs baseline{flag}"
+            print(line)
+
+
+def run(sizes, repeat, out_path, compare_path):
+    baseline = None
+    if compare_path:
+        with open(compare_path) as f:
+            baseline = json.load(f)
+    out_path = os.path.abspath(out_path)
+
+    # search_service's result cache lives in a .cache dir in the working directory
+    os.chdir(tempfile.mkdtemp(prefix="sf_bench_search_"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import search_service as ss
+
+    report = {
+        "meta": {
+            "benchmark": "search_postprocess",
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "radius": RADIUS,
+            "search_terms": SEARCH_TERMS,
+        },
+        "results": {},
+    }
+    for rows in sizes:
+        print(f"Running {rows:,} rows...", flush=True)
+        report["results"][str(rows)] = bench_size(ss, rows, repeat)
+
+    _print(report, baseline)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {out_path}")
+
+
+if __name__ == "__main__":
+    default_out = os.path.join("bench_results", f"search_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=default_out)
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.out, args.compare)
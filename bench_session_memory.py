@@ -0,0 +1,110 @@
+"""
+Memory per session for search results: plain DataFrame vs SearchResults.
+
+Builds synthetic Outscraper items, maps them with search_service's
+map_outscraper_item (so the fields match real results), then loads them
+the way the Search tab does: a first page, then "Deeper Search" batches.
+Reports the memory each representation holds (nested dicts/lists counted)
+and the time per append.
+
+Usage: python bench_session_memory.py [--pages 10] [--page-size 60] [--sessions 200]
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from search_results import SearchResults, dataframe_memory_bytes
+from search_service import map_outscraper_item
+
+CATEGORIES = ["Motorcycle dealer", "Haulage company", "Engineering firm", "Tool supplier", "Garage", "Brewery"]
+WORDS = "family run local specialist service repairs parts fleet trade welcome quality award winning since".split()
+
+
+def fake_items(count, rng):
+    items = []
+    for i in range(count):
+        name = f"{rng.choice(['Apex', 'Grid', 'Moto', 'Podium', 'Torque'])} {rng.choice(CATEGORIES)} {i}"
+        slug = name.lower().replace(" ", "")
+        item = {
+            "name": name,
+            "address": f"{rng.randint(1, 300)} Industrial Estate, Leeds LS{rng.randint(1, 28)}",
+            "rating": round(rng.uniform(3, 5), 1),
+            "reviews": rng.randint(0, 600),
+            "category": rng.choice(CATEGORIES),
+            "website": f"https://www.{slug}.co.uk",
+            "phone": f"+44 113 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+            "latitude": 53.8 + rng.uniform(-0.5, 0.5),
+            "longitude": -1.55 + rng.uniform(-0.5, 0.5),
+            "place_id": f"ChIJ{rng.getrandbits(64):016x}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 60))),
+            "owner_title": name,
+        }
+        if rng.random() < 0.4:
+            item["facebook"] = f"https://facebook.com/{slug}"
+            item["instagram"] = f"https://instagram.com/{slug}"
+        if rng.random() < 0.6:
+            item["email_1"] = f"info@{slug}.co.uk"
+            item["email_2"] = f"sales@{slug}.co.uk"
+        items.append(item)
+    return items
+
+
+def pages_of_results(pages, page_size, rng):
+    out = []
+    for p in range(pages):
+        items = fake_items(page_size, rng)
+        out.append([map_outscraper_item(item, item["name"] + f" p{p}", round(rng.uniform(0.2, 50), 1)) for item in items])
+    return out
+
+
+def load_dataframe(pages):
+    """The old Search tab flow: DataFrame, concat + dedupe + re-sort per page."""
+    times = []
+    df = pd.DataFrame(pages[0]).drop_duplicates(subset=["Business Name"]).sort_values(by="Distance")
+    for page in pages[1:]:
+        started = time.perf_counter()
+        df = pd.concat([df, pd.DataFrame(page)], ignore_index=True)
+        df.drop_duplicates(subset=["Business Name"], keep="first", inplace=True)
+        df.sort_values(by="Distance", inplace=True)
+        times.append(time.perf_counter() - started)
+    return df, times
+
+
+def load_results(pages):
+    times = []
+    results = SearchResults(pages[0], sort=True)
+    for page in pages[1:]:
+        started = time.perf_counter()
+        results.extend(page, sort=True)
+        times.append(time.perf_counter() - started)
+    return results, times
+
+
+def run(pages, page_size, sessions):
+    data = pages_of_results(pages, page_size, random.Random(7))
+    df, df_times = load_dataframe(data)
+    results, rs_times = load_results(data)
+    assert len(df) == len(results)
+
+    old, new = dataframe_memory_bytes(df), results.memory_bytes()
+    print(f"{len(results)} results ({pages} pages of {page_size})\n")
+    print(f"{'':<16}{'per session':>14}{f'x{sessions} sessions':>18}{'append (ms)':>14}")
+    for label, size, times in (("DataFrame", old, df_times), ("SearchResults", new, rs_times)):
+        append_ms = sum(times) / len(times) * 1000 if times else 0
+        print(f"{label:<16}{size / 1024:>11,.0f} KB{size * sessions / 1024 ** 2:>15,.1f} MB{append_ms:>14.2f}")
+    print(f"\nSearchResults holds {new / old:.0%} of the DataFrame's memory")
+    print("\nDataFrame dtypes -> SearchResults dtypes:")
+    compact = results.frame().dtypes
+    for col, dtype in df.dtypes.items():
+        print(f"  {col:<14}{str(dtype):<10} -> {compact.get(col, 'side table')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=60)
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+    run(args.pages, args.page_size, args.sessions)
@@ -0,0 +1,197 @@
+"""
+Benchmark for the Google Sheets backend in sheets_manager, run against an
+in-memory fake worksheet (no network or credentials needed).
+
+The fake mimics the parts of gspread the manager uses, adds a fixed latency
+per API request and rejects requests whose payload exceeds the API size limit,
+so it shows both the request count and where single-shot calls break down.
+Compares one-shot append / get_all_records with chunked append_rows and
+paged batch_get reads.
+
+Usage: python bench_sheets.py [--rows 20000] [--latency-ms 150]
+"""
+import argparse
+import json
+import time
+
+from gspread.utils import a1_to_rowcol
+
+import sheets_manager
+from sheets_manager import SheetManager
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class FakeWorksheet:
+    """Just enough of gspread.Worksheet for SheetManager, with per-call latency."""
+
+    def __init__(self, latency=0.15, max_request_bytes=2_000_000):
+        self.title = "Leads"
+        self.rows = []
+        self.latency = latency
+        self.max_request_bytes = max_request_bytes
+        self.calls = 0
+        self.sent_bytes = 0
+
+    def _request(self, payload=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        if payload is not None:
+            size = len(json.dumps(payload, default=str))
+            self.sent_bytes += size
+            if size > self.max_request_bytes:
+                raise RequestTooLarge(f"Request payload size {size:,} bytes exceeds the limit")
+
+    @staticmethod
+    def _cells(values):
+        return [[("" if v is None else str(v)) for v in row] for row in values]
+
+    def row_values(self, row):
+        self._request()
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col):
+        self._request()
+        return [r[col - 1] if len(r) >= col else "" for r in self.rows]
+
+    def get_all_records(self):
+        self._request()
+        header = self.rows[0]
+        records = []
+        for row in self.rows[1:]:
+            rec = {}
+            for i, name in enumerate(header):
+                cell = row[i] if i < len(row) else ""
+                rec[name] = int(cell) if cell.isdigit() else cell
+            records.append(rec)
+        return records
+
+    def batch_get(self, ranges):
+        self._request()
+        out = []
+        for rng in ranges:
+            # "5:9" (whole rows) or "A5:A9" / "A2:A" (one column, open-ended)
+            first, last = (int(part.lstrip("ABCDEFGHIJK") or len(self.rows)) for part in rng.split(":"))
+            rows = [list(r) for r in self.rows[first - 1:last]]
+            if rng[0].isalpha():
+                col = a1_to_rowcol(rng.split(":")[0])[1]
+                rows = [r[col - 1:col] for r in rows]
+            # Like the API, blank rows at the end of each range are dropped
+            while rows and not any(rows[-1]):
+                rows.pop()
+            out.append(rows)
+        return out
+
+    def append_row(self, values):
+        return self.append_rows([values])
+
+    def append_rows(self, values):
+        self._request(values)
+        first = len(self.rows) + 1
+        self.rows.extend(self._cells(values))
+        return {"updates": {"updatedRange": f"{self.title}!A{first}:K{len(self.rows)}"}}
+
+    def batch_update(self, data, value_input_option=None):
+        self._request(data)
+        for item in data:
+            row, col = a1_to_rowcol(item["range"])
+            self.rows[row - 1][col - 1] = str(item["values"][0][0])
+
+    def delete_rows(self, index):
+        self._request()
+        del self.rows[index - 1]
+
+
+def _make_leads(count):
+    return [
+        {
+            "Business Name": f"Business {i}",
+            "Sector": "Motorcycle dealers",
+            "Address": f"{i} Circuit Road, Silverstone, UK",
+            "Website": f"https://biz{i}.co.uk",
+            "Contact Name": f"Contact {i}",
+            "Notes": {"email": f"info@biz{i}.co.uk", "source": "csv_import", "outreach_step": i % 5},
+        }
+        for i in range(count)
+    ]
+
+
+def _manager(ws):
+    sm = SheetManager()
+    sm.worksheet = ws
+    sm._ensure_headers()
+    return sm
+
+
+def _report(label, ws, seconds, extra=""):
+    print(f"{label:<28} {seconds:7.2f}s  {ws.calls:>4} requests  {ws.sent_bytes / 1e6:7.2f} MB sent  {extra}")
+
+
+def run(rows, latency):
+    leads = _make_leads(rows)
+    print(f"Sheets benchmark: {rows:,} leads, {latency * 1000:.0f} ms per request\n")
+
+    # 1. One-shot append (everything in a single append_rows request)
+    ws = FakeWorksheet(latency)
+    sm = _manager(ws)
+    ws.calls = ws.sent_bytes = 0
+    t0 = time.perf_counter()
+    ok, msg = sm.add_leads_bulk(leads, chunk_size=len(leads))
+    _report("append (single request)", ws, time.perf_counter() - t0, msg if ok else "FAILED: " + msg[:60])
+
+    # 2. Chunked append with progress
+    ws = FakeWorksheet(latency)
+    sm = _manager(ws)
+    ws.calls = ws.sent_bytes = 0
+    ticks = []
+    t0 = time.perf_counter()
+    ok, msg = sm.add_leads_bulk(leads, progress=lambda done, total: ticks.append(done))
+    _report(f"append (chunks of {sheets_manager.APPEND_CHUNK_ROWS})", ws, time.perf_counter() - t0,
+            f"{msg}, {len(ticks)} progress updates")
+
+    # 3. Resume after an interrupted import
+    half = (len(leads) // 2 // sheets_manager.APPEND_CHUNK_ROWS) * sheets_manager.APPEND_CHUNK_ROWS
+    ws_resume = FakeWorksheet(0)
+    sm_resume = _manager(ws_resume)
+    sm_resume.add_leads_bulk(leads[:half])
+    ok, msg = sm_resume.add_leads_bulk(leads, skip=sm_resume.last_bulk_added)
+    appended_ids = [r[0] for r in ws_resume.rows[1:]]
+    print(f"{'resume after ' + str(half) + ' rows':<28} {msg}; {len(appended_ids):,} rows, "
+          f"{len(set(appended_ids)):,} unique IDs")
+
+    # 4. Reads: whole sheet at once vs paged batch_get
+    ws.latency = latency
+    ws.calls = ws.sent_bytes = 0
+    t0 = time.perf_counter()
+    records = ws.get_all_records()
+    decoded = [json.loads(r["Notes JSON"]) for r in records]
+    _report("get_all_records + decode", ws, time.perf_counter() - t0, f"{len(decoded):,} rows")
+
+    ws.calls = 0
+    t0 = time.perf_counter()
+    first_page = next(sm.iter_lead_pages(fields=["Business Name", "Status"]))
+    _report("first page (batch_get)", ws, time.perf_counter() - t0, f"{len(first_page):,} rows")
+
+    ws.calls = 0
+    t0 = time.perf_counter()
+    all_leads = sm.get_leads()
+    _report("get_leads (paged, lazy)", ws, time.perf_counter() - t0, f"{len(all_leads):,} rows")
+
+    # 5. Batched edits through the cached row map
+    ws.calls = ws.sent_bytes = 0
+    t0 = time.perf_counter()
+    ok = sm.update_leads({lead["id"]: {"Status": "Active", "Value": 250} for lead in all_leads[:200]})
+    _report("update_leads (200 leads)", ws, time.perf_counter() - t0)
+    # A failed write must not pass as a fast one
+    assert ok, "update_leads failed"
+    updated = [r for r in ws.rows[1:] if r[5] == "Active" and r[10] == "250"]
+    assert len(updated) == min(200, len(all_leads)), f"only {len(updated)} of the updates landed"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    args = parser.parse_args()
+    run(args.rows, args.latency_ms / 1000)
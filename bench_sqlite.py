@@ -0,0 +1,109 @@
+"""
+Micro-benchmark for the local SQLite backend in db_manager.
+
+Loads 100k leads across 1k users into a throwaway database, then measures
+write throughput (add_lead with its duplicate check, status updates) and
+read throughput (get_leads per user, full and projected).
+
+Usage: python bench_sqlite.py [--users 1000] [--leads-per-user 100]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import db_manager as db
+
+SECTORS = ["Motorcycle dealers", "Transport & haulage", "Precision engineering & CNC", "Oil, lubricants & chemicals"]
+STATUSES = ["Pipeline", "Active", "Call Booked", "Proposal", "Secured", "Lost"]
+
+
+def _rate(count, seconds):
+    return f"{count:>8,} ops in {seconds:6.2f}s  ->  {count / seconds:>10,.0f} ops/s"
+
+
+def run(users, leads_per_user, sample_reads):
+    tmp_dir = tempfile.mkdtemp(prefix="sf_bench_")
+    db.DB_FILE = os.path.join(tmp_dir, "bench.db")
+    rng = random.Random(42)
+
+    try:
+        db.init_db()
+
+        # Users
+        conn = db.get_pool().acquire()
+        conn.executemany(
+            "INSERT INTO users (email, name, profile_json) VALUES (?, ?, ?)",
+            [(f"rider{u}@example.com", f"Rider {u}", "{}") for u in range(users)]
+        )
+        conn.commit()
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+        db.get_pool().release(conn)
+
+        print(f"SQLite benchmark: {users:,} users x {leads_per_user:,} leads = {users * leads_per_user:,} leads")
+        print(f"Database: {db.DB_FILE}\n")
+
+        # 1. Writes: add_lead (duplicate check + insert, one transaction each)
+        t0 = time.perf_counter()
+        lead_ids = []
+        for uid in user_ids:
+            for i in range(leads_per_user):
+                notes = {"email": f"info@biz{uid}-{i}.co.uk", "outreach_step": rng.randint(-1, 5)}
+                lead_ids.append(db.add_lead(
+                    uid, f"Business {uid}-{i}", rng.choice(SECTORS), "Silverstone, UK",
+                    website=f"https://biz{uid}-{i}.co.uk", status=rng.choice(STATUSES),
+                    notes_json=json.dumps(notes)
+                ))
+        print("add_lead            ", _rate(len(lead_ids), time.perf_counter() - t0))
+
+        # 2. Duplicate check only (every insert is rejected)
+        sample = rng.sample(user_ids, min(sample_reads, len(user_ids)))
+        t0 = time.perf_counter()
+        for uid in sample:
+            db.add_lead(uid, f"Business {uid}-0", SECTORS[0], "Silverstone, UK")
+        print("add_lead (duplicate)", _rate(len(sample), time.perf_counter() - t0))
+
+        # 3. Point updates
+        update_sample = rng.sample(lead_ids, min(sample_reads * 10, len(lead_ids)))
+        t0 = time.perf_counter()
+        for lid in update_sample:
+            db.update_lead_status(lid, "Active", "2026-01-01")
+        print("update_lead_status  ", _rate(len(update_sample), time.perf_counter() - t0))
+
+        # 4. Batched updates (one transaction)
+        t0 = time.perf_counter()
+        with db.LeadUpdates() as batch:
+            for lid in update_sample:
+                batch.set_status(lid, "Proposal").set_value(lid, 500)
+        print("LeadUpdates (batch) ", _rate(len(update_sample), time.perf_counter() - t0))
+
+        # 5. Reads: full lead list per user
+        t0 = time.perf_counter()
+        rows = 0
+        for uid in sample:
+            rows += len(db.get_leads(uid))
+        elapsed = time.perf_counter() - t0
+        print("get_leads (full)    ", _rate(len(sample), elapsed), f"  ({rows / elapsed:,.0f} rows/s)")
+
+        # 6. Reads: projected (names + status only)
+        t0 = time.perf_counter()
+        rows = 0
+        for uid in sample:
+            rows += len(db.get_leads(uid, fields=["Business Name", "Status"]))
+        elapsed = time.perf_counter() - t0
+        print("get_leads (project) ", _rate(len(sample), elapsed), f"  ({rows / elapsed:,.0f} rows/s)")
+    finally:
+        db.get_pool().close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--leads-per-user", type=int, default=100)
+    parser.add_argument("--sample-reads", type=int, default=200)
+    args = parser.parse_args()
+    run(args.users, args.leads_per_user, args.sample_reads)
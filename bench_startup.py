@@ -0,0 +1,107 @@
+"""
+Cold-start check for app.py.
+
+Imports the modules app.py imports at the top (read from its source, so the
+list never drifts) in fresh interpreters, and reports the wall time and the
+slowest modules from python -X importtime. Fails (exit code 1) when the
+median cold start goes over the budget, or when a module that should only
+load with its tab (Playwright, search providers, gspread, pdfplumber...)
+gets pulled in at startup.
+
+Usage: python bench_startup.py [--repeat 5] [--budget 2.5] [--top 15]
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Loaded on first use by the tab or feature that needs them, never at startup
+LAZY_MODULES = [
+    "playwright", "facebook_finder", "search_service", "enrichment_service", "outscraper",
+    "streamlit_calendar", "gspread", "google.oauth2", "diskcache", "pdfplumber",
+]
+
+DEFAULT_BUDGET = 2.5  # seconds
+
+
+def startup_imports(app_file=APP_FILE):
+    """Import statements at the top level of app.py (not inside tabs or functions), as source lines."""
+    with open(app_file, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def _probe_script(imports):
+    lines = ["import sys, time, json", "_t = time.perf_counter()"] + imports
+    lines.append("print(json.dumps({'seconds': time.perf_counter() - _t, 'modules': sorted(sys.modules)}))")
+    return "\n".join(lines)
+
+
+def cold_start(imports, importtime=False):
+    """Runs the imports in a fresh interpreter. Returns (seconds, loaded modules, importtime stderr)."""
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", _probe_script(imports)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=os.path.dirname(APP_FILE))
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result["seconds"], set(result["modules"]), proc.stderr
+
+
+def slowest(importtime_log, top):
+    """(cumulative seconds, module) for the top-level imports with the largest cumulative time."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # top-level import of the probe, not a nested one
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run(repeat, budget, top):
+    imports = startup_imports()
+    print(f"{len(imports)} startup imports in app.py")
+
+    times = []
+    try:
+        for _ in range(repeat):
+            seconds, modules, _ = cold_start(imports)
+            times.append(seconds)
+    except RuntimeError as e:
+        print(f"FAIL: app.py's startup imports don't load: {e}")
+        return False
+    median = statistics.median(times)
+    print(f"Cold start: median {median:.3f}s  (min {min(times):.3f}s, max {max(times):.3f}s, {repeat} runs)")
+
+    _, modules, log = cold_start(imports, importtime=True)
+    print(f"\nSlowest imports ({len(modules)} modules loaded):")
+    for seconds, name in slowest(log, top):
+        print(f"  {seconds:7.3f}s  {name}")
+
+    failures = []
+    eager = [m for m in LAZY_MODULES if m in modules]
+    if eager:
+        failures.append(f"loaded at startup but should be lazy: {', '.join(eager)}")
+    if median > budget:
+        failures.append(f"cold start {median:.3f}s is over the {budget:.2f}s budget")
+    print()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: within {budget:.2f}s and no lazy modules loaded")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Max median cold start, in seconds")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.repeat, args.budget, args.top) else 1)
@@ -1,10 +1,29 @@
 
-import diskcache as dc
 import os
+import threading
 
-# Initialize DiskCache
-# Stores cache in a .cache directory
-cache = dc.Cache(".cache")
+CACHE_DIR = ".cache"
+# Bump to flush results cached before a change in what searches store
+CACHE_VERSION_FILE = os.path.join(CACHE_DIR, "_v4_socials")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Opens the DiskCache (in a .cache directory) on first use.
+    On the first open after a deploy, flushes old non-enriched results.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            import diskcache as dc
+            _cache = dc.Cache(CACHE_DIR)
+            if not os.path.exists(CACHE_VERSION_FILE):
+                _cache.clear()
+                with open(CACHE_VERSION_FILE, "w") as f:
+                    f.write("cleared")
+        return _cache
 
 def get_cached_search(query, location, radius, limit=100, skip=0):
     """
@@ -16,7 +35,7 @@ def get_cached_search(query, location, radius, limit=100, skip=0):
     norm_loc = (location or "").lower().strip()
     key = f"search_v3e:{norm_query}:{norm_loc}:{radius}:{limit}:{skip}"
 
-    result = cache.get(key)
+    result = get_cache().get(key)
     if result:
         return result
     return None
@@ -29,7 +48,7 @@ def set_cached_search(query, location, radius, limit, skip, data, expire=604800)
     norm_loc = (location or "").lower().strip()
     key = f"search_v3e:{norm_query}:{norm_loc}:{radius}:{limit}:{skip}"
 
-    cache.set(key, data, expire=expire)
+    get_cache().set(key, data, expire=expire)
 
 def clear_cache():
-    cache.clear()
+    get_cache().clear()
@@ -0,0 +1,101 @@
+import json
+from datetime import datetime
+
+import pandas as pd
+
+from lead_model import LazyLead
+
+# Statuses that close a lead (excluded from "due" and the active pipeline)
+CLOSED_STATUSES = ["Secured", "Lost"]
+
+# Fields that feed the dashboard (Notes is hashed raw, without decoding)
+_VERSION_FIELDS = ("id", "Business Name", "Sector", "Status", "Contact Name", "Last Contact", "Next Action", "Value")
+
+
+def lead_set_version(leads):
+    """
+    Cheap fingerprint of a lead list: changes whenever any lead is added,
+    removed or edited (including its notes), so derived analytics can be reused.
+    """
+    rows = []
+    for lead in leads:
+        # dict.get skips LazyLead's decoding; Notes go in as their raw JSON string
+        rows.extend(dict.get(lead, key) for key in _VERSION_FIELDS)
+        rows.append(lead.raw_notes() if isinstance(lead, LazyLead)
+                    else json.dumps(lead.get("Notes"), sort_keys=True, default=str))
+    try:
+        return hash(tuple(rows))
+    except TypeError:  # an unhashable field value (e.g. a list from a custom column)
+        return hash(tuple(map(str, rows)))
+
+
+class LeadAnalytics:
+    """
+    Dashboard stats and filtered views for one lead-set version.
+    The DataFrame is built once with typed columns (Next Action as datetime,
+    Status as categorical, Value as float); views and anything else derived
+    from it are memoized, so reruns (filter clicks, view toggles) reuse them.
+    Views are shared - copy before mutating.
+    """
+
+    def __init__(self, leads, today=None):
+        self.today = pd.Timestamp(today or datetime.now().date())
+        df = pd.DataFrame(leads)
+        df["Next Action"] = pd.to_datetime(df["Next Action"], errors="coerce")
+        df["Value"] = pd.to_numeric(df["Value"] if "Value" in df else 0, errors="coerce").fillna(0)
+        df["Status"] = df["Status"].astype("category")
+        self.df = df
+        self._memo = {}
+
+        status = df["Status"]
+        self.secured_mask = (status == "Secured").to_numpy()
+        self.active_mask = (~status.isin(CLOSED_STATUSES)).to_numpy()
+        # Due Today or Overdue (dates are midnight, so <= today covers the whole day)
+        self.due_mask = ((df["Next Action"] < self.today + pd.Timedelta(days=1)) & self.active_mask).to_numpy()
+
+        self.num_due = int(self.due_mask.sum())
+        self.num_active = int((status == "Active").sum())
+        self.num_secured = int(self.secured_mask.sum())
+        self.count_pipeline = int(self.active_mask.sum())
+        self.total_revenue = float(df.loc[self.secured_mask, "Value"].sum())
+        self.status_values = [s for s in status.unique().tolist() if pd.notnull(s)]
+
+    def memo(self, key, build):
+        """Returns build() the first time key is requested for this lead set."""
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    def view(self, dashboard_filter="All"):
+        """Leads for a quick filter ("All", "Pipeline", "Secured"), sorted by Next Action."""
+        def build():
+            if dashboard_filter == "Pipeline":
+                df = self.df[self.active_mask]
+            elif dashboard_filter == "Secured":
+                df = self.df[self.secured_mask]
+            else:
+                df = self.df
+            return df.sort_values(by="Next Action")
+        return self.memo(("view", dashboard_filter), build)
+
+    def status_view(self, statuses):
+        """Leads whose Status is in statuses (all leads when empty), sorted by Next Action."""
+        key = ("status_view", tuple(sorted(statuses or [])))
+        def build():
+            df = self.df[self.df["Status"].isin(statuses)] if statuses else self.df
+            return df.sort_values(by="Next Action")
+        return self.memo(key, build)
+
+
+def get_lead_analytics(leads, cache):
+    """
+    Returns LeadAnalytics for leads, reusing the one stored in cache (e.g.
+    st.session_state) while the lead set and the date are unchanged.
+    """
+    key = (lead_set_version(leads), datetime.now().date())
+    cached = cache.get("lead_analytics")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    analytics = LeadAnalytics(leads)
+    cache["lead_analytics"] = (key, analytics)
+    return analytics
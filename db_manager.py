@@ -1,33 +1,171 @@
 import sqlite3
 import json
-from datetime import datetime
+import copy
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
 import streamlit as st
-from sheets_manager import sheet_manager
+from sheets_manager import manager_for, sheet_manager
 from airtable_manager import airtable_manager
+from lead_model import LazyLead, parse_notes, project_lead
+from recipient_index import RecipientIndex
 
 DB_FILE = "sponsor_finder.db"
 
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # Create Users Table
+# --- PROFILE CACHE ---
+# get_user_profile runs on every rerun (and inside add_lead/get_leads), and each
+# call used to hit Airtable's Users table. Results are kept briefly per process.
+PROFILE_CACHE_TTL = 60  # seconds
+
+_cache_lock = threading.Lock()
+_airtable_users = {}    # normalized email -> (expires_at, Airtable user dict)
+_profiles_by_id = {}    # local user id -> (expires_at, profile dict)
+_airtable_record_ids = {}  # normalized email -> Airtable Users Record ID
+
+def _email_key(email):
+    return (email or "").strip().lower()
+
+def _cache_get(store, key):
+    with _cache_lock:
+        hit = store.get(key)
+        if hit and hit[0] > time.time():
+            return copy.deepcopy(hit[1])
+        store.pop(key, None)
+    return None
+
+def _cache_put(store, key, value):
+    with _cache_lock:
+        store[key] = (time.time() + PROFILE_CACHE_TTL, copy.deepcopy(value))
+
+def _fetch_airtable_user(email):
+    """Airtable user lookup by email, cached for PROFILE_CACHE_TTL seconds."""
+    key = _email_key(email)
+    at_user = _cache_get(_airtable_users, key)
+    if at_user:
+        return at_user
+    at_user = airtable_manager.get_user_by_email(email)
+    if at_user:
+        _cache_put(_airtable_users, key, at_user)
+        with _cache_lock:
+            _airtable_record_ids[key] = at_user.get("id")
+    return at_user
+
+def invalidate_profile_cache(email=None, user_id=None):
+    """Drops cached profile data for a user (call after any profile write)."""
+    with _cache_lock:
+        if email:
+            _airtable_users.pop(_email_key(email), None)
+            for uid, (_, prof) in list(_profiles_by_id.items()):
+                if _email_key(prof.get("email")) == _email_key(email):
+                    _profiles_by_id.pop(uid, None)
+        if user_id is not None:
+            _profiles_by_id.pop(user_id, None)
+
+# --- CONNECTION POOL ---
+# Streamlit serves every session from worker threads, so connections are shared
+# through a small pool instead of being opened and closed for each statement.
+# Reusing connections also keeps sqlite3's per-connection prepared statement
+# cache warm across calls.
+POOL_SIZE = 8
+
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",      # readers don't block the writer
+    "PRAGMA synchronous=NORMAL",    # safe with WAL, far fewer fsyncs
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",     # ~16 MB page cache per connection
+    "PRAGMA busy_timeout=5000",
+]
+
+class ConnectionPool:
+    """Fixed-size, thread-safe pool of SQLite connections for one database file."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, cached_statements=256)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
 
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._open()
+        return self._idle.get()
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+    @contextmanager
+    def connection(self):
+        """Yields a pooled connection; commits on success, rolls back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+_pool = None
+_pool_guard = threading.Lock()
+
+def get_pool():
+    """Returns the pool for the current DB_FILE (rebuilt if DB_FILE changes)."""
+    global _pool
+    with _pool_guard:
+        if _pool is None or _pool.path != DB_FILE:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_FILE)
+        return _pool
+
+def _db():
+    return get_pool().connection()
+
+# --- SCHEMA MIGRATIONS ---
+# Each migration runs once, in order, and is recorded in schema_version.
+# Databases created before versioning are brought up by migration 1, which
+# only adds what is missing.
+
+def _table_columns(c, table):
+    return {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+
+def _migration_base_schema(c):
     c.execute('''CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     email TEXT UNIQUE,
                     name TEXT,
                     profile_json TEXT
                 )''')
-    
-    # Simple migration: Add email column if it doesn't exist (for existing dev sets)
-    try:
+    if "email" not in _table_columns(c, "users"):
         c.execute("ALTER TABLE users ADD COLUMN email TEXT")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
-    
-    # Create Leads Table
+
     c.execute('''CREATE TABLE IF NOT EXISTS leads (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER,
@@ -40,39 +178,139 @@ def init_db():
                     last_contact_date TEXT,
                     next_action_date TEXT,
                     notes_json TEXT,
+                    value REAL DEFAULT 0,
                     FOREIGN KEY(user_id) REFERENCES users(id)
                 )''')
-    
-    # Simple migration: Add email column if it doesn't exist (for existing dev sets)
-    try:
-        c.execute("ALTER TABLE users ADD COLUMN email TEXT")
-    except sqlite3.OperationalError:
-        pass # Column likely exists
-
-    # Migration: Add website if missing
-    try:
+    lead_cols = _table_columns(c, "leads")
+    if "website" not in lead_cols:
         c.execute("ALTER TABLE leads ADD COLUMN website TEXT")
-    except sqlite3.OperationalError:
-        pass
-
-    # Migration: Add value (revenue) if missing
-    try:
+    if "value" not in lead_cols:
         c.execute("ALTER TABLE leads ADD COLUMN value REAL DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass
 
-    conn.commit()
-    conn.close()
+def _migration_lead_indexes(c):
+    # get_leads: WHERE user_id=? ORDER BY id DESC (rowid rides along in the index)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_leads_user ON leads(user_id)")
+    # add_lead duplicate check: WHERE business_name=? AND user_id=?
+    c.execute("CREATE INDEX IF NOT EXISTS idx_leads_user_business ON leads(user_id, business_name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+
+# Frequently read notes keys, exposed as JSON1 generated columns so the mailer
+# and dashboard can filter in SQL. json_valid() guards against legacy rows whose
+# notes are not JSON (json_extract would raise on them).
+NOTES_GENERATED_COLUMNS = [
+    ("notes_email", "TEXT", "json_extract(notes_json, '$.email')"),
+    ("notes_emails", "TEXT", "json_extract(notes_json, '$.emails')"),
+    ("notes_outreach_step", "INTEGER", "CAST(json_extract(notes_json, '$.outreach_step') AS INTEGER)"),
+    ("notes_salutation", "TEXT", "json_extract(notes_json, '$.salutation')"),
+    ("notes_has_email", "INTEGER",
+     "instr(COALESCE(json_extract(notes_json, '$.email'), ''), '@') > 0"
+     " OR instr(COALESCE(json_extract(notes_json, '$.emails'), ''), '@') > 0"),
+]
+
+def _migration_notes_generated_columns(c):
+    existing = _table_columns_all(c, "leads")
+    for name, col_type, expr in NOTES_GENERATED_COLUMNS:
+        if name not in existing:
+            c.execute(f"ALTER TABLE leads ADD COLUMN {name} {col_type} "
+                      f"GENERATED ALWAYS AS (CASE WHEN json_valid(notes_json) THEN ({expr}) END) VIRTUAL")
+    # Bulk Mailer: leads with email for a user, by status / due date
+    c.execute("CREATE INDEX IF NOT EXISTS idx_leads_user_email_status ON leads(user_id, notes_has_email, status)")
+    # Dashboard / follow-ups: due before a date
+    c.execute("CREATE INDEX IF NOT EXISTS idx_leads_user_next_action ON leads(user_id, next_action_date)")
+
+def _table_columns_all(c, table):
+    # table_xinfo also lists generated (hidden) columns
+    return {row[1] for row in c.execute(f"PRAGMA table_xinfo({table})")}
+
+def _migration_outbox(c):
+    # Offline-first write queue (see OFFLINE-FIRST OUTBOX below)
+    c.execute('''CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    backend TEXT NOT NULL,
+                    op TEXT NOT NULL,
+                    lead_id TEXT NOT NULL,
+                    user_id INTEGER,
+                    payload TEXT,
+                    created_at REAL NOT NULL,
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL DEFAULT 0,
+                    last_error TEXT,
+                    state TEXT DEFAULT 'pending'
+                )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outbox_state ON outbox(state, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outbox_lead ON outbox(lead_id)")
+    # Temp IDs handed out for queued adds -> the ID the backend assigned
+    c.execute('''CREATE TABLE IF NOT EXISTS outbox_ids (
+                    temp_id TEXT PRIMARY KEY,
+                    remote_id TEXT NOT NULL
+                )''')
+
+def _migration_outbox_conflicts(c):
+    # When this app last pushed each lead, for the conflict check (kept across restarts)
+    c.execute('''CREATE TABLE IF NOT EXISTS outbox_pushes (
+                    backend TEXT NOT NULL,
+                    lead_id TEXT NOT NULL,
+                    pushed_at REAL NOT NULL,
+                    PRIMARY KEY (backend, lead_id)
+                )''')
+    # Set when the user keeps their edit over a newer remote change: skips the conflict check
+    if "force" not in _table_columns(c, "outbox"):
+        c.execute("ALTER TABLE outbox ADD COLUMN force INTEGER DEFAULT 0")
+
+def _migration_outbox_target(c):
+    # The spreadsheet a Sheets entry was queued for: the sync worker shares one SheetManager
+    if "target" not in _table_columns(c, "outbox"):
+        c.execute("ALTER TABLE outbox ADD COLUMN target TEXT")
+
+MIGRATIONS = [
+    (1, _migration_base_schema),
+    (2, _migration_lead_indexes),
+    (3, _migration_notes_generated_columns),
+    (4, _migration_outbox),
+    (5, _migration_outbox_conflicts),
+    (6, _migration_outbox_target),
+]
+
+_initialized_db = None
+_init_lock = threading.Lock()
+
+def init_db():
+    """Applies pending schema migrations. Runs once per process per DB_FILE."""
+    global _initialized_db
+    if _initialized_db == DB_FILE:
+        return
+
+    # One session runs the migrations; sessions starting at the same time wait for it
+    with _init_lock:
+        if _initialized_db == DB_FILE:
+            return
+        with _db() as conn:
+            c = conn.cursor()
+            # One write transaction (DDL included): another process can't migrate
+            # concurrently, and a failed step rolls back with its schema_version row
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+            row = c.execute("SELECT MAX(version) FROM schema_version").fetchone()
+            current = row[0] or 0
+            for version, migrate in MIGRATIONS:
+                if version > current:
+                    migrate(c)
+                    c.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            has_queued_writes = c.execute("SELECT 1 FROM outbox WHERE state='pending' LIMIT 1").fetchone()
+        with _db() as conn:
+            conn.execute("PRAGMA optimize")
+        _initialized_db = DB_FILE
+
+    if has_queued_writes:
+        # Writes left over from a previous process
+        start_sync_worker()
 
 # ... (user functions unchanged)
 
 def get_user_by_email(email):
     # 1. Fetch Local SQLite Data (Baseline)
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, email, name, profile_json FROM users WHERE email=?", (email,))
-    user_local = c.fetchone()
-    conn.close()
+    with _db() as conn:
+        user_local = conn.execute("SELECT id, email, name, profile_json FROM users WHERE email=?", (email,)).fetchone()
 
     local_profile = {}
     local_data = None
@@ -86,7 +324,7 @@ def get_user_by_email(email):
 
     # 2. Fetch Airtable Data (Overwrite/Sync)
     if airtable_manager.is_configured():
-        at_user = airtable_manager.get_user_by_email(email)
+        at_user = _fetch_airtable_user(email)
         if at_user:
             # MERGE STRATEGY: Local < Airtable (Airtable wins)
             # But if Airtable profile is empty, keep local!
@@ -110,13 +348,10 @@ def get_user_by_email(email):
                 at_email = at_user.get("email", email)
                 at_name = at_user.get("name", "")
                 try:
-                    conn = sqlite3.connect(DB_FILE)
-                    c = conn.cursor()
-                    c.execute("INSERT INTO users (email, name, profile_json) VALUES (?, ?, ?)",
-                              (at_email, at_name, json.dumps(merged_profile)))
-                    local_id = c.lastrowid
-                    conn.commit()
-                    conn.close()
+                    with _db() as conn:
+                        c = conn.execute("INSERT INTO users (email, name, profile_json) VALUES (?, ?, ?)",
+                                         (at_email, at_name, json.dumps(merged_profile)))
+                        local_id = c.lastrowid
                     return {"id": local_id, "email": at_email, "name": at_name, "profile": merged_profile}
                 except Exception as e:
                     print(f"Local cache creation failed: {e}")
@@ -127,11 +362,12 @@ def get_user_by_email(email):
 
 def get_user_profile(user_id):
     # Retrieve by ID (usually from session state)
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, email, name, profile_json FROM users WHERE id=?", (user_id,))
-    user = c.fetchone()
-    conn.close()
+    cached = _cache_get(_profiles_by_id, user_id)
+    if cached:
+        return cached
+
+    with _db() as conn:
+        user = conn.execute("SELECT id, email, name, profile_json FROM users WHERE id=?", (user_id,)).fetchone()
     
     if user:
         email = user[1]
@@ -144,14 +380,16 @@ def get_user_profile(user_id):
             
         # Check Airtable for updates
         if airtable_manager.is_configured():
-             at_user = airtable_manager.get_user_by_email(email)
+             at_user = _fetch_airtable_user(email)
              if at_user:
                  at_profile = at_user.get("profile", {})
                  # Merge: Update local with non-empty Airtable values
                  for k, v in at_profile.items():
                      if v: local_profile[k] = v
         
-        return {"id": user[0], "email": email, "name": name, "profile": local_profile}
+        result = {"id": user[0], "email": email, "name": name, "profile": local_profile}
+        _cache_put(_profiles_by_id, user_id, result)
+        return result
     
     return None
 
@@ -161,8 +399,10 @@ def save_user_profile(email, name, profile_data):
 
     # 1. Save to Airtable (with retry + verification)
     if airtable_manager.is_configured():
+        with _cache_lock:
+            record_id = _airtable_record_ids.get(_email_key(email))
         try:
-            result = airtable_manager.save_user_profile(email, name, profile_data)
+            result = airtable_manager.save_user_profile(email, name, profile_data, record_id=record_id)
             # Handle both old (bool) and new (tuple) return formats
             if isinstance(result, tuple):
                 airtable_ok, airtable_error = result
@@ -193,32 +433,31 @@ def save_user_profile(email, name, profile_data):
             except:
                 pass
             print(f"Airtable save failed for {email}: {airtable_error}")
+            # The cached record ID may be stale — look it up again next time
+            with _cache_lock:
+                _airtable_record_ids.pop(_email_key(email), None)
 
     # 2. Save to Local SQLite (ALWAYS — serves as backup/cache)
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
     try:
-        # Check if user exists
-        c.execute("SELECT id FROM users WHERE email=?", (email,))
-        exists = c.fetchone()
-        
-        profile_json = json.dumps(profile_data)
-        
-        if exists:
-            user_id = exists[0]
-            c.execute("UPDATE users SET name=?, profile_json=? WHERE email=?", (name, profile_json, email))
-        else:
-            c.execute("INSERT INTO users (email, name, profile_json) VALUES (?, ?, ?)", (email, name, profile_json))
-            user_id = c.lastrowid
-        
-        conn.commit()
+        with _db() as conn:
+            c = conn.cursor()
+            # Check if user exists
+            c.execute("SELECT id FROM users WHERE email=?", (email,))
+            exists = c.fetchone()
+            
+            profile_json = json.dumps(profile_data)
+            
+            if exists:
+                user_id = exists[0]
+                c.execute("UPDATE users SET name=?, profile_json=? WHERE email=?", (name, profile_json, email))
+            else:
+                c.execute("INSERT INTO users (email, name, profile_json) VALUES (?, ?, ?)", (email, name, profile_json))
+                user_id = c.lastrowid
     except Exception as e:
         print(f"Local SQLite save error: {e}")
         user_id = None
-    finally:
-        conn.close()
     
+    invalidate_profile_cache(email=email, user_id=user_id)
     return user_id
 
 def add_lead(user_id, business_name, sector, location, website="", status="Pipeline", notes_json="{}", next_action_date=None, contact_name="", last_contact_date="Never", value=0):
@@ -256,9 +495,12 @@ def add_lead(user_id, business_name, sector, location, website="", status="Pipel
                 "Notes": notes_dict,
                 "Value": value
             }
+             queued = _queue_lead_add(user_id, data, user_email)
+             if queued is not None:
+                 return _lead_added(user_id, queued, data)
              at_result = airtable_manager.add_lead(user_email, data)
              if at_result:
-                 return at_result
+                 return _lead_added(user_id, at_result, data)
              else:
                  st.warning("⚠️ Failed to save to Airtable. Saving locally instead...")
         else:
@@ -286,18 +528,11 @@ def add_lead(user_id, business_name, sector, location, website="", status="Pipel
             "Notes": notes_dict,
             "Value": value
         }
-        return sheet_manager.add_lead(data)
+        queued = _queue_lead_add(user_id, data)
+        if queued is not None:
+            return _lead_added(user_id, queued, data)
+        return _lead_added(user_id, sheet_manager.add_lead(data), data)
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # Avoid duplicates based on business name
-    c.execute("SELECT id FROM leads WHERE business_name=? AND user_id=?", (business_name, user_id))
-    existing = c.fetchone()
-    if existing:
-        conn.close()
-        return False # Duplicate
-    
     # Ensure notes is a string
     if isinstance(notes_json, dict):
         notes_json = json.dumps(notes_json)
@@ -306,20 +541,100 @@ def add_lead(user_id, business_name, sector, location, website="", status="Pipel
         next_action_date = datetime.now().strftime("%Y-%m-%d")
 
     try:
-        c.execute('''INSERT INTO leads (user_id, business_name, sector, location, website, status, contact_name, last_contact_date, next_action_date, notes_json, value)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                  (user_id, business_name, sector, location, website, status, contact_name, last_contact_date, next_action_date, notes_json, value))
-        
-        new_id = c.lastrowid
-        conn.commit()
-        conn.close()
-        return new_id
+        with _db() as conn:
+            c = conn.cursor()
+            # Avoid duplicates based on business name
+            c.execute("SELECT id FROM leads WHERE business_name=? AND user_id=?", (business_name, user_id))
+            if c.fetchone():
+                return False # Duplicate
+
+            c.execute('''INSERT INTO leads (user_id, business_name, sector, location, website, status, contact_name, last_contact_date, next_action_date, notes_json, value)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                      (user_id, business_name, sector, location, website, status, contact_name, last_contact_date, next_action_date, notes_json, value))
+            lead_id = c.lastrowid
     except Exception as e:
         st.error(f"❌ Local Database Error: {e}")
-        conn.close()
         return False
+    return _lead_added(user_id, lead_id, {
+        "Business Name": business_name, "Sector": sector, "Status": status,
+        "Contact Name": contact_name, "Next Action": next_action_date, "Notes": notes_json
+    })
+
+def _lead_added(user_id, lead_id, data):
+    """Registers a successful add with the recipient index; passes the add_lead result through."""
+    if lead_id:
+        _recipient_index_add(user_id, lead_id, data)
+    return lead_id
+
+def _user_email(user_id):
+    """The user's email for Airtable, falling back to the session (ephemeral SQLite on Cloud)."""
+    user = get_user_profile(user_id)
+    return (user or {}).get("email") or st.session_state.get("user_email", "")
+
+def add_leads_bulk(user_id, leads, progress=None):
+    """
+    Inserts a batch of new leads with the backend's bulk write: Airtable
+    batch create, Sheets append_rows, one SQLite executemany. Used by the CSV
+    import, which dedupes first, so no per-lead duplicate check is made here
+    and the outbox is bypassed (a failed import is simply re-run).
+    leads: list of lead dicts (Business Name, Sector, Address, Website, Contact Name, Notes...)
+    progress: optional callback(added, total)
+    Returns (number added, error message or None).
+    """
+    if not leads:
+        return 0, None
+
+    try:
+        if airtable_manager.is_configured():
+            user_email = _user_email(user_id)
+            if not user_email:
+                return 0, "Airtable Configured but User Email not found in DB."
+            return airtable_manager.add_leads_bulk(user_email, leads, progress=progress)
 
-def get_leads(user_id):
+        if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
+            ok, msg = sheet_manager.add_leads_bulk(leads, progress=progress)
+            return sheet_manager.last_bulk_added, (None if ok else msg)
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        rows = [
+            (user_id, l.get("Business Name", ""), l.get("Sector", ""), l.get("Address", ""), l.get("Website", ""),
+             l.get("Status", "Pipeline"), l.get("Contact Name", ""), l.get("Last Contact", "Never"),
+             l.get("Next Action") or today, json.dumps(l.get("Notes", {})), l.get("Value", 0))
+            for l in leads
+        ]
+        try:
+            with _db() as conn:
+                conn.executemany('''INSERT INTO leads (user_id, business_name, sector, location, website, status, contact_name, last_contact_date, next_action_date, notes_json, value)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+        except Exception as e:
+            return 0, f"Local Database Error: {e}"
+        if progress:
+            progress(len(rows), len(rows))
+        return len(rows), None
+    finally:
+        invalidate_recipient_index(user_id)
+
+# App-level lead key -> SQLite column (used for projected reads)
+LEAD_COLUMNS = {
+    "Business Name": "business_name",
+    "Sector": "sector",
+    "Address": "location",
+    "Status": "status",
+    "Contact Name": "contact_name",
+    "Last Contact": "last_contact_date",
+    "Next Action": "next_action_date",
+    "Notes": "notes_json",
+    "Website": "website",
+    "Value": "value",
+}
+
+def get_leads(user_id, fields=None):
+    """
+    Returns the user's leads from the active backend.
+    fields: optional list of app-level keys (e.g. ["Business Name", "Status"]).
+    Only those are fetched (Airtable fields[] / SQL column list) and "id" is
+    always included. Notes JSON is decoded lazily on first access.
+    """
     if airtable_manager.is_configured():
         user = get_user_profile(user_id)
         email = None
@@ -331,122 +646,1108 @@ def get_leads(user_id):
             email = st.session_state.get("user_email", "")
         
         if email:
-            return airtable_manager.get_leads(email)
+            return _with_pending(airtable_manager.get_leads(email, fields=fields), user_id, fields)
 
     if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
-        return sheet_manager.get_leads()
+        return _with_pending(sheet_manager.get_leads(fields=fields), user_id, fields)
+
+    wanted = [k for k in (fields if fields is not None else LEAD_COLUMNS) if k in LEAD_COLUMNS]
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
     # Explicit Select to handle schema variations safely
     # Note: 'website' might obtain NULL if not filled, which is fine.
-    try:
-        c.execute('''SELECT id, business_name, sector, location, status, contact_name, last_contact_date, next_action_date, notes_json, website, value 
-                     FROM leads WHERE user_id=? ORDER BY id DESC''', (user_id,))
-    except sqlite3.OperationalError:
-        # Fallback if website col doesn't exist (migration failed?)
-        try:
-             # Website exists but value doesnt
-             c.execute('''SELECT id, business_name, sector, location, status, contact_name, last_contact_date, next_action_date, notes_json, website, 0 
-                          FROM leads WHERE user_id=? ORDER BY id DESC''', (user_id,))
-        except:
-             # neither exists
-             c.execute('''SELECT id, business_name, sector, location, status, contact_name, last_contact_date, next_action_date, notes_json, "", 0 
-                          FROM leads WHERE user_id=? ORDER BY id DESC''', (user_id,))
-        
-    rows = c.fetchall()
-    conn.close()
+    columns = ", ".join(["id"] + [LEAD_COLUMNS[k] for k in wanted])
+    with _db() as conn:
+        rows = conn.execute(f"SELECT {columns} FROM leads WHERE user_id=? ORDER BY id DESC", (user_id,)).fetchall()
     
-    leads = []
-    for r in rows:
-        website_val = r[9] if r[9] else ""
-        value_val = r[10] if len(r) > 10 and r[10] else 0
-        
-        leads.append({
-            "id": r[0],
-            "Business Name": r[1],
-            "Sector": r[2],
-            "Address": r[3],
-            "Status": r[4],
-            "Contact Name": r[5],
-            "Last Contact": r[6],
-            "Next Action": r[7],
-            "Notes": json.loads(r[8]) if r[8] else {},
-            "Website": website_val,
-            "Value": value_val
+    return [_row_to_lead(r, wanted) for r in rows]
+
+def _row_to_lead(row, wanted):
+    """Converts a (id, *wanted columns) SQLite row into an app lead."""
+    values = dict(zip(wanted, row[1:]))
+    raw_notes = values.pop("Notes", None)
+    if "Website" in values:
+        values["Website"] = values["Website"] or ""
+    if "Value" in values:
+        values["Value"] = values["Value"] or 0
+    return project_lead(row[0], values, wanted, raw_notes or "")
+
+# --- SINGLE-LEAD LOOKUPS ---
+# Contact cards and the Strategy tab need one lead, not the whole list.
+# get_lead() reads it by ID (Airtable record GET, Sheets row map, SQLite
+# primary key), returns it only if it belongs to the user (User Email on
+# Airtable, the session's own sheet on Sheets, user_id on SQLite) and keeps
+# recent leads in a small per-process LRU keyed by user. Writes made
+# through this module update the cached copy; queued writes are overlaid on
+# read like get_leads() does. Edits from other devices appear after the TTL.
+LEAD_CACHE_SIZE = 256
+LEAD_CACHE_TTL = 60  # seconds
+
+_lead_cache = OrderedDict()  # (backend, user_id, str(lead_id)) -> (expires_at, lead)
+
+def _lead_backend():
+    if airtable_manager.is_configured():
+        return "airtable"
+    if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
+        return "sheets"
+    return "sqlite"
+
+def _lead_cache_get(key):
+    with _cache_lock:
+        hit = _lead_cache.get(key)
+        if hit and hit[0] > time.time():
+            _lead_cache.move_to_end(key)
+            return copy.deepcopy(hit[1])
+        _lead_cache.pop(key, None)
+    return None
+
+def _lead_cache_put(key, lead):
+    with _cache_lock:
+        _lead_cache[key] = (time.time() + LEAD_CACHE_TTL, copy.deepcopy(lead))
+        _lead_cache.move_to_end(key)
+        while len(_lead_cache) > LEAD_CACHE_SIZE:
+            _lead_cache.popitem(last=False)
+
+def _lead_cache_keys(lead_ids, backend):
+    """Cached keys for these leads, whichever user they were read for (call with _cache_lock held)."""
+    wanted = {str(lead_id) for lead_id in lead_ids}
+    return [key for key in _lead_cache if key[0] == backend and key[2] in wanted]
+
+def _lead_cache_update(changes, backend=None):
+    """Write-through: applies {lead_id: {app_key: value}} to any cached copies."""
+    backend = backend or _lead_backend()
+    by_id = {str(lead_id): fields for lead_id, fields in changes.items()}
+    with _cache_lock:
+        for key in _lead_cache_keys(by_id, backend):
+            for field, val in by_id[key[2]].items():
+                _lead_cache[key][1][field] = copy.deepcopy(val)
+
+def _lead_cache_drop(lead_ids, backend=None):
+    backend = backend or _lead_backend()
+    with _cache_lock:
+        for key in _lead_cache_keys(lead_ids, backend):
+            _lead_cache.pop(key, None)
+
+def _lead_written(changes, ok=True):
+    """Updates the caches after a direct backend write (drops the entries if it failed)."""
+    if ok is False:
+        _lead_cache_drop(changes)
+        _recipient_index_stale(changes)
+    else:
+        _lead_cache_update(changes)
+        _recipient_index_update(changes)
+    return ok
+
+def _fetch_lead(backend, lead_id, user_id):
+    """The lead if it exists and belongs to the user, else None."""
+    if backend == "airtable":
+        return airtable_manager.get_lead(lead_id, user_email=_user_email(user_id))
+    if backend == "sheets":
+        # Sheets rows have no owner column: the lead is the user's if it is in the sheet this session connected
+        if not st.session_state.get("sheet_url") or sheet_manager.sheet_url != st.session_state.get("sheet_url"):
+            return None
+        return sheet_manager.get_lead(lead_id)
+    wanted = list(LEAD_COLUMNS)
+    columns = ", ".join(["id"] + [LEAD_COLUMNS[k] for k in wanted])
+    with _db() as conn:
+        row = conn.execute(f"SELECT {columns} FROM leads WHERE id=? AND user_id=?", (lead_id, user_id)).fetchone()
+    return _row_to_lead(row, wanted) if row else None
+
+def get_lead(lead_id, user_id):
+    """
+    Returns one of the user's leads by ID from the active backend, or None
+    (also when the ID belongs to another user). Same shape as the items of
+    get_leads() (Notes decoded lazily), including writes still queued for sync.
+    """
+    lead_id = resolve_lead_id(lead_id)
+    backend = _lead_backend()
+    lead = None
+    if str(lead_id).startswith(TEMP_ID_PREFIX):
+        # Temp IDs only exist in the outbox until their add has synced
+        with _db() as conn:
+            owner = conn.execute("SELECT user_id FROM outbox WHERE op='add' AND lead_id=?", (str(lead_id),)).fetchone()
+        if not owner or owner[0] != user_id:
+            return None
+    else:
+        key = (backend, user_id, str(lead_id))
+        lead = _lead_cache_get(key)
+        if lead is None:
+            lead = _fetch_lead(backend, lead_id, user_id)
+            if lead is None:
+                return None
+            _lead_cache_put(key, lead)
+    return _with_pending_lead(lead_id, lead)
+
+def _remote_backend():
+    """True when leads live in Airtable or Google Sheets rather than SQLite."""
+    return airtable_manager.is_configured() or ("use_sheets" in st.session_state and st.session_state["use_sheets"])
+
+def _collect_emails(email, emails_list):
+    """Primary email first, then any extra valid addresses (deduplicated)."""
+    all_emails = []
+    if email and '@' in str(email):
+        all_emails.append(str(email).strip())
+    if isinstance(emails_list, list):
+        for e in emails_list:
+            if e and '@' in str(e) and str(e).strip() not in all_emails:
+                all_emails.append(str(e).strip())
+    return all_emails
+
+def _lead_emails(lead):
+    notes = lead.get('Notes', {})
+    if not isinstance(notes, dict):
+        notes = {}
+    return _collect_emails(notes.get('email', ''), notes.get('emails', []))
+
+def _lead_matches(lead, with_email=None, statuses=None, due_before=None, sectors=None):
+    """Python version of the query_leads filters, for the remote backends."""
+    if statuses is not None and lead.get("Status") not in statuses:
+        return False
+    if sectors is not None and lead.get("Sector") not in sectors:
+        return False
+    if due_before is not None:
+        next_action = lead.get("Next Action")
+        if not next_action or str(next_action) > due_before:
+            return False
+    if with_email is not None and bool(_lead_emails(lead)) != with_email:
+        return False
+    return True
+
+def _lead_filter_sql(with_email=None, statuses=None, due_before=None, sectors=None):
+    clauses, params = [], []
+    if with_email is not None:
+        clauses.append("COALESCE(notes_has_email, 0) = ?")
+        params.append(1 if with_email else 0)
+    if statuses is not None:
+        clauses.append(f"status IN ({', '.join('?' * len(statuses))})" if statuses else "0")
+        params.extend(statuses)
+    if sectors is not None:
+        clauses.append(f"sector IN ({', '.join('?' * len(sectors))})" if sectors else "0")
+        params.extend(sectors)
+    if due_before is not None:
+        clauses.append("next_action_date IS NOT NULL AND next_action_date != '' AND next_action_date <= ?")
+        params.append(due_before)
+    return "".join(f" AND {cl}" for cl in clauses), params
+
+def query_leads(user_id, with_email=None, statuses=None, due_before=None, sectors=None, fields=None):
+    """
+    Filtered lead read, e.g. "leads with email, status in X, due on/before D".
+    with_email: True/False to require/exclude a valid notes email.
+    statuses / sectors: lists of allowed values. due_before: "YYYY-MM-DD" (inclusive).
+    Runs in SQL (generated notes columns + indexes) on the local backend;
+    Airtable and Sheets fetch the projected list and filter in Python.
+    """
+    if _remote_backend():
+        need = None
+        if fields is not None:
+            need = list(dict.fromkeys(list(fields) + ["Status", "Sector", "Next Action"] + (["Notes"] if with_email is not None else [])))
+        leads = get_leads(user_id, fields=need)
+        return [l for l in leads if _lead_matches(l, with_email, statuses, due_before, sectors)]
+
+    wanted = [k for k in (fields if fields is not None else LEAD_COLUMNS) if k in LEAD_COLUMNS]
+    columns = ", ".join(["id"] + [LEAD_COLUMNS[k] for k in wanted])
+    where, params = _lead_filter_sql(with_email, statuses, due_before, sectors)
+    with _db() as conn:
+        rows = conn.execute(f"SELECT {columns} FROM leads WHERE user_id=?{where} ORDER BY id DESC",
+                            [user_id] + params).fetchall()
+    return [_row_to_lead(r, wanted) for r in rows]
+
+LEAD_PAGE_ROWS = 500
+
+def iter_leads(user_id, with_email=None, statuses=None, due_before=None, sectors=None, fields=None, page_size=LEAD_PAGE_ROWS):
+    """
+    Streaming query_leads: yields the matching leads in lists (pages) instead
+    of building one list, for exports of large workspaces. SQLite pages with
+    keyset LIMIT queries, Airtable follows its API offsets (100 records a
+    page) and Sheets reads ranged row pages. Filters as in query_leads.
+    """
+    need = None
+    if fields is not None:
+        need = list(dict.fromkeys(list(fields) + ["Status", "Sector", "Next Action"] + (["Notes"] if with_email is not None else [])))
+    user_email = _user_email(user_id) if airtable_manager.is_configured() else None
+    pages = None
+    if user_email:
+        pages = airtable_manager.iter_lead_pages(user_email, need)
+    elif "use_sheets" in st.session_state and st.session_state["use_sheets"]:
+        pages = sheet_manager.iter_lead_pages(need, page_size=page_size)
+    if pages is not None:
+        for page in _iter_with_pending(pages, user_id, need):
+            page = [l for l in page if _lead_matches(l, with_email, statuses, due_before, sectors)]
+            if page:
+                yield page
+        return
+
+    wanted = [k for k in (fields if fields is not None else LEAD_COLUMNS) if k in LEAD_COLUMNS]
+    columns = ", ".join(["id"] + [LEAD_COLUMNS[k] for k in wanted])
+    where, params = _lead_filter_sql(with_email, statuses, due_before, sectors)
+    after = []
+    while True:
+        # A fresh pooled connection per page, so a slow consumer doesn't hold one
+        with _db() as conn:
+            rows = conn.execute(
+                f"SELECT {columns} FROM leads WHERE user_id=?{where}{' AND id < ?' if after else ''} ORDER BY id DESC LIMIT ?",
+                [user_id] + params + after + [page_size]).fetchall()
+        if not rows:
+            return
+        yield [_row_to_lead(r, wanted) for r in rows]
+        if len(rows) < page_size:
+            return
+        after = [rows[-1][0]]
+
+def count_leads(user_id):
+    """Number of leads the user has (no lead data transferred on SQLite)."""
+    if _remote_backend():
+        return len(get_leads(user_id, fields=["Status"]))
+    with _db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM leads WHERE user_id=?", (user_id,)).fetchone()[0]
+
+def _recipients_from_leads(leads):
+    recipients = []
+    for lead in leads:
+        all_emails = _lead_emails(lead)
+        if not all_emails:
+            continue
+        recipients.append({
+            'id': lead['id'],
+            'name': lead['Business Name'],
+            'contact': lead.get('Contact Name', ''),
+            'sector': lead.get('Sector', ''),
+            'email': all_emails[0],  # Primary email
+            'all_emails': all_emails,
+            'status': lead.get('Status', 'Pipeline'),
+            'next_action': lead.get('Next Action', ''),
+            'notes': lead.get('Notes', {})
         })
-    return leads
+    return recipients
+
+def get_mailer_overview(user_id):
+    """(total lead count, mail recipients) with a single read on remote backends."""
+    if _remote_backend():
+        leads = get_leads(user_id)
+        return len(leads), _recipients_from_leads(leads)
+    return count_leads(user_id), get_mail_recipients(user_id)
+
+def get_mail_recipients(user_id, statuses=None, due_before=None):
+    """
+    Leads that have at least one valid email, shaped for the Bulk Mailer:
+    {id, name, contact, sector, email, all_emails, status, next_action, notes}.
+    On SQLite only matching rows are read and "notes" is decoded lazily.
+    """
+    if _remote_backend():
+        return _recipients_from_leads(query_leads(user_id, with_email=True, statuses=statuses, due_before=due_before))
+
+    where, params = _lead_filter_sql(True, statuses, due_before)
+    with _db() as conn:
+        rows = conn.execute(f"""SELECT id, business_name, contact_name, sector, status, next_action_date,
+                                       notes_email, notes_emails, notes_json
+                                FROM leads WHERE user_id=?{where} ORDER BY id DESC""",
+                            [user_id] + params).fetchall()
+
+    recipients = []
+    for lid, name, contact, sector, status, next_action, email, emails_raw, notes_raw in rows:
+        try:
+            emails_list = json.loads(emails_raw) if emails_raw else []
+        except ValueError:
+            emails_list = []
+        all_emails = _collect_emails(email, emails_list)
+        if not all_emails:
+            continue
+        recipients.append(LazyLead({
+            'id': lid,
+            'name': name,
+            'contact': contact or '',
+            'sector': sector or '',
+            'email': all_emails[0],  # Primary email
+            'all_emails': all_emails,
+            'status': status or 'Pipeline',
+            'next_action': next_action or '',
+        }, notes_raw or "", lazy_key="notes"))
+    return recipients
+
+# --- MAIL RECIPIENT INDEX ---
+# The Bulk Mailer filters and batches the same recipient list on every rerun.
+# get_recipient_index() builds a RecipientIndex once per user; lead writes in
+# this module then update it in place, so reruns never re-read or re-parse
+# the leads. Edits from other devices appear after the TTL.
+RECIPIENT_INDEX_TTL = 300  # seconds
+
+_recipient_indexes = {}  # (backend, user_id) -> (expires_at, RecipientIndex)
+
+# App-level lead key -> recipient key
+RECIPIENT_KEYS = {
+    "Business Name": "name",
+    "Contact Name": "contact",
+    "Sector": "sector",
+    "Status": "status",
+    "Next Action": "next_action",
+}
+
+def get_recipient_index(user_id):
+    """RecipientIndex of the user's leads with an email (see recipient_index.py)."""
+    key = (_lead_backend(), user_id)
+    with _cache_lock:
+        hit = _recipient_indexes.get(key)
+    if hit and hit[0] > time.time() and not hit[1].stale:
+        return hit[1]
+
+    if _remote_backend():
+        leads = get_leads(user_id)
+        index = RecipientIndex(_recipients_from_leads(leads), [l["id"] for l in leads])
+    else:
+        with _db() as conn:
+            lead_ids = [row[0] for row in conn.execute("SELECT id FROM leads WHERE user_id=?", (user_id,))]
+        index = RecipientIndex(get_mail_recipients(user_id), lead_ids)
+    with _cache_lock:
+        _recipient_indexes[key] = (time.time() + RECIPIENT_INDEX_TTL, index)
+    return index
+
+def invalidate_recipient_index(user_id=None):
+    """Forces a rebuild (after writes that bypass this module, e.g. bulk imports)."""
+    with _cache_lock:
+        for (_, uid), (_, index) in _recipient_indexes.items():
+            if user_id is None or uid == user_id:
+                index.stale = True
+
+def _recipient_fields(fields):
+    """Translates app-level lead changes into RecipientIndex.update() fields."""
+    out = {RECIPIENT_KEYS[k]: (v or "") for k, v in fields.items() if k in RECIPIENT_KEYS}
+    if "Notes" in fields:
+        notes = parse_notes(fields["Notes"])
+        all_emails = _lead_emails({"Notes": notes})
+        out.update(notes=notes, all_emails=all_emails, email=all_emails[0] if all_emails else "")
+    return out
+
+def _recipient_index_update(changes):
+    with _cache_lock:
+        for _, index in _recipient_indexes.values():
+            for lead_id, fields in changes.items():
+                if lead_id in index:
+                    index.update(lead_id, _recipient_fields(fields))
+
+def _recipient_index_add(user_id, lead_id, data):
+    lead = dict(data, id=lead_id, Notes=parse_notes(data.get("Notes")))
+    recipients = _recipients_from_leads([lead])
+    with _cache_lock:
+        hit = _recipient_indexes.get((_lead_backend(), user_id))
+        if hit:
+            hit[1].add(recipients[0] if recipients else None, lead_id=lead_id)
+
+def _recipient_index_remove(lead_id):
+    with _cache_lock:
+        for _, index in _recipient_indexes.values():
+            index.remove(lead_id)
+
+def _recipient_index_stale(lead_ids):
+    with _cache_lock:
+        for _, index in _recipient_indexes.values():
+            if any(lead_id in index for lead_id in lead_ids):
+                index.stale = True
+
+def _status_fields(status, next_date=None):
+    # Changing status also stamps Last Contact with today
+    fields = {"Status": status, "Last Contact": datetime.now().strftime("%Y-%m-%d")}
+    if next_date:
+        fields["Next Action"] = next_date
+    return fields
 
 def update_lead_status(lead_id, status, next_date=None):
+    changes = {lead_id: _status_fields(status, next_date)}
+    if _queue_lead_updates(changes):
+        return True
+
     if airtable_manager.is_configured():
-        return airtable_manager.update_lead_status(lead_id, status, next_date)
+        return _lead_written(changes, airtable_manager.update_lead_status(lead_id, status, next_date))
 
     if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
-        return sheet_manager.update_lead_status(lead_id, status, next_date)
+        return _lead_written(changes, sheet_manager.update_lead_status(lead_id, status, next_date))
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    if next_date:
-        c.execute("UPDATE leads SET status=?, next_action_date=?, last_contact_date=? WHERE id=?", 
-                  (status, next_date, datetime.now().strftime("%Y-%m-%d"), lead_id))
-    else:
-        c.execute("UPDATE leads SET status=?, last_contact_date=? WHERE id=?", 
-                  (status, datetime.now().strftime("%Y-%m-%d"), lead_id))
-    conn.commit()
-    conn.close()
+    with _db() as conn:
+        if next_date:
+            conn.execute("UPDATE leads SET status=?, next_action_date=?, last_contact_date=? WHERE id=?", 
+                         (status, next_date, datetime.now().strftime("%Y-%m-%d"), lead_id))
+        else:
+            conn.execute("UPDATE leads SET status=?, last_contact_date=? WHERE id=?", 
+                         (status, datetime.now().strftime("%Y-%m-%d"), lead_id))
+    _lead_written(changes)
 
 def update_lead_notes(lead_id, notes_data):
+    changes = {lead_id: {"Notes": notes_data}}
+    if _queue_lead_updates(changes):
+        return True
+
     if airtable_manager.is_configured():
-        return airtable_manager.update_lead_notes(lead_id, notes_data)
+        return _lead_written(changes, airtable_manager.update_lead_notes(lead_id, notes_data))
 
     if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
-        return sheet_manager.update_lead_notes(lead_id, notes_data)
+        return _lead_written(changes, sheet_manager.update_lead_notes(lead_id, notes_data))
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     notes_json = json.dumps(notes_data)
-    c.execute("UPDATE leads SET notes_json=? WHERE id=?", (notes_json, lead_id))
-    conn.commit()
-    conn.close()
+    with _db() as conn:
+        conn.execute("UPDATE leads SET notes_json=? WHERE id=?", (notes_json, lead_id))
+    _lead_written(changes)
 
 def update_lead_contact(lead_id, contact_name):
+    changes = {lead_id: {"Contact Name": contact_name}}
+    if _queue_lead_updates(changes):
+        return True
+
     if airtable_manager.is_configured():
-        return airtable_manager.update_lead_contact(lead_id, contact_name)
+        return _lead_written(changes, airtable_manager.update_lead_contact(lead_id, contact_name))
 
     if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
-        return sheet_manager.update_lead_contact(lead_id, contact_name)
+        return _lead_written(changes, sheet_manager.update_lead_contact(lead_id, contact_name))
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("UPDATE leads SET contact_name=? WHERE id=?", (contact_name, lead_id))
-    conn.commit()
-    conn.close()
-    return True
+    with _db() as conn:
+        conn.execute("UPDATE leads SET contact_name=? WHERE id=?", (contact_name, lead_id))
+    return _lead_written(changes)
 
 def update_lead_value(lead_id, value):
+    changes = {lead_id: {"Value": value}}
+    if _queue_lead_updates(changes):
+        return True
+
     if airtable_manager.is_configured():
-        return airtable_manager.update_lead_value(lead_id, value)
+        return _lead_written(changes, airtable_manager.update_lead_value(lead_id, value))
 
     if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
-        return sheet_manager.update_lead_value(lead_id, value)
+        return _lead_written(changes, sheet_manager.update_lead_value(lead_id, value))
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("UPDATE leads SET value=? WHERE id=?", (value, lead_id))
-    conn.commit()
-    conn.close()
-    return True
+    with _db() as conn:
+        conn.execute("UPDATE leads SET value=? WHERE id=?", (value, lead_id))
+    return _lead_written(changes)
+
+def update_leads(changes):
+    """
+    Writes field changes for several leads in a single round-trip.
+    changes: {lead_id: {app_key: value}} using the lead keys from get_leads
+    ("Status", "Next Action", "Last Contact", "Contact Name", "Notes", "Value").
+    """
+    if not changes:
+        return True
+
+    if _queue_lead_updates(changes):
+        return True
+
+    if airtable_manager.is_configured():
+        return _lead_written(changes, airtable_manager.update_leads(changes))
+
+    if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
+        return _lead_written(changes, sheet_manager.update_leads(changes))
+
+    try:
+        with _db() as conn:
+            _apply_lead_changes(conn, changes)
+        return _lead_written(changes)
+    except Exception as e:
+        print(f"Local batch update error: {e}")
+        return False
+
+def _apply_lead_changes(conn, changes):
+    """Runs the UPDATEs for update_leads() on an open connection."""
+    for lead_id, fields in changes.items():
+        cols = []
+        vals = []
+        for key, val in fields.items():
+            col = LEAD_COLUMNS.get(key)
+            if not col:
+                continue
+            if key == "Notes" and not isinstance(val, str):
+                val = json.dumps(val)
+            cols.append(f"{col}=?")
+            vals.append(val)
+        if cols:
+            conn.execute(f"UPDATE leads SET {', '.join(cols)} WHERE id=?", vals + [lead_id])
+
+class LeadUpdates:
+    """
+    Unit of work for lead edits. Collects changes for one or more leads and
+    flushes them together through update_leads():
+
+        with db.LeadUpdates() as batch:
+            batch.set_status(lead_id, "Active", next_date)
+            batch.set_notes(lead_id, notes)
+
+    Changes are flushed on exit unless the block raised.
+    """
+
+    def __init__(self):
+        self.changes = {}
+
+    def _set(self, lead_id, **fields):
+        self.changes.setdefault(lead_id, {}).update(fields)
+        return self
+
+    def set_status(self, lead_id, status, next_date=None):
+        # Same side effects as update_lead_status: Last Contact becomes today
+        return self._set(lead_id, **_status_fields(status, next_date))
+
+    def set_notes(self, lead_id, notes_data):
+        return self._set(lead_id, Notes=notes_data)
+
+    def set_contact(self, lead_id, contact_name):
+        return self._set(lead_id, **{"Contact Name": contact_name})
+
+    def set_value(self, lead_id, value):
+        return self._set(lead_id, Value=value)
+
+    def flush(self):
+        changes, self.changes = self.changes, {}
+        return update_leads(changes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
 
 def delete_lead(lead_id):
+    _recipient_index_remove(lead_id)
+    if _queue_lead_delete(lead_id):
+        return True
+    _lead_cache_drop([lead_id])
+
     if airtable_manager.is_configured():
         return airtable_manager.delete_lead(lead_id)
 
     if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
         return sheet_manager.delete_lead(lead_id)
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("DELETE FROM leads WHERE id=?", (lead_id,))
-    conn.commit()
-    conn.close()
+    with _db() as conn:
+        conn.execute("DELETE FROM leads WHERE id=?", (lead_id,))
+
+# --- OFFLINE-FIRST OUTBOX ---
+# With Airtable or Sheets as the backend, writes are committed to a local
+# SQLite outbox and return immediately. A background thread replays them to the
+# remote backend in order, batching where the API allows, retrying with
+# exponential backoff. Reads overlay the still-pending writes, so the UI sees
+# its own changes before they reach the cloud.
+#
+# Conflicts (Airtable only — Sheets has no modification times): if the remote
+# record was modified after the queued local change, and after our own last
+# push of it (kept in outbox_pushes), the change is parked in the 'conflict'
+# state. The sidebar lists conflicts; the user keeps their edit (pushed without
+# the check) or the remote version (the edit is discarded).
+#
+# Adds are checked against the user's leads on the backend before they are
+# queued, and again when replayed: a lead that already exists fails the add
+# (and the edits queued against its temp ID) rather than adopting the record.
+#
+# Sheets entries record the spreadsheet they were queued for and are replayed
+# through a SheetManager of that sheet's own (sheets_manager.manager_for), not
+# the process-wide one, which follows whichever session connected last.
+OFFLINE_FIRST = True
+SYNC_INTERVAL = 2.0       # seconds between outbox sweeps
+SYNC_MAX_ATTEMPTS = 8     # then the entry is parked as 'failed'
+SYNC_MAX_BACKOFF = 300    # seconds
+TEMP_ID_PREFIX = "local-"
+
+_sync_thread = None
+_sync_wakeup = threading.Event()
+_sync_lock = threading.Lock()
+
+
+def _write_backend():
+    """'airtable' / 'sheets' when writes should go through the outbox, else None."""
+    if not OFFLINE_FIRST:
+        return None
+    if airtable_manager.is_configured():
+        return "airtable"
+    if "use_sheets" in st.session_state and st.session_state["use_sheets"]:
+        return "sheets"
+    return None
+
+def resolve_lead_id(lead_id):
+    """Maps a temp ID from a queued add to its remote ID once it has synced."""
+    if isinstance(lead_id, str) and lead_id.startswith(TEMP_ID_PREFIX):
+        with _db() as conn:
+            row = conn.execute("SELECT remote_id FROM outbox_ids WHERE temp_id=?", (lead_id,)).fetchone()
+        if row:
+            return _typed_id(row[0])
+    return lead_id
+
+def _typed_id(lead_id):
+    # Sheets IDs are integers; Airtable Record IDs and temp IDs are strings
+    return int(lead_id) if str(lead_id).isdigit() else lead_id
+
+def _enqueue(backend, op, lead_id, user_id=None, payload=None):
+    now = time.time()
+    if user_id is None:
+        user_id = st.session_state.get("user_id")
+    lead_id = resolve_lead_id(lead_id)
+    with _db() as conn:
+        c = conn.execute(
+            "INSERT INTO outbox (backend, op, lead_id, user_id, payload, created_at, target) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (backend, op, str(lead_id), user_id, json.dumps(payload) if payload is not None else None, now,
+             _entry_target(backend))
+        )
+        entry_id = c.lastrowid
+        if op == "add":
+            lead_id = f"{TEMP_ID_PREFIX}{entry_id}"
+            conn.execute("UPDATE outbox SET lead_id=? WHERE id=?", (lead_id, entry_id))
+    start_sync_worker()
+    _sync_wakeup.set()
+    return lead_id
+
+def _entry_target(backend):
+    """The spreadsheet new Sheets entries are for (None for Airtable)."""
+    return sheet_manager.sheet_url if backend == "sheets" else None
+
+def _for_connected_sheet(entry):
+    """False for a Sheets entry queued for another spreadsheet than the one connected now."""
+    return entry[1] != "sheets" or entry[10] is None or entry[10] == sheet_manager.sheet_url
+
+def _entry_sheet(entry):
+    """
+    The SheetManager to replay a Sheets entry through: one per spreadsheet,
+    so entries never land in whichever sheet this process connected last.
+    Entries queued before targets were recorded use the connected sheet.
+    """
+    return manager_for(entry[10]) if entry[10] else sheet_manager
+
+def _queue_lead_add(user_id, data, user_email=None):
+    backend = _write_backend()
+    if not backend:
+        return None
+    # Duplicate check: adds that haven't synced yet, then the user's leads on the backend
+    name = str(data.get("Business Name", "")).strip()
+    with _db() as conn:
+        for (payload,) in conn.execute(
+                "SELECT payload FROM outbox WHERE op='add' AND state='pending' AND user_id=?", (user_id,)):
+            queued = json.loads(payload).get("data", {})
+            if str(queued.get("Business Name", "")).strip().lower() == name.lower():
+                return False
+    if name and _remote_lead_id(backend, user_email, name):
+        return False
+    return _enqueue(backend, "add", "", user_id, {"data": data, "user_email": user_email})
+
+def _remote_lead_id(backend, user_email, business_name):
+    """The user's existing lead with this name on the backend. Offline counts as none (the replay checks again)."""
+    try:
+        if backend == "airtable":
+            return airtable_manager.find_lead_id(user_email or "", business_name)
+        return sheet_manager.find_lead_id(business_name)
+    except Exception as e:
+        print(f"Duplicate check skipped (backend unreachable): {e}")
+        return None
+
+def _queue_lead_updates(changes):
+    backend = _write_backend()
+    if not backend:
+        return False
+    for lead_id, fields in changes.items():
+        if fields:
+            _enqueue(backend, "update", lead_id, payload=fields)
+    _recipient_index_update(changes)
+    return True
+
+def _queue_lead_delete(lead_id):
+    backend = _write_backend()
+    if not backend:
+        return False
+    lead_id = resolve_lead_id(lead_id)
+    if str(lead_id).startswith(TEMP_ID_PREFIX):
+        # Never reached the backend — cancel the add and anything queued after it
+        with _db() as conn:
+            cancelled = conn.execute("DELETE FROM outbox WHERE lead_id=? AND state IN ('pending', 'failed')", (str(lead_id),)).rowcount
+        if cancelled:
+            return True
+    _enqueue(backend, "delete", lead_id)
+    return True
+
+def _pending_entries(backend=None, limit=-1):
+    sql = ("SELECT id, backend, op, lead_id, user_id, payload, created_at, attempts, next_attempt_at, force, target "
+           "FROM outbox WHERE state='pending'")
+    params = []
+    if backend:
+        sql += " AND backend=?"
+        params.append(backend)
+    with _db() as conn:
+        return conn.execute(sql + " ORDER BY id LIMIT ?", params + [limit]).fetchall()
+
+def _with_pending(leads, user_id, fields=None):
+    """Overlays queued (not yet synced) writes on a remote lead list."""
+    return [l for page in _iter_with_pending([leads], user_id, fields) for l in page]
+
+def _iter_with_pending(pages, user_id, fields=None):
+    """
+    Page-by-page version of _with_pending: queued updates and deletes are
+    applied to each page as it streams past, queued adds follow the last page.
+    """
+    backend = _write_backend()
+    entries = [e for e in _pending_entries(backend) if _for_connected_sheet(e)] if backend else []
+    if not entries:
+        yield from pages
+        return
+
+    added = {}
+    updates = {}
+    deleted = set()
+    for _, _, op, lead_id, entry_user, payload, _, _, _, _, _ in entries:
+        if op == "add":
+            if entry_user != user_id:
+                continue
+            data = dict(json.loads(payload).get("data", {}))
+            notes = data.pop("Notes", {})
+            added[lead_id] = project_lead(lead_id, data, fields, notes if isinstance(notes, str) else json.dumps(notes))
+        elif op == "update":
+            changes = {k: v for k, v in json.loads(payload).items() if fields is None or k in fields}
+            if lead_id in added:
+                added[lead_id].update(changes)
+            else:
+                updates.setdefault(lead_id, []).append(changes)
+        elif op == "delete":
+            deleted.add(lead_id)
+
+    for page in pages:
+        out = []
+        for lead in page:
+            key = str(lead["id"])
+            if key in deleted:
+                continue
+            for changes in updates.get(key, ()):
+                lead.update(changes)
+            out.append(lead)
+        yield out
+    tail = [l for key, l in added.items() if key not in deleted]
+    if tail:
+        yield tail
+
+def _with_pending_lead(lead_id, lead):
+    """Overlays queued writes on a single lead (None once a delete is queued)."""
+    backend = _write_backend()
+    if not backend:
+        return lead
+    with _db() as conn:
+        entries = conn.execute(
+            "SELECT op, payload FROM outbox WHERE state='pending' AND backend=? AND lead_id=? "
+            "AND (target IS NULL OR target=?) ORDER BY id",
+            (backend, str(lead_id), _entry_target(backend))
+        ).fetchall()
+
+    for op, payload in entries:
+        if op == "add":
+            data = dict(json.loads(payload).get("data", {}))
+            notes = data.pop("Notes", {})
+            lead = project_lead(lead_id, data, None, notes if isinstance(notes, str) else json.dumps(notes))
+        elif op == "update" and lead is not None:
+            for key, val in json.loads(payload).items():
+                lead[key] = val
+        elif op == "delete":
+            lead = None
+    return lead
+
+def outbox_status(user_id=None):
+    """Counts of queued writes (optionally for one user): {'pending': n, 'failed': n, 'conflict': n}."""
+    sql, params = "SELECT state, COUNT(*) FROM outbox", []
+    if user_id is not None:
+        sql += " WHERE user_id=?"
+        params.append(user_id)
+    with _db() as conn:
+        rows = conn.execute(sql + " GROUP BY state", params).fetchall()
+    status = {"pending": 0, "failed": 0, "conflict": 0}
+    status.update(dict(rows))
+    return status
+
+def outbox_conflicts(user_id):
+    """The user's edits parked in 'conflict': [{'id', 'lead_id', 'fields', 'error'}], oldest first."""
+    with _db() as conn:
+        rows = conn.execute(
+            "SELECT id, lead_id, payload, last_error FROM outbox WHERE state='conflict' AND user_id=? ORDER BY id",
+            (user_id,)
+        ).fetchall()
+    return [{"id": entry_id, "lead_id": _typed_id(lead_id), "fields": json.loads(payload or "{}"), "error": error}
+            for entry_id, lead_id, payload, error in rows]
+
+def resolve_conflicts(entry_ids, keep_local):
+    """
+    Settles conflicted edits. keep_local: push them anyway (over the remote
+    change); otherwise discard them and keep the remote version.
+    """
+    if not entry_ids:
+        return
+    marks = ",".join("?" * len(entry_ids))
+    with _db() as conn:
+        if keep_local:
+            conn.execute(f"UPDATE outbox SET state='pending', force=1, attempts=0, next_attempt_at=0, last_error=NULL "
+                         f"WHERE state='conflict' AND id IN ({marks})", list(entry_ids))
+        else:
+            lead_ids = [r[0] for r in conn.execute(
+                f"SELECT lead_id FROM outbox WHERE state='conflict' AND id IN ({marks})", list(entry_ids))]
+            conn.execute(f"DELETE FROM outbox WHERE state='conflict' AND id IN ({marks})", list(entry_ids))
+    if keep_local:
+        _sync_wakeup.set()
+    else:
+        _lead_cache_drop(lead_ids)
+        _recipient_index_stale(lead_ids)
+
+def retry_failed_writes(user_id=None):
+    """Re-queues entries parked as 'failed' after too many attempts."""
+    sql, params = "UPDATE outbox SET state='pending', attempts=0, next_attempt_at=0 WHERE state='failed'", []
+    if user_id is not None:
+        sql += " AND user_id=?"
+        params.append(user_id)
+    with _db() as conn:
+        conn.execute(sql, params)
+    _sync_wakeup.set()
+
+def start_sync_worker():
+    """Starts the background replay thread (once per process)."""
+    global _sync_thread
+    with _sync_lock:
+        if _sync_thread is None or not _sync_thread.is_alive():
+            _sync_thread = threading.Thread(target=_sync_loop, name="outbox-sync", daemon=True)
+            _sync_thread.start()
+
+def _sync_loop():
+    while True:
+        _sync_wakeup.wait(SYNC_INTERVAL)
+        _sync_wakeup.clear()
+        try:
+            sync_outbox()
+        except Exception as e:
+            print(f"Outbox sync error: {e}")
+
+def _iso_utc(epoch):
+    # Milliseconds: the precision of Airtable's LAST_MODIFIED_TIME()
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+def _parse_iso_utc(value):
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def sync_outbox(limit=500):
+    """
+    Replays due outbox entries to their backends. Entries for the same lead
+    stay in order: once one is waiting on a retry, later ones for that lead wait too.
+    Returns the number of entries completed.
+    """
+    now = time.time()
+    with _db() as conn:
+        # Edits of a lead queue up behind its unresolved conflicts
+        blocked = {r[0] for r in conn.execute("SELECT DISTINCT lead_id FROM outbox WHERE state='conflict'")}
+    queued_adds = set()
+    sheets = {}
+    due = []
+    for entry in _pending_entries(limit=limit):
+        op, lead_id, next_attempt_at = entry[2], entry[3], entry[8]
+        if entry[1] == "sheets":
+            if entry[10] not in sheets:
+                sheets[entry[10]] = _entry_sheet(entry)
+            # No credentials for its sheet in this process yet: wait for its user to connect
+            if sheets[entry[10]] is None:
+                continue
+        # Edits of a lead whose add isn't being sent in this sweep have to wait
+        orphan = op != "add" and lead_id.startswith(TEMP_ID_PREFIX) and lead_id not in queued_adds
+        if lead_id in blocked or next_attempt_at > now or orphan:
+            blocked.add(lead_id)
+            continue
+        if op == "add":
+            queued_adds.add(lead_id)
+        due.append(entry)
+
+    done = 0
+    id_map = {}
+    run = []
+    for entry in due + [None]:
+        if run and (entry is None or (entry[1], entry[2], entry[10]) != (run[0][1], run[0][2], run[0][10])):
+            done += _replay_run(run, id_map, blocked, sheets.get(run[0][10]))
+            run = []
+        if entry is not None:
+            run.append(entry)
+    return done
+
+class DuplicateLeadError(Exception):
+    """A queued add whose business is already in the user's leads on the backend."""
+
+
+def _replay_run(run, id_map, blocked, sheet=None):
+    """
+    Sends one run of same-backend, same-op (and for Sheets, same-spreadsheet)
+    entries; sheet is that spreadsheet's SheetManager. Returns entries completed.
+    """
+    backend, op = run[0][1], run[0][2]
+    entries = []
+    for entry in run:
+        lead_id = id_map.get(entry[3], entry[3])
+        if lead_id in blocked or entry[3] in blocked:
+            continue
+        entries.append((entry, lead_id))
+
+    succeeded, failed, rejected, conflicted = [], {}, {}, {}
+    if op == "add":
+        for entry, _ in entries:
+            try:
+                remote_id = _replay_add(backend, entry, sheet)
+            except DuplicateLeadError as e:
+                rejected[entry[0]] = str(e)
+                continue
+            except Exception as e:
+                failed[entry[0]] = str(e)
+                continue
+            if not remote_id:
+                failed[entry[0]] = "backend rejected the add"
+                continue
+            id_map[entry[3]] = str(remote_id)
+            _recipient_index_stale([entry[3]])
+            with _db() as conn:
+                conn.execute("INSERT OR REPLACE INTO outbox_ids (temp_id, remote_id) VALUES (?, ?)", (entry[3], str(remote_id)))
+                conn.execute("UPDATE outbox SET lead_id=? WHERE lead_id=?", (str(remote_id), entry[3]))
+                # Edits queued before the add compare against its creation, not an older edit time
+                conn.execute("INSERT OR REPLACE INTO outbox_pushes (backend, lead_id, pushed_at) VALUES (?, ?, ?)",
+                             (backend, str(remote_id), time.time()))
+            succeeded.append(entry[0])
+
+    elif op == "update":
+        # Coalesce per lead, in queue order; remember when each lead was last edited
+        changes, edited_at, owners, forced = {}, {}, {}, set()
+        for entry, lead_id in entries:
+            changes.setdefault(lead_id, {}).update(json.loads(entry[5]))
+            edited_at[lead_id] = entry[6]
+            owners.setdefault(lead_id, []).append(entry[0])
+            if entry[9]:
+                forced.add(lead_id)
+        ids = list(changes)
+        for i in range(0, len(ids), 10):
+            chunk = ids[i:i + 10]
+            try:
+                stale = _remote_conflicts(backend, [lid for lid in chunk if lid not in forced], edited_at)
+            except Exception as e:
+                # Can't tell yet — retry the chunk rather than risk overwriting a newer remote edit
+                for lid in chunk:
+                    for entry_id in owners[lid]:
+                        failed[entry_id] = f"conflict check failed: {e}"
+                continue
+            for lead_id in stale:
+                for entry_id in owners[lead_id]:
+                    conflicted[entry_id] = "changed on the backend after this edit"
+            _lead_cache_drop(stale, backend)
+            _recipient_index_stale(stale)
+            push = {lid: changes[lid] for lid in chunk if lid not in stale}
+            if not push:
+                continue
+            manager = airtable_manager if backend == "airtable" else sheet
+            if manager.update_leads({_typed_id(k): v for k, v in push.items()}):
+                pushed_at = time.time()
+                with _db() as conn:
+                    conn.executemany("INSERT OR REPLACE INTO outbox_pushes (backend, lead_id, pushed_at) VALUES (?, ?, ?)",
+                                     [(backend, str(lid), pushed_at) for lid in push])
+                for lid in push:
+                    succeeded.extend(owners[lid])
+                _lead_cache_update(push, backend)
+            else:
+                for lid in push:
+                    for entry_id in owners[lid]:
+                        failed[entry_id] = "update failed"
+
+    elif op == "delete":
+        ids = [lead_id for _, lead_id in entries]
+        _lead_cache_drop(ids, backend)
+        if backend == "airtable":
+            ok = airtable_manager.delete_leads(ids)
+            for entry, _ in entries:
+                if ok:
+                    succeeded.append(entry[0])
+                else:
+                    failed[entry[0]] = "delete failed"
+        else:
+            for entry, lead_id in entries:
+                try:
+                    # Returns False when the row is already gone, which counts as done
+                    sheet.delete_lead(_typed_id(lead_id))
+                    succeeded.append(entry[0])
+                except Exception as e:
+                    failed[entry[0]] = str(e)
+
+    _finish_entries(succeeded, failed, {e[0]: e for e, _ in entries}, blocked, id_map,
+                    rejected=rejected, conflicted=conflicted)
+    return len(succeeded)
+
+def _replay_add(backend, entry, sheet=None):
+    """
+    Creates a queued lead; returns its remote ID. Idempotent: if an earlier
+    attempt landed before failing (e.g. a timeout), that lead is returned.
+    Raises DuplicateLeadError when the user already had a lead with this name.
+    """
+    entry_id, queued_at, attempts = entry[0], entry[6], entry[7]
+    payload = json.loads(entry[5])
+    data = payload.get("data", {})
+    name = str(data.get("Business Name", "")).strip()
+    duplicate = DuplicateLeadError(f"'{name}' is already in your leads")
+
+    if backend == "airtable":
+        user_email = payload.get("user_email")
+        if not user_email:
+            raise ValueError("queued add has no user email")
+        existing = airtable_manager.find_lead(user_email, name) if name else None
+        if existing:
+            # Ours only if an earlier attempt was sent and the record is newer than the queued add
+            created = _parse_iso_utc(existing.get("createdTime"))
+            if attempts and created is not None and created >= queued_at:
+                return existing.get("id")
+            raise duplicate
+        return airtable_manager.add_lead(user_email, data, check_duplicate=False)
+
+    # Sheets: the ID is reserved (and kept in the entry) before the append, so a
+    # retry can tell its own row from a lead that was already there
+    existing = sheet.find_lead_id(name) if name else None
+    if existing is not None:
+        if str(existing) == str(payload.get("sheet_id")):
+            return existing
+        raise duplicate
+    payload["sheet_id"] = sheet.reserve_id()
+    with _db() as conn:
+        conn.execute("UPDATE outbox SET payload=? WHERE id=?", (json.dumps(payload), entry_id))
+    return sheet.add_lead(data, new_id=payload["sheet_id"])
+
+def _remote_conflicts(backend, lead_ids, edited_at):
+    """Leads modified remotely after their local edit and after our own last push of them."""
+    if backend != "airtable" or not lead_ids:
+        return set()
+    with _db() as conn:
+        marks = ",".join("?" * len(lead_ids))
+        pushed = dict(conn.execute(
+            f"SELECT lead_id, pushed_at FROM outbox_pushes WHERE backend=? AND lead_id IN ({marks})",
+            [backend] + [str(lid) for lid in lead_ids]).fetchall())
+    since = {lid: _iso_utc(max(edited_at[lid], pushed.get(str(lid), 0))) for lid in lead_ids}
+    return airtable_manager.get_modified_since(since)
+
+def _finish_entries(done_ids, failed, entries_by_id, blocked, id_map, rejected=None, conflicted=None):
+    """
+    Records a run's outcome: done entries are removed, failed ones retried with
+    backoff (parked as 'failed' after SYNC_MAX_ATTEMPTS), rejected ones parked
+    as 'failed' at once, conflicted ones parked as 'conflict'. An add that ends
+    up 'failed' takes the edits queued against its temp ID with it.
+    """
+    now = time.time()
+    given_up = []
+    with _db() as conn:
+        if done_ids:
+            conn.executemany("DELETE FROM outbox WHERE id=?", [(i,) for i in done_ids])
+        for entry_id, error in failed.items():
+            entry = entries_by_id[entry_id]
+            attempts = entry[7] + 1
+            state = "failed" if attempts >= SYNC_MAX_ATTEMPTS else "pending"
+            delay = min(SYNC_MAX_BACKOFF, 2 ** attempts)
+            conn.execute("UPDATE outbox SET attempts=?, next_attempt_at=?, last_error=?, state=? WHERE id=?",
+                         (attempts, now + delay, error, state, entry_id))
+            blocked.add(id_map.get(entry[3], entry[3]))
+            blocked.add(entry[3])
+            if state == "failed":
+                given_up.append((entry, error))
+        for entry_id, error in (rejected or {}).items():
+            entry = entries_by_id[entry_id]
+            conn.execute("UPDATE outbox SET attempts=attempts+1, last_error=?, state='failed' WHERE id=?", (error, entry_id))
+            blocked.add(entry[3])
+            given_up.append((entry, error))
+        for entry_id, error in (conflicted or {}).items():
+            entry = entries_by_id[entry_id]
+            conn.execute("UPDATE outbox SET last_error=?, state='conflict' WHERE id=?", (error, entry_id))
+            # Later edits of the lead wait behind the conflict
+            blocked.add(id_map.get(entry[3], entry[3]))
+        for entry, error in given_up:
+            if entry[2] == "add":
+                conn.execute("UPDATE outbox SET state='failed', last_error=? WHERE lead_id=? AND id<>? AND state='pending'",
+                             (f"add failed: {error}", entry[3], entry[0]))
@@ -2,6 +2,8 @@ import requests
 import streamlit as st
 import math
 
+from provider_urls import base_url
+
 # Load Secrets
 try:
     if "google_api_key" in st.secrets:
@@ -26,7 +28,7 @@ def test_search():
     location = "Swindon, UK"
     
     # URL
-    url = "https://places.googleapis.com/v1/places:searchText"
+    url = f"{base_url('places')}/v1/places:searchText"
     
     # Headers
     headers = {
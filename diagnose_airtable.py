@@ -3,6 +3,8 @@ import requests
 import json
 import os
 
+from provider_urls import base_url
+
 SECRETS_PATH = ".streamlit/secrets.toml"
 
 def check():
@@ -25,7 +27,7 @@ def check():
         "Content-Type": "application/json"
     }
 
-    url = f"https://api.airtable.com/v0/{base_id}/{table_name}"
+    url = f"{base_url('airtable')}/v0/{base_id}/{table_name}"
     print(f"Inspecting Table: '{table_name}' ...")
     
     resp = requests.get(url, headers=headers, params={"maxRecords": 1})
@@ -0,0 +1,257 @@
+"""
+Full-text index over the coaching library (course PDFs and .docx playbooks).
+
+Text is extracted once into a SQLite FTS5 table with one row per PDF page
+(or per ~PASSAGE_CHARS section of a .docx, which has no pages), so queries
+are BM25-ranked MATCH lookups with highlighted snippets instead of
+re-reading every PDF. refresh() re-extracts only files whose size/mtime
+changed and whose content hash no longer matches, and drops deleted ones.
+PDF pages come from pdf_extract (all cores, cached per page), so even a
+rebuilt index doesn't re-extract a PDF it has seen before.
+
+    python doc_index.py "social media audit"
+"""
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pdf_extract
+
+INDEX_FILE = "doc_index.db"
+LIBRARY_DIR = os.path.dirname(os.path.abspath(__file__))
+DOC_TYPES = (".pdf", ".docx")
+
+PASSAGE_CHARS = 1500       # .docx section size
+REFRESH_INTERVAL = 300     # seconds between library rescans in ensure_index() / refresh_in_background()
+SNIPPET_TOKENS = 24
+
+# BM25 column weights: title, body (path and page are unindexed)
+BM25_WEIGHTS = (2.0, 1.0)
+
+_refresh_lock = threading.Lock()
+_last_refresh = {}  # (index file, library dir) -> epoch of the last refresh
+_refresh_threads = {}  # (index file, library dir) -> background refresh thread
+_threads_lock = threading.Lock()
+
+
+def _connect(index_file=None):
+    conn = sqlite3.connect(index_file or INDEX_FILE, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute('''CREATE TABLE IF NOT EXISTS documents (
+                        path TEXT PRIMARY KEY,
+                        mtime REAL,
+                        size INTEGER,
+                        sha256 TEXT,
+                        passages INTEGER,
+                        indexed_at REAL
+                    )''')
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+                        path UNINDEXED, page UNINDEXED, title, body,
+                        tokenize='porter unicode61 remove_diacritics 2'
+                    )''')
+    return conn
+
+
+_sha256 = pdf_extract.file_hash
+
+
+# --- EXTRACTION ---
+def pdf_pages(path, sha=None):
+    """Yields (page number, text) for each page of a PDF that has text (parallel, page-cached)."""
+    for number, text in pdf_extract.iter_pages(path, sha=sha):
+        if text.strip():
+            yield number, text
+
+
+def docx_paragraphs(path):
+    """Paragraph texts of a .docx (from word/document.xml)."""
+    with zipfile.ZipFile(path) as document:
+        tree = ET.fromstring(document.read("word/document.xml"))
+    paragraphs = []
+    for node in tree.iter():
+        if node.tag.endswith("}p"):
+            text = "".join(t.text or "" for t in node.iter() if t.tag.endswith("}t"))
+            if text.strip():
+                paragraphs.append(text)
+    return paragraphs
+
+
+def docx_sections(path, size=PASSAGE_CHARS):
+    """Yields (section number, text): paragraphs grouped into ~size character passages."""
+    section, length, number = [], 0, 0
+    for paragraph in docx_paragraphs(path):
+        section.append(paragraph)
+        length += len(paragraph)
+        if length >= size:
+            number += 1
+            yield number, "\n".join(section)
+            section, length = [], 0
+    if section:
+        yield number + 1, "\n".join(section)
+
+
+def extract_passages(path, sha=None):
+    """(page, text) passages of one library file."""
+    if path.lower().endswith(".pdf"):
+        return pdf_pages(path, sha)
+    return docx_sections(path)
+
+
+def _title(path):
+    return os.path.splitext(os.path.basename(path))[0].replace("_", " ").strip()
+
+
+# --- INDEXING ---
+def library_files(library_dir=None):
+    library_dir = library_dir or LIBRARY_DIR
+    return sorted(os.path.join(library_dir, name) for name in os.listdir(library_dir)
+                  if name.lower().endswith(DOC_TYPES) and not name.startswith("~$"))
+
+
+def refresh(library_dir=None, index_file=None, progress=None):
+    """
+    Brings the index up to date with the library directory.
+    progress: optional callback(done, total, path)
+    Returns {"indexed": n, "unchanged": n, "removed": n, "failed": n}.
+    """
+    files = library_files(library_dir)
+    stats = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+    conn = _connect(index_file)
+    try:
+        known = {row[0]: row[1:] for row in conn.execute("SELECT path, mtime, size, sha256 FROM documents")}
+        for done, path in enumerate(files, 1):
+            rel = os.path.basename(path)
+            st_info = os.stat(path)
+            old = known.pop(rel, None)
+            if old and old[0] == st_info.st_mtime and old[1] == st_info.st_size:
+                stats["unchanged"] += 1
+            else:
+                sha = _sha256(path)
+                if old and old[2] == sha:
+                    # Touched, not changed
+                    with conn:
+                        conn.execute("UPDATE documents SET mtime=?, size=? WHERE path=?",
+                                     (st_info.st_mtime, st_info.st_size, rel))
+                    stats["unchanged"] += 1
+                else:
+                    try:
+                        rows = [(rel, page, _title(path), text) for page, text in extract_passages(path, sha)]
+                    except Exception as e:
+                        print(f"⚠️ Could not index {rel}: {e}")
+                        stats["failed"] += 1
+                        rows = None
+                    if rows is not None:
+                        with conn:
+                            conn.execute("DELETE FROM passages WHERE path=?", (rel,))
+                            conn.executemany("INSERT INTO passages (path, page, title, body) VALUES (?, ?, ?, ?)", rows)
+                            conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                                         (rel, st_info.st_mtime, st_info.st_size, sha, len(rows), time.time()))
+                        stats["indexed"] += 1
+            if progress:
+                progress(done, len(files), path)
+
+        # Files no longer in the library
+        with conn:
+            for rel in known:
+                conn.execute("DELETE FROM passages WHERE path=?", (rel,))
+                conn.execute("DELETE FROM documents WHERE path=?", (rel,))
+                stats["removed"] += 1
+    finally:
+        conn.close()
+    return stats
+
+
+def ensure_index(library_dir=None, index_file=None, max_age=REFRESH_INTERVAL):
+    """refresh() at most once per max_age seconds per process (cheap to call on every rerun)."""
+    key = (index_file or INDEX_FILE, library_dir or LIBRARY_DIR)
+    with _refresh_lock:
+        if time.time() - _last_refresh.get(key, 0) < max_age:
+            return None
+        stats = refresh(library_dir, index_file)
+        _last_refresh[key] = time.time()
+        return stats
+
+
+def refresh_in_background(library_dir=None, index_file=None, max_age=REFRESH_INTERVAL):
+    """
+    ensure_index() on a daemon thread, so a library rescan (and re-extracting
+    a changed PDF) never runs inside a user's request. Returns True if a
+    refresh was started; searches keep using the current index meanwhile.
+    """
+    key = (index_file or INDEX_FILE, library_dir or LIBRARY_DIR)
+    if time.time() - _last_refresh.get(key, 0) < max_age:
+        return False
+    with _threads_lock:
+        thread = _refresh_threads.get(key)
+        if thread is not None and thread.is_alive():
+            return False
+        thread = threading.Thread(target=ensure_index, args=(library_dir, index_file, max_age),
+                                  name="doc-index-refresh", daemon=True)
+        _refresh_threads[key] = thread
+        thread.start()
+    return True
+
+
+def indexed_documents(index_file=None):
+    """Number of library files in the index (0 before the first refresh)."""
+    conn = _connect(index_file)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# --- QUERIES ---
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(query, match_all=False):
+    """FTS5 MATCH expression for free text: each word quoted, joined by AND/OR."""
+    words = [f'"{w}"' for w in _TOKEN.findall(query or "")]
+    return (" AND " if match_all else " OR ").join(words)
+
+
+def search(query, limit=5, match_all=False, index_file=None):
+    """
+    BM25-ranked passages for a free-text query.
+    Returns dicts: title, path, page, snippet (matches wrapped in **), score
+    (lower is better, as bm25() reports it).
+    """
+    expression = match_expression(query, match_all)
+    if not expression:
+        return []
+    conn = _connect(index_file)
+    try:
+        rows = conn.execute(
+            f"""SELECT title, path, page,
+                       snippet(passages, 3, '**', '**', '…', {SNIPPET_TOKENS}),
+                       bm25(passages, 0, 0, {BM25_WEIGHTS[0]}, {BM25_WEIGHTS[1]}) AS score
+                FROM passages WHERE passages MATCH ?
+                ORDER BY score LIMIT ?""",
+            (expression, limit)).fetchall()
+    finally:
+        conn.close()
+    return [{"title": t, "path": p, "page": page, "snippet": snip, "score": score}
+            for t, p, page, snip, score in rows]
+
+
+def page_label(hit):
+    """'p. 12' for PDFs, 'section 3' for .docx passages."""
+    return f"p. {hit['page']}" if hit["path"].lower().endswith(".pdf") else f"section {hit['page']}"
+
+
+if __name__ == "__main__":
+    started = time.time()
+    print(refresh(progress=lambda done, total, path: print(f"[{done}/{total}] {os.path.basename(path)}")))
+    print(f"Index ready in {time.time() - started:.1f}s")
+    for q in sys.argv[1:] or ["Social Media Audit"]:
+        started = time.perf_counter()
+        hits = search(q)
+        print(f"\n--- {q} ({(time.perf_counter() - started) * 1000:.1f} ms) ---")
+        for hit in hits:
+            print(f"{hit['title']} ({page_label(hit)}): {hit['snippet']}")
@@ -1,6 +1,8 @@
 import requests
 import re
 
+from provider_urls import base_url, outscraper_client
+
 
 def scrape_website_social_links(website_url):
     """
@@ -83,8 +85,7 @@ def search_outscraper_contacts(outscraper_key, domain):
         return {"error": "Missing key or domain"}
 
     try:
-        from outscraper import OutscraperClient
-        client = OutscraperClient(api_key=outscraper_key)
+        client = outscraper_client(outscraper_key)
 
         results = client.emails_and_contacts([domain])
 
@@ -148,7 +149,7 @@ def search_apollo_people(api_key, domain):
     }
     
     # --- STEP 1: SEARCH (free, no credits consumed) ---
-    search_url = "https://api.apollo.io/api/v1/mixed_people/api_search"
+    search_url = f"{base_url('apollo')}/api/v1/mixed_people/api_search"
     search_payload = {
         "q_organization_domains_list": [domain],
         "person_titles": ["Managing Director", "Founder", "Owner", "Chief Executive Officer", 
@@ -259,7 +260,7 @@ def search_apollo_people(api_key, domain):
         
         # --- STEP 2: ENRICH (1 credit) — get email, phone, LinkedIn ---
         if person_id or (first_name and last_name):
-            enrich_url = "https://api.apollo.io/v1/people/match"
+            enrich_url = f"{base_url('apollo')}/v1/people/match"
             enrich_payload = {
                 "api_key": api_key,
                 "reveal_personal_emails": True,
@@ -337,8 +338,7 @@ def find_linkedin_company_page(outscraper_key, business_name, location_hint=""):
         return ""
 
     try:
-        from outscraper import OutscraperClient
-        client = OutscraperClient(api_key=outscraper_key)
+        client = outscraper_client(outscraper_key)
 
         # Search Google for the LinkedIn company page
         query = f'site:linkedin.com/company "{business_name}"'
@@ -425,7 +425,7 @@ def search_companies_house(api_key, business_name):
     if not api_key or not business_name:
         return {"error": "Missing API key or business name"}
     
-    base_url = "https://api.company-information.service.gov.uk"
+    ch_url = base_url("companies_house")
     
     # Auth: API key as username, no password
     auth = (api_key, "")
@@ -433,7 +433,7 @@ def search_companies_house(api_key, business_name):
     try:
         # Step 1: Search for the company
         search_resp = requests.get(
-            f"{base_url}/search/companies",
+            f"{ch_url}/search/companies",
             params={"q": business_name, "items_per_page": 5},
             auth=auth,
             timeout=10
@@ -477,7 +477,7 @@ def search_companies_house(api_key, business_name):
         # Step 2: Get company profile (SIC codes, address)
         try:
             profile_resp = requests.get(
-                f"{base_url}/company/{company_number}",
+                f"{ch_url}/company/{company_number}",
                 auth=auth, timeout=10
             )
             if profile_resp.status_code == 200:
@@ -498,7 +498,7 @@ def search_companies_house(api_key, business_name):
         # Step 3: Get officers (directors, secretaries)
         try:
             officers_resp = requests.get(
-                f"{base_url}/company/{company_number}/officers",
+                f"{ch_url}/company/{company_number}/officers",
                 auth=auth, timeout=10
             )
             if officers_resp.status_code == 200:
@@ -527,7 +527,7 @@ def search_companies_house(api_key, business_name):
         # Step 4: Get Persons with Significant Control (actual owners)
         try:
             psc_resp = requests.get(
-                f"{base_url}/company/{company_number}/persons-with-significant-control",
+                f"{ch_url}/company/{company_number}/persons-with-significant-control",
                 auth=auth, timeout=10
             )
             if psc_resp.status_code == 200:
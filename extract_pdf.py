@@ -1,18 +1,9 @@
-
-import pypdf
+import pdf_extract
 
 def extract_text_from_pdf(pdf_path):
     try:
-        reader = pypdf.PdfReader(pdf_path)
-        text = ""
-        for i, page in enumerate(reader.pages):
-            try:
-                content = page.extract_text()
-                if content:
-                    text += f"\n--- PAGE {i+1} ---\n{content}"
-            except Exception as e:
-                print(f"⚠️ Error on page {i+1}: {e}")
-        
+        # Pages are extracted in parallel and cached, so a second run is instant
+        text = pdf_extract.extract_text(pdf_path)
         print(text)
     except Exception as e:
         print(f"Error opening PDF: {e}")
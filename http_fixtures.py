@@ -0,0 +1,230 @@
+"""
+Record / replay layer for outbound HTTP calls (Airtable, Outscraper, Apollo,
+Places, Companies House, website scrapes).
+
+Every provider module goes through requests (the Outscraper SDK included), so
+this hooks requests.Session.send while active:
+
+    record  - calls go out as normal; each response is captured with its timing
+    replay  - responses are served from the fixture file; nothing leaves the machine
+              (unmatched requests raise ConnectionError, like an offline network)
+
+Fixtures are gzip-compressed JSON (*.json.gz). API keys in query strings and
+JSON bodies are redacted before anything is written or matched.
+
+Usage:
+    with http_fixtures.recording("fixtures/search_haulage.json.gz"):
+        search_service.search_outscraper(...)
+
+    with http_fixtures.replaying("fixtures/search_haulage.json.gz", realtime=False):
+        search_service.search_outscraper(...)   # same results, zero network latency
+
+Or for a whole process (picked up by provider_urls on import):
+    SF_HTTP_FIXTURES=replay SF_HTTP_FIXTURES_PATH=fixtures/run.json.gz [SF_HTTP_FIXTURES_REALTIME=1]
+"""
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+FIXTURE_VERSION = 1
+
+# Query / JSON keys that carry credentials
+SECRET_KEYS = {"key", "api_key", "apikey", "api-key", "token"}
+REDACTED = "REDACTED"
+
+# Response headers worth keeping (Retry-After drives the Airtable backoff)
+KEPT_HEADERS = {"content-type", "retry-after", "location"}
+
+_lock = threading.Lock()
+_original_send = requests.Session.send
+_active = None
+
+
+def _redact_url(url):
+    parts = urlsplit(url)
+    query = [(k, REDACTED if k.lower() in SECRET_KEYS else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(sorted(query))))
+
+
+def _redact_body(body):
+    if not body:
+        return ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(data, dict):
+        data = {k: (REDACTED if k.lower() in SECRET_KEYS else v) for k, v in data.items()}
+    return json.dumps(data, sort_keys=True)
+
+
+def request_key(method, url, body=None):
+    """Stable match key: method, redacted URL with sorted query, hash of the redacted body."""
+    digest = hashlib.sha1(_redact_body(body).encode()).hexdigest()[:16]
+    return f"{method.upper()} {_redact_url(url)} {digest}"
+
+
+class Cassette:
+    """
+    Interactions recorded for one fixture file. Identical requests are stored
+    in order and replayed in order (the last one repeats once exhausted),
+    so list-then-write-then-list flows replay faithfully.
+    """
+
+    def __init__(self, path, mode, realtime=False):
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self.interactions = []
+        self._by_key = {}
+        self._cursor = {}
+        if mode == "replay":
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        self.interactions = data.get("interactions", [])
+        self._by_key = {}
+        for item in self.interactions:
+            self._by_key.setdefault(item["key"], []).append(item)
+        self._cursor = {}
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            json.dump({"version": FIXTURE_VERSION, "interactions": self.interactions}, f)
+
+    def record(self, request, response, elapsed):
+        item = {
+            "key": request_key(request.method, request.url, request.body),
+            "method": request.method,
+            "url": _redact_url(request.url),
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS},
+            "body": base64.b64encode(response.content or b"").decode("ascii"),
+            "encoding": response.encoding,
+            "elapsed": round(elapsed, 4),
+            "at": round(time.time(), 3),
+        }
+        with _lock:
+            self.interactions.append(item)
+            self._by_key.setdefault(item["key"], []).append(item)
+
+    def lookup(self, request):
+        key = request_key(request.method, request.url, request.body)
+        with _lock:
+            matches = self._by_key.get(key)
+            if not matches:
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return matches[min(index, len(matches) - 1)]
+
+
+def _build_response(request, item):
+    response = requests.Response()
+    response.status_code = item["status"]
+    response.headers = CaseInsensitiveDict(item.get("headers") or {})
+    response._content = base64.b64decode(item["body"])
+    response.encoding = item.get("encoding")
+    response.url = request.url
+    response.request = request
+    response.reason = "Replayed"
+    response.elapsed = timedelta(seconds=item.get("elapsed", 0))
+    return response
+
+
+def _patched_send(session, request, **kwargs):
+    cassette = _active
+    if cassette is None:
+        return _original_send(session, request, **kwargs)
+
+    if cassette.mode == "replay":
+        item = cassette.lookup(request)
+        if item is None:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded fixture for {request.method} {_redact_url(request.url)} in {cassette.path}",
+                request=request,
+            )
+        if cassette.realtime and item.get("elapsed"):
+            time.sleep(item["elapsed"])
+        return _build_response(request, item)
+
+    t0 = time.perf_counter()
+    response = _original_send(session, request, **kwargs)
+    cassette.record(request, response, time.perf_counter() - t0)
+    return response
+
+
+def active_mode():
+    """'record', 'replay' or None."""
+    return _active.mode if _active else None
+
+
+def start(path, mode, realtime=False):
+    """Activates recording or replay for the whole process until stop()."""
+    global _active
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Unknown fixture mode '{mode}' (use 'record' or 'replay')")
+    cassette = Cassette(path, mode, realtime)
+    with _lock:
+        _active = cassette
+        requests.Session.send = _patched_send
+    return cassette
+
+
+def stop():
+    """Deactivates the layer; a recording is written to disk."""
+    global _active
+    with _lock:
+        cassette, _active = _active, None
+        requests.Session.send = _original_send
+    if cassette is not None and cassette.mode == "record":
+        cassette.save()
+    return cassette
+
+
+@contextmanager
+def recording(path):
+    cassette = start(path, "record")
+    try:
+        yield cassette
+    finally:
+        stop()
+
+
+@contextmanager
+def replaying(path, realtime=False):
+    cassette = start(path, "replay", realtime)
+    try:
+        yield cassette
+    finally:
+        stop()
+
+
+def install_from_env():
+    """Starts record/replay from SF_HTTP_FIXTURES* env vars (no-op when unset or already active)."""
+    mode = os.environ.get("SF_HTTP_FIXTURES")
+    if not mode or _active is not None:
+        return
+    path = os.environ.get("SF_HTTP_FIXTURES_PATH", os.path.join("fixtures", "http.json.gz"))
+    realtime = os.environ.get("SF_HTTP_FIXTURES_REALTIME", "").lower() in ("1", "true", "yes")
+    start(path, mode.lower(), realtime)
+    if mode.lower() == "record":
+        atexit.register(stop)
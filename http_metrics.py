@@ -0,0 +1,400 @@
+"""
+Tracing and latency metrics for every outbound HTTP call (Airtable, Sheets,
+Outscraper, Apollo, Places, Companies House, website scrapes).
+
+Every provider module goes through requests (the Outscraper SDK and gspread
+included), so this hooks requests.adapters.HTTPAdapter.send: the layer below
+requests.Session.send, where http_fixtures records and replays. Recorded calls
+are traced like live ones; replayed calls never reach the network and are not.
+
+Each call is recorded with:
+
+    provider     from the host, matched against provider_urls (overrides included);
+                 "sheets" / "google_auth" for gspread, "web" for anything else
+    endpoint     method + URL path with record ids, company numbers etc. collapsed to :id
+    status       HTTP status, or 0 with the exception name when the call failed
+    ms           wall time including the response body
+    bytes_out / bytes_in
+    retry        0 for a first attempt (Airtable's _request_with_retry marks its retries)
+    user / session / interaction
+                 from set_context(); app.py tags each script or tab run
+
+and goes to:
+
+    - a ring of recent calls (recent(), by_interaction() for the ?metrics=1 view)
+    - in-process latency histograms per provider/endpoint (snapshot(), prometheus_text())
+    - a JSON lines log, when SF_HTTP_TRACE_LOG=path is set
+    - a Prometheus text page at http://127.0.0.1:<port>/metrics, when SF_METRICS_PORT=port is set
+
+Installed by provider_urls on import (install_from_env()).
+"""
+import contextvars
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+# Upper bounds (seconds) of the latency histogram buckets; Outscraper searches can run for minutes
+BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+RECENT_CALLS = 2000
+
+# Google hosts that aren't in provider_urls (gspread's API and token refresh)
+EXTRA_HOSTS = {
+    "sheets.googleapis.com": "sheets",
+    "www.googleapis.com": "sheets",
+    "oauth2.googleapis.com": "google_auth",
+}
+
+# Path segments that identify a record rather than an endpoint
+_AIRTABLE_ID = re.compile(r"^(app|tbl|rec|fld|viw)[A-Za-z0-9]{14}$")
+_DIGIT = re.compile(r"\d")
+
+_lock = threading.Lock()
+_original_send = HTTPAdapter.send
+_context = contextvars.ContextVar("http_metrics_context", default={})
+_recent = deque(maxlen=RECENT_CALLS)
+_series = {}        # (provider, endpoint) -> _Series
+_log_path = None
+_log_file = None
+_server = None
+
+
+class _Series:
+    """Counters and latency histogram for one provider endpoint."""
+
+    __slots__ = ("calls", "errors", "retries", "seconds", "bytes_out", "bytes_in", "statuses", "buckets")
+
+    def __init__(self):
+        self.calls = self.errors = self.retries = self.bytes_out = self.bytes_in = 0
+        self.seconds = 0.0
+        self.statuses = {}
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+
+    def add(self, call):
+        seconds = call["ms"] / 1000
+        self.calls += 1
+        self.errors += call["status"] == 0 or call["status"] >= 400
+        self.retries += call["retry"] > 0
+        self.seconds += seconds
+        self.bytes_out += call["bytes_out"]
+        self.bytes_in += call["bytes_in"]
+        status = str(call["status"] or call["error"])
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def quantile(self, q):
+        """Latency quantile in seconds, interpolated within its bucket (like Prometheus' histogram_quantile)."""
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                low = BUCKETS[i - 1] if i else 0.0
+                if i == len(BUCKETS):
+                    return low  # in +Inf: the largest finite bound is all we know
+                return low + (BUCKETS[i] - low) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+
+# --- CONTEXT ---
+def set_context(**fields):
+    """Tags calls made from here on (this thread/task) with user, session, interaction..."""
+    context = dict(_context.get())
+    context.update(fields)
+    _context.set(context)
+
+
+def current_context():
+    return dict(_context.get())
+
+
+@contextmanager
+def attempt(number):
+    """Marks the calls inside as attempt `number` (1 = first try) of a retry loop."""
+    token = _context.set({**_context.get(), "retry": max(number - 1, 0)})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def bind(fn):
+    """Wraps fn to run with the caller's context (for thread pools, which don't carry it over)."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+# --- CLASSIFYING ---
+def _provider_hosts():
+    """(netloc, path prefix, provider) for every provider base URL, defaults and overrides."""
+    import provider_urls  # imports this module; late import avoids the cycle
+
+    roots = set()
+    for provider, default in provider_urls.DEFAULT_BASE_URLS.items():
+        for url in (default, provider_urls.base_url(provider)):
+            parts = urlsplit(url)
+            roots.add((parts.netloc, parts.path.rstrip("/"), provider))
+    # Longest prefix first: stand-ins share one netloc (/airtable, /apollo...)
+    return sorted(roots, key=lambda root: -len(root[1]))
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_roots(overrides):
+    return _provider_hosts()
+
+
+def _roots():
+    # Overrides come from env vars (secrets are fixed for the process), so key the cache on those
+    return _cached_roots(tuple(sorted((k, v) for k, v in os.environ.items() if k.endswith("_BASE_URL"))))
+
+
+def classify(url):
+    """(provider, path below the provider's base URL, host) for a request URL."""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    for netloc, prefix, provider in _roots():
+        if netloc == parts.netloc and (path == prefix or path.startswith(prefix + "/")):
+            return provider, path[len(prefix):] or "/", parts.hostname or ""
+    if parts.hostname in EXTRA_HOSTS:
+        return EXTRA_HOSTS[parts.hostname], path, parts.hostname
+    return "web", "/", parts.hostname or ""
+
+
+def endpoint_path(path):
+    """URL path with ids collapsed, so each endpoint is one series (/v0/:id/Leads/:id)."""
+    segments = []
+    for segment in path.split("/"):
+        if _AIRTABLE_ID.match(segment) or len(_DIGIT.findall(segment)) >= 3:
+            segment = ":id"
+        segments.append(segment)
+    return "/".join(segments)
+
+
+def _body_size(body):
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    return 0  # streamed or file body
+
+
+# --- RECORDING ---
+def _traced_send(adapter, request, stream=False, **kwargs):
+    context = _context.get()
+    started = time.perf_counter()
+    status, error, bytes_in = 0, "", 0
+    try:
+        response = _original_send(adapter, request, stream=stream, **kwargs)
+        status = response.status_code
+        if stream:
+            bytes_in = int(response.headers.get("Content-Length") or 0)
+        else:
+            bytes_in = len(response.content)  # Session.send reads it next anyway; timing it here is more honest
+        return response
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        provider, path, host = classify(request.url)
+        _observe({
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "provider": provider,
+            "endpoint": f"{request.method} {endpoint_path(path)}",
+            "host": host,
+            "status": status,
+            "error": error,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "bytes_out": _body_size(request.body),
+            "bytes_in": bytes_in,
+            "retry": context.get("retry", 0),
+            "user": context.get("user", ""),
+            "session": context.get("session", ""),
+            "interaction": context.get("interaction", ""),
+        })
+
+
+def _observe(call):
+    global _log_file
+    with _lock:
+        _recent.append(call)
+        series = _series.get((call["provider"], call["endpoint"]))
+        if series is None:
+            series = _series[(call["provider"], call["endpoint"])] = _Series()
+        series.add(call)
+        if _log_path:
+            try:
+                if _log_file is None:
+                    _log_file = open(_log_path, "a", encoding="utf-8")
+                _log_file.write(json.dumps(call) + "\n")
+                _log_file.flush()
+            except OSError as e:
+                print(f"⚠️ HTTP trace log disabled ({_log_path}): {e}")
+                _disable_log()
+
+
+def _disable_log():
+    global _log_path, _log_file
+    if _log_file is not None:
+        _log_file.close()
+    _log_path, _log_file = None, None
+
+
+def reset():
+    """Clears the recent calls and histograms (benchmarks, tests)."""
+    with _lock:
+        _recent.clear()
+        _series.clear()
+
+
+# --- READING ---
+def recent(**match):
+    """Recent calls (oldest first), optionally filtered, e.g. recent(session="abc", provider="airtable")."""
+    with _lock:
+        calls = list(_recent)
+    return [c for c in calls if all(c.get(k) == v for k, v in match.items())]
+
+
+def by_interaction(session, limit=20):
+    """
+    Per interaction of one session (latest first): calls, total ms, ms per provider
+    (slowest first) and the dominant provider.
+    """
+    groups = {}
+    for call in recent(session=session):
+        group = groups.setdefault(call["interaction"], {"interaction": call["interaction"], "calls": 0,
+                                                        "ms": 0.0, "errors": 0, "providers": {}})
+        group["calls"] += 1
+        group["ms"] += call["ms"]
+        group["errors"] += call["status"] == 0 or call["status"] >= 400
+        group["providers"][call["provider"]] = group["providers"].get(call["provider"], 0.0) + call["ms"]
+    rows = list(groups.values())[::-1][:limit]  # dicts keep first-call order
+    for row in rows:
+        row["providers"] = dict(sorted(row["providers"].items(), key=lambda kv: -kv[1]))
+        row["dominant"] = next(iter(row["providers"]))
+    return rows
+
+
+def snapshot():
+    """One row per provider endpoint: calls, errors, retries, p50/p95 ms, total seconds, bytes."""
+    with _lock:
+        items = sorted(_series.items(), key=lambda kv: -kv[1].seconds)
+        return [{
+            "provider": provider, "endpoint": endpoint, "calls": s.calls, "errors": s.errors,
+            "retries": s.retries, "p50_ms": round(s.quantile(0.5) * 1000), "p95_ms": round(s.quantile(0.95) * 1000),
+            "total_s": round(s.seconds, 2), "bytes_out": s.bytes_out, "bytes_in": s.bytes_in,
+            "statuses": dict(s.statuses),
+        } for (provider, endpoint), s in items]
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """The histograms and counters in the Prometheus text exposition format."""
+    lines = [
+        "# HELP sf_outbound_request_duration_seconds Outbound HTTP call latency.",
+        "# TYPE sf_outbound_request_duration_seconds histogram",
+    ]
+    counters = {"requests": [], "retries": [], "bytes_out": [], "bytes_in": []}
+    with _lock:
+        for (provider, endpoint), s in sorted(_series.items()):
+            labels = f'provider="{_label(provider)}",endpoint="{_label(endpoint)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), s.buckets):
+                cumulative += count
+                lines.append(f'sf_outbound_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"sf_outbound_request_duration_seconds_sum{{{labels}}} {s.seconds:.6f}")
+            lines.append(f"sf_outbound_request_duration_seconds_count{{{labels}}} {s.calls}")
+            for status, count in sorted(s.statuses.items()):
+                counters["requests"].append(f'sf_outbound_requests_total{{{labels},status="{_label(status)}"}} {count}')
+            counters["retries"].append(f"sf_outbound_retries_total{{{labels}}} {s.retries}")
+            counters["bytes_out"].append(f'sf_outbound_bytes_total{{{labels},direction="out"}} {s.bytes_out}')
+            counters["bytes_in"].append(f'sf_outbound_bytes_total{{{labels},direction="in"}} {s.bytes_in}')
+    lines += ["# HELP sf_outbound_requests_total Outbound HTTP calls by status (or exception name).",
+              "# TYPE sf_outbound_requests_total counter"] + counters["requests"]
+    lines += ["# HELP sf_outbound_retries_total Outbound HTTP calls that were retries.",
+              "# TYPE sf_outbound_retries_total counter"] + counters["retries"]
+    lines += ["# HELP sf_outbound_bytes_total Outbound HTTP body bytes sent and received.",
+              "# TYPE sf_outbound_bytes_total counter"] + counters["bytes_out"] + counters["bytes_in"]
+    return "\n".join(lines) + "\n"
+
+
+# --- EXPOSING ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port, host="127.0.0.1"):
+    """Serves prometheus_text() at http://host:port/metrics from a daemon thread (once per process)."""
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="http-metrics", daemon=True).start()
+            print(f"📈 Outbound call metrics at http://{host}:{_server.server_address[1]}/metrics")
+    return _server
+
+
+def log_to(path):
+    """Appends every call as a JSON line to path (None stops logging)."""
+    global _log_path
+    with _lock:
+        _disable_log()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            _log_path = path
+
+
+def install():
+    HTTPAdapter.send = _traced_send
+
+
+def uninstall():
+    HTTPAdapter.send = _original_send
+
+
+def install_from_env():
+    """Hooks outbound calls; SF_HTTP_TRACE_LOG and SF_METRICS_PORT switch on the log and the /metrics page."""
+    install()
+    if os.environ.get("SF_HTTP_TRACE_LOG"):
+        log_to(os.environ["SF_HTTP_TRACE_LOG"])
+    port = os.environ.get("SF_METRICS_PORT")
+    if port:
+        try:
+            serve(int(port))
+        except OSError as e:
+            print(f"⚠️ Could not serve metrics on port {port}: {e}")
@@ -0,0 +1,153 @@
+"""
+Streaming lead export to CSV or Parquet.
+
+Leads come in pages from db_manager.iter_leads() and are written out page by
+page (one Parquet row group per page), so exporting a large workspace never
+holds more than one page in memory. Notes are flattened into plain columns
+(email, owner, phone, socials...); "Notes JSON" keeps the raw notes for
+moving leads between backends.
+"""
+import csv
+import io
+import json
+
+# Lead columns, in export order
+LEAD_FIELDS = ["Business Name", "Sector", "Address", "Website", "Status", "Contact Name",
+               "Last Contact", "Next Action", "Value"]
+
+SOCIAL_NETWORKS = {"LinkedIn": "linkedin", "Facebook": "facebook", "Instagram": "instagram",
+                   "Twitter": "twitter", "YouTube": "youtube", "TikTok": "tiktok"}
+
+
+def _emails(notes):
+    """Primary email first, then any extra valid addresses (as in db_manager)."""
+    out = []
+    candidates = [notes.get("email")] + (notes.get("emails") if isinstance(notes.get("emails"), list) else [])
+    for e in candidates:
+        e = str(e or "").strip()
+        if "@" in e and e not in out:
+            out.append(e)
+    return out
+
+
+def _phones(notes):
+    phones = [notes.get("direct_phone"), notes.get("company_phone")]
+    if isinstance(notes.get("phones"), list):
+        phones.extend(notes["phones"])
+    return list(dict.fromkeys(str(p).strip() for p in phones if p and str(p).strip()))
+
+
+def _owner(notes):
+    if notes.get("owner"):
+        return notes["owner"]
+    return " ".join(str(notes.get(k) or "") for k in ("owner_first", "owner_last")).strip()
+
+
+def _social(network):
+    def get(notes):
+        links = notes.get("social_links")
+        url = links.get(network) if isinstance(links, dict) else None
+        if not url and network == "linkedin":
+            url = notes.get("linkedin_company")
+        return url or ""
+    return get
+
+
+# Flattened notes column -> function of the decoded notes dict
+NOTE_COLUMNS = {
+    "Email": lambda n: (_emails(n) or [""])[0],
+    "All Emails": lambda n: "; ".join(_emails(n)),
+    "Owner": _owner,
+    "Owner Title": lambda n: n.get("owner_title") or "",
+    "Phone": lambda n: (_phones(n) or [""])[0],
+    "All Phones": lambda n: "; ".join(_phones(n)),
+    **{name: _social(key) for name, key in SOCIAL_NETWORKS.items()},
+    "Contact URL": lambda n: n.get("contact_url") or "",
+    # Step 0 is the first email, so only a missing step is blank
+    "Outreach Step": lambda n: "" if n.get("outreach_step") is None else n["outreach_step"],
+    "Source": lambda n: n.get("source") or "",
+}
+
+RAW_NOTES = "Notes JSON"
+
+ALL_COLUMNS = ["id"] + LEAD_FIELDS + list(NOTE_COLUMNS) + [RAW_NOTES]
+DEFAULT_COLUMNS = ["Business Name", "Sector", "Status", "Contact Name", "Next Action", "Value",
+                   "Email", "Owner", "Phone", "Website", "LinkedIn"]
+
+
+def lead_fields(columns):
+    """Lead keys to fetch (for iter_leads(fields=...)) to fill the given columns."""
+    fields = [c for c in LEAD_FIELDS if c in columns]
+    if any(c in NOTE_COLUMNS or c == RAW_NOTES for c in columns):
+        fields.append("Notes")
+    return fields
+
+
+def flatten(lead, columns):
+    """One export row (list of values, in columns order) for a lead."""
+    notes = None
+    if any(c in NOTE_COLUMNS for c in columns):
+        notes = lead.get("Notes")
+        if not isinstance(notes, dict):
+            notes = {}
+    row = []
+    for col in columns:
+        if col in NOTE_COLUMNS:
+            value = NOTE_COLUMNS[col](notes)
+        elif col == RAW_NOTES:
+            value = lead.raw_notes() if hasattr(lead, "raw_notes") else json.dumps(lead.get("Notes") or {})
+        else:
+            value = lead.get(col)
+        row.append("" if value is None else value)
+    return row
+
+
+def write_csv(pages, columns, fileobj):
+    """Streams pages of leads into a CSV text file. Returns the number of rows."""
+    writer = csv.writer(fileobj)
+    writer.writerow(columns)
+    count = 0
+    for page in pages:
+        writer.writerows(flatten(lead, columns) for lead in page)
+        count += len(page)
+    return count
+
+
+def write_parquet(pages, columns, fileobj):
+    """Streams pages of leads into a Parquet file (one row group per page). Returns the number of rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(c, pa.float64() if c == "Value" else pa.string()) for c in columns])
+    count = 0
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for page in pages:
+            rows = [flatten(lead, columns) for lead in page]
+            arrays = []
+            for i, col in enumerate(columns):
+                if col == "Value":
+                    arrays.append(pa.array([_number(r[i]) for r in rows], pa.float64()))
+                else:
+                    arrays.append(pa.array([str(r[i]) for r in rows], pa.string()))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def write_export(pages, columns, fileobj, fmt="csv"):
+    """Writes pages in fmt ("csv" or "parquet") to a binary file object. Returns the number of rows."""
+    if fmt == "parquet":
+        return write_parquet(pages, columns, fileobj)
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+    try:
+        return write_csv(pages, columns, text)
+    finally:
+        text.flush()
+        text.detach()
@@ -0,0 +1,148 @@
+"""
+Streaming CSV lead import.
+
+The file is read IMPORT_CHUNK_ROWS rows at a time, so memory stays flat
+however long the prospect list is. Column aliases are resolved once from the
+header; each chunk is then cleaned, checked against the user's existing
+business names and deduped with vectorized pandas operations, and handed to
+db_manager.add_leads_bulk() as one batch.
+"""
+import numpy as np
+import pandas as pd
+
+IMPORT_CHUNK_ROWS = 2000
+
+# Lead field -> accepted CSV headers (lowercased), in priority order.
+# Each row takes its value from the first of those columns that isn't blank.
+COLUMN_ALIASES = {
+    "Business Name": ("business name", "company", "company name", "business", "name"),
+    "Sector": ("sector", "industry", "category"),
+    "Address": ("address", "location", "town", "city"),
+    "Website": ("website", "url", "web", "site"),
+    "Contact Name": ("contact name", "contact", "contact person"),
+    "Email": ("email", "email address", "e-mail"),
+}
+
+DEFAULTS = {"Sector": "Imported", "Address": "Unknown", "Website": "", "Contact Name": "", "Email": ""}
+
+PREVIEW_ROWS = 20
+
+
+def resolve_columns(header):
+    """Maps each lead field to the CSV columns that feed it (see COLUMN_ALIASES)."""
+    by_name = {}
+    for col in header:
+        by_name.setdefault(str(col).strip().lower(), col)
+    columns = {field: [by_name[a] for a in aliases if a in by_name] for field, aliases in COLUMN_ALIASES.items()}
+    if not columns["Business Name"]:
+        raise ValueError("Could not find a 'Business Name', 'Company', or 'Name' column in your CSV.")
+    return columns
+
+
+def name_key(names):
+    """Dedupe key for a Series of business names (same rule as the outbox duplicate check)."""
+    return names.astype(str).str.strip().str.lower()
+
+
+def _is_in(keys, names):
+    """Boolean mask of keys found in the set names (Series.isin would rehash all of names per chunk)."""
+    return pd.Series(np.fromiter((k in names for k in keys), bool, len(keys)), index=keys.index)
+
+
+def _first_filled(chunk, cols, default):
+    out = None
+    for col in cols:
+        values = chunk[col].str.strip().str.replace(r"\s+", " ", regex=True)
+        values = values.where(values != "")
+        out = values if out is None else out.fillna(values)
+    if out is None:
+        return pd.Series(default, index=chunk.index, dtype=object)
+    return out.fillna(default)
+
+
+class CsvLeadImport:
+    """
+    One pass over an uploaded CSV.
+
+    fileobj: seekable binary/text file (e.g. a Streamlit UploadedFile).
+    existing_names: business names the user already has; rows matching one
+    (case-insensitively) are skipped, as are repeats within the file.
+
+    batches() yields lists of new lead dicts, chunk by chunk; stats counts
+    rows, blank names, existing leads, in-file duplicates and new leads.
+    """
+
+    def __init__(self, fileobj, existing_names=(), chunk_rows=IMPORT_CHUNK_ROWS):
+        self.fileobj = fileobj
+        self.chunk_rows = chunk_rows
+        self.existing = set(name_key(pd.Series(list(existing_names), dtype=object)))
+        self.existing.discard("")
+        fileobj.seek(0)
+        self.columns = resolve_columns(pd.read_csv(fileobj, nrows=0).columns)
+        self.stats = {"rows": 0, "blank": 0, "existing": 0, "duplicate": 0, "new": 0}
+        self._seen = set()
+
+    def _read(self):
+        """Starts a fresh pass over the file (stats and in-file dedupe reset)."""
+        self.stats = dict.fromkeys(self.stats, 0)
+        self._seen = set()
+        self.fileobj.seek(0)
+        usecols = sorted({col for cols in self.columns.values() for col in cols}, key=str)
+        # Strings only, and no NA guessing: a business called "None" stays "None"
+        return pd.read_csv(self.fileobj, usecols=usecols, dtype=str, keep_default_na=False,
+                           chunksize=self.chunk_rows)
+
+    def _clean(self, chunk):
+        """Lead fields of one chunk, normalized and filtered to the rows to import."""
+        frame = pd.DataFrame({field: _first_filled(chunk, cols, DEFAULTS.get(field, ""))
+                              for field, cols in self.columns.items()})
+        key = name_key(frame["Business Name"])
+        blank = frame["Business Name"] == ""
+        existing = _is_in(key, self.existing) & ~blank
+        duplicate = ~blank & ~existing & (key.duplicated() | _is_in(key, self._seen))
+        new = ~(blank | existing | duplicate)
+
+        self.stats["rows"] += len(frame)
+        self.stats["blank"] += int(blank.sum())
+        self.stats["existing"] += int(existing.sum())
+        self.stats["duplicate"] += int(duplicate.sum())
+        self.stats["new"] += int(new.sum())
+        self._seen.update(key[new])
+        return frame[new]
+
+    @staticmethod
+    def _to_leads(frame):
+        leads = []
+        for row in frame.to_dict("records"):
+            email = row.pop("Email")
+            notes = {"source": "csv_import"}
+            if email:
+                notes["email"] = email
+            row["Notes"] = notes
+            leads.append(row)
+        return leads
+
+    def progress(self):
+        """Fraction of the file read so far (by bytes)."""
+        size = getattr(self.fileobj, "size", None)
+        if not size:
+            return 0.0
+        return min(self.fileobj.tell() / size, 1.0)
+
+    def batches(self):
+        for chunk in self._read():
+            frame = self._clean(chunk)
+            if len(frame):
+                yield self._to_leads(frame)
+
+    def preview(self, rows=PREVIEW_ROWS):
+        """
+        Dry run: scans the whole file (filling stats) without writing anything.
+        Returns a DataFrame of the first rows that would be imported.
+        """
+        sample = []
+        for chunk in self._read():
+            frame = self._clean(chunk)
+            if len(sample) < rows:
+                sample.extend(frame.head(rows - len(sample)).to_dict("records"))
+        return pd.DataFrame(sample, columns=list(self.columns))
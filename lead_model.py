@@ -0,0 +1,133 @@
+import copy
+import json
+
+# App-level lead keys, in the order every backend returns them
+LEAD_FIELDS = [
+    "Business Name", "Sector", "Address", "Website", "Status",
+    "Contact Name", "Last Contact", "Next Action", "Notes", "Value"
+]
+
+_PENDING = object()
+
+
+def parse_notes(raw, keep_raw=False):
+    """
+    Decodes a notes JSON blob into a dict.
+    Non-JSON text is kept under "raw" when keep_raw is set (Airtable behaviour),
+    otherwise anything unparseable becomes an empty dict.
+    """
+    if isinstance(raw, dict):
+        return raw
+    if raw is None:
+        return {}
+    raw = str(raw)
+    if not raw.strip():
+        return {}
+    try:
+        notes = json.loads(raw)
+    except Exception:
+        return {"raw": raw} if keep_raw else {}
+    return notes if isinstance(notes, dict) else {}
+
+
+class LazyLead(dict):
+    """
+    A lead dict whose "Notes" JSON is only decoded the first time it is read.
+    Behaves like a plain dict everywhere else (DataFrame, json.dumps, .get),
+    so callers that never touch Notes never pay for parsing it.
+    lazy_key names the key holding the notes ("Notes" for leads, "notes"
+    for mail recipients).
+    """
+    __slots__ = ("_raw_notes", "_keep_raw", "_lazy_key")
+
+    def __init__(self, data, raw_notes=None, keep_raw=False, lazy_key="Notes"):
+        super().__init__(data)
+        self._raw_notes = raw_notes
+        self._keep_raw = keep_raw
+        self._lazy_key = lazy_key
+        if raw_notes is not None:
+            dict.__setitem__(self, lazy_key, _PENDING)
+
+    def raw_notes(self):
+        """The notes as a JSON string, without decoding them if still pending."""
+        if self._raw_notes is not None:
+            return str(self._raw_notes)
+        return json.dumps(dict.get(self, self._lazy_key), sort_keys=True, default=str)
+
+    def _materialize(self):
+        if self._raw_notes is not None:
+            dict.__setitem__(self, self._lazy_key, parse_notes(self._raw_notes, self._keep_raw))
+            self._raw_notes = None
+
+    def __getitem__(self, key):
+        if key == self._lazy_key:
+            self._materialize()
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if key == self._lazy_key:
+            self._materialize()
+        return dict.get(self, key, default)
+
+    def __setitem__(self, key, value):
+        if key == self._lazy_key:
+            self._raw_notes = None
+        dict.__setitem__(self, key, value)
+
+    def __iter__(self):
+        # Defining __iter__ stops dict(lead) / {**lead} from copying the
+        # pending sentinel directly; they go through __getitem__ instead.
+        return iter(dict.keys(self))
+
+    def items(self):
+        self._materialize()
+        return dict.items(self)
+
+    def values(self):
+        self._materialize()
+        return dict.values(self)
+
+    def pop(self, key, *args):
+        if key == self._lazy_key:
+            self._materialize()
+        return dict.pop(self, key, *args)
+
+    def copy(self):
+        self._materialize()
+        return LazyLead(dict.items(self), lazy_key=self._lazy_key)
+
+    def __deepcopy__(self, memo):
+        # Still-pending notes stay pending (and undecoded) in the copy
+        data = {k: (v if v is _PENDING else copy.deepcopy(v, memo)) for k, v in dict.items(self)}
+        return LazyLead(data, self._raw_notes, self._keep_raw, self._lazy_key)
+
+    def __eq__(self, other):
+        self._materialize()
+        return dict.__eq__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._materialize()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        self._materialize()
+        return (LazyLead, (dict(dict.items(self)), None, False, self._lazy_key))
+
+
+def project_lead(lead_id, values, fields=None, raw_notes=None, keep_raw=False):
+    """
+    Builds a LazyLead from app-level values, keeping only the requested fields.
+    values: dict of app key -> value (excluding Notes, passed raw via raw_notes).
+    """
+    wanted = LEAD_FIELDS if fields is None else fields
+    data = {"id": lead_id}
+    for key in wanted:
+        if key in values:
+            data[key] = values[key]
+    if "Notes" not in wanted:
+        raw_notes = None
+    elif raw_notes is None:
+        data["Notes"] = {}
+    return LazyLead(data, raw_notes, keep_raw)
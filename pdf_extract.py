@@ -0,0 +1,153 @@
+"""
+Parallel, cached PDF text extraction.
+
+pdfplumber extraction is CPU-bound, so pages are split into ranges of
+PAGES_PER_TASK and spread across a process pool (all cores by default).
+Every extracted page is cached on disk under (file SHA-256, page number), so
+a PDF is never extracted twice and a partly extracted one only does the
+missing pages. iter_pages() streams pages back in order as their ranges
+finish.
+"""
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+PAGE_CACHE_DIR = os.path.join(".cache", "pdf_pages")
+PAGES_PER_TASK = 8
+
+_cache = None
+_pool = None
+_pool_workers = 0
+_lock = threading.Lock()
+
+
+def _page_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            import diskcache as dc
+            _cache = dc.Cache(PAGE_CACHE_DIR)
+        return _cache
+
+
+def _get_pool(workers):
+    """Shared process pool (spawned, so it's safe to start from Streamlit's threads)."""
+    global _pool, _pool_workers
+    with _lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_range(path, start, stop):
+    """Worker: text of pages start..stop-1 (1-based), as [(page, text)]. Failed pages are ""."""
+    import pdfplumber
+
+    out = []
+    with pdfplumber.open(path) as pdf:
+        for number in range(start, min(stop, len(pdf.pages) + 1)):
+            try:
+                text = pdf.pages[number - 1].extract_text() or ""
+            except Exception as e:
+                print(f"⚠️ {os.path.basename(path)} page {number}: {e}")
+                text = ""
+            out.append((number, text))
+            pdf.pages[number - 1].close()  # drop the page's parsed layout
+    return out
+
+
+def page_count(path, sha=None):
+    sha = sha or file_hash(path)
+    cache = _page_cache()
+    count = cache.get(f"{sha}:pages")
+    if count is None:
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            count = len(pdf.pages)
+        cache.set(f"{sha}:pages", count)
+    return count
+
+
+def _ranges(pages, size):
+    """Splits sorted page numbers into contiguous (start, stop) runs of at most size pages."""
+    runs = []
+    for page in pages:
+        if runs and runs[-1][1] == page and runs[-1][1] - runs[-1][0] < size:
+            runs[-1][1] = page + 1
+        else:
+            runs.append([page, page + 1])
+    return [tuple(r) for r in runs]
+
+
+def iter_pages(path, workers=None, pages_per_task=PAGES_PER_TASK, sha=None):
+    """
+    Yields (page number, text) for every page of a PDF, in order.
+    Cached pages are served straight away; the rest are extracted in
+    parallel page ranges and cached as they arrive.
+    workers: processes to use (default: all cores; 1 extracts in-process).
+    sha: the file's SHA-256 if the caller already has it.
+    """
+    sha = sha or file_hash(path)
+    cache = _page_cache()
+    count = page_count(path, sha)
+    cached = {}
+    for page in range(1, count + 1):
+        text = cache.get(f"{sha}:{page}")
+        if text is not None:
+            cached[page] = text
+    ranges = _ranges([p for p in range(1, count + 1) if p not in cached], pages_per_task)
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(ranges) > 1:
+        pool = _get_pool(workers)
+        pending = {start: pool.submit(extract_range, path, start, stop) for start, stop in ranges}
+    else:
+        pending = {start: None for start, _ in ranges}
+    stops = dict(ranges)
+
+    for page in range(1, count + 1):
+        if page not in cached:
+            # First page of a range that hasn't been collected yet
+            future = pending.pop(page)
+            result = None
+            if future is not None:
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    print(f"⚠️ PDF worker pool failed ({e}); extracting in-process")
+                    shutdown()
+            if result is None:
+                result = extract_range(path, page, stops[page])
+            for number, text in result:
+                cache.set(f"{sha}:{number}", text)
+                cached[number] = text
+        yield page, cached.pop(page, "")
+
+
+def extract_text(path, workers=None):
+    """Whole-document text with page markers (what extract_pdf.py prints)."""
+    return "".join(f"\n--- PAGE {page} ---\n{text}" for page, text in iter_pages(path, workers) if text)
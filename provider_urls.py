@@ -0,0 +1,76 @@
+import os
+
+import streamlit as st
+
+import http_fixtures
+import http_metrics
+
+# Production API roots for every outbound provider the app talks to
+DEFAULT_BASE_URLS = {
+    "airtable": "https://api.airtable.com",
+    "outscraper": "https://api.app.outscraper.com",
+    "apollo": "https://api.apollo.io",
+    "places": "https://places.googleapis.com",
+    "google_maps": "https://maps.googleapis.com",
+    "companies_house": "https://api.company-information.service.gov.uk",
+}
+
+# Poll interval for Outscraper async requests against a stand-in or replayed fixtures (the SDK waits 5s)
+STANDIN_POLL_PAUSE = 0.1
+
+# SF_HTTP_FIXTURES=record|replay wraps every provider call in the fixture layer
+http_fixtures.install_from_env()
+
+# Every outbound call is traced (provider, endpoint, status, latency, bytes, retries, user/session)
+http_metrics.install_from_env()
+
+
+def base_url(provider):
+    """
+    Returns the API root for a provider, without a trailing slash.
+    Override order: SF_<PROVIDER>_BASE_URL env var, then [base_urls] in
+    secrets.toml, then the production default. Overrides let scripts and
+    benchmarks run against local stand-ins (see standin_servers.py).
+    """
+    url = os.environ.get(f"SF_{provider.upper()}_BASE_URL")
+    if not url:
+        try:
+            url = st.secrets.get("base_urls", {}).get(provider)
+        except Exception:
+            url = None  # No secrets.toml
+    return (url or DEFAULT_BASE_URLS[provider]).rstrip("/")
+
+
+def is_overridden(provider):
+    return base_url(provider) != DEFAULT_BASE_URLS[provider]
+
+
+def outscraper_client(api_key):
+    """OutscraperClient that honours the configured base URL."""
+    from outscraper import OutscraperClient
+    client = OutscraperClient(api_key=api_key)
+    if is_overridden("outscraper"):
+        # The SDK walks a module-level list of API roots; give this client its own transport instead
+        client._transport = _pinned_transport(api_key, base_url("outscraper"))
+        client._transport._requests_pause = STANDIN_POLL_PAUSE
+    elif http_fixtures.active_mode() == "replay":
+        client._transport._requests_pause = STANDIN_POLL_PAUSE
+    return client
+
+
+def _pinned_transport(api_key, api_url):
+    """OutscraperTransport that sends every request to api_url, leaving the SDK's API_URLS untouched."""
+    import requests
+    from outscraper.transport import OutscraperTransport
+
+    class PinnedTransport(OutscraperTransport):
+        def api_request(self, method, path, *, wait_async, async_request, use_handle_response, **kwargs):
+            try:
+                response = requests.request(method, f"{api_url}{path}", headers=self._api_headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.SSLError):
+                raise Exception(f"Failed to perform request against {api_url}")
+            if use_handle_response:
+                return self._handle_response(response, wait_async, async_request)
+            return response
+
+    return PinnedTransport(api_key=api_key)
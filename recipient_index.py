@@ -0,0 +1,173 @@
+import bisect
+
+# Sorts after any lead ID, so (date, _LAST) bounds every entry on that date
+_LAST = "\uffff"
+
+# Recipient keys a lead write can change (see db_manager._recipient_fields)
+MUTABLE_KEYS = ("name", "contact", "sector", "status", "next_action", "notes", "email", "all_emails")
+
+
+def partition(items, size):
+    """Splits items into consecutive groups of at most size (BCC batches)."""
+    size = max(int(size), 1)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class RecipientIndex:
+    """
+    Bulk Mailer recipients for one user, with lookup tables so filtering and
+    batching don't rescan every lead on each rerun.
+
+    recipients: dicts shaped like db_manager.get_mail_recipients() items
+    ({id, name, contact, sector, email, all_emails, status, next_action, notes}).
+    lead_ids: IDs of all the user's leads, with or without an email (for the
+    "Without Email" count).
+
+    Kept current by db_manager's write paths through add(), update() and
+    remove(). A change it can't apply on its own (e.g. an email added to a
+    lead it holds no recipient data for) sets stale, and the owner rebuilds.
+    """
+
+    def __init__(self, recipients, lead_ids):
+        self.stale = False
+        self._lead_ids = {str(i) for i in lead_ids}
+        self._by_id = {}
+        self._by_status = {}
+        self._by_sector = {}
+        self._due = []  # sorted (next_action, id) for leads with a next action date
+        self._list = None
+        for recipient in recipients:
+            self._insert(recipient)
+        self._due.sort()
+
+    # --- maintenance ---
+    def _insert(self, recipient, keep_sorted=False):
+        key = str(recipient["id"])
+        self._lead_ids.add(key)
+        self._by_id[key] = recipient
+        self._by_status.setdefault(recipient.get("status") or "", set()).add(key)
+        self._by_sector.setdefault(recipient.get("sector") or "", set()).add(key)
+        next_action = str(recipient.get("next_action") or "")
+        if next_action:
+            if keep_sorted:
+                bisect.insort(self._due, (next_action, key))
+            else:
+                self._due.append((next_action, key))
+        self._list = None
+
+    def _unindex(self, key, recipient):
+        """Drops a recipient from the lookup tables (it keeps its place in order)."""
+        for table, value in ((self._by_status, recipient.get("status") or ""),
+                             (self._by_sector, recipient.get("sector") or "")):
+            ids = table.get(value)
+            if ids is not None:
+                ids.discard(key)
+                if not ids:
+                    del table[value]
+        next_action = str(recipient.get("next_action") or "")
+        if next_action:
+            pos = bisect.bisect_left(self._due, (next_action, key))
+            if pos < len(self._due) and self._due[pos] == (next_action, key):
+                del self._due[pos]
+        self._list = None
+
+    def _discard(self, key):
+        recipient = self._by_id.pop(key, None)
+        if recipient is not None:
+            self._unindex(key, recipient)
+        return recipient
+
+    def add(self, recipient=None, lead_id=None):
+        """Registers a new lead: a recipient dict, or just its ID when it has no email."""
+        if recipient is None:
+            self._lead_ids.add(str(lead_id))
+            return
+        self._discard(str(recipient["id"]))
+        self._insert(recipient, keep_sorted=True)
+
+    def update(self, lead_id, fields):
+        """Applies recipient-level changes (keys from MUTABLE_KEYS) to one lead."""
+        key = str(lead_id)
+        if key not in self._lead_ids:
+            return
+        recipient = self._by_id.get(key)
+        if recipient is None:
+            if fields.get("all_emails"):
+                # Gained an email, but we hold none of its other details
+                self.stale = True
+            return
+        self._unindex(key, recipient)
+        for name in MUTABLE_KEYS:
+            if name in fields:
+                recipient[name] = fields[name]
+        if recipient.get("all_emails"):
+            self._insert(recipient, keep_sorted=True)
+        else:
+            del self._by_id[key]
+
+    def remove(self, lead_id):
+        key = str(lead_id)
+        self._lead_ids.discard(key)
+        self._discard(key)
+
+    def __contains__(self, lead_id):
+        return str(lead_id) in self._lead_ids
+
+    # --- queries ---
+    @property
+    def total_leads(self):
+        return len(self._lead_ids)
+
+    @property
+    def recipients(self):
+        """All recipients, in backend order (new leads last)."""
+        if self._list is None:
+            self._list = list(self._by_id.values())
+        return self._list
+
+    def __len__(self):
+        return len(self._by_id)
+
+    @property
+    def statuses(self):
+        return sorted(s for s in self._by_status if s)
+
+    @property
+    def sectors(self):
+        return sorted(s for s in self._by_sector if s)
+
+    def _due_ids(self, due_on_or_before=None, due_before=None):
+        if due_on_or_before is not None:
+            end = bisect.bisect_right(self._due, (str(due_on_or_before), _LAST))
+        else:
+            end = bisect.bisect_left(self._due, (str(due_before), ""))
+        return {key for _, key in self._due[:end]}
+
+    def count_due(self, due_on_or_before):
+        """Recipients with a next action on or before the given YYYY-MM-DD date."""
+        return bisect.bisect_right(self._due, (str(due_on_or_before), _LAST))
+
+    def select(self, statuses=None, sectors=None, due_on_or_before=None, due_before=None):
+        """
+        Recipients matching every given filter, in recipients order.
+        sectors: leads with no sector are always kept (they can't be filtered out).
+        Dates are YYYY-MM-DD strings, compared like the stored next action.
+        """
+        chosen = None
+        if statuses is not None:
+            chosen = set().union(*(self._by_status.get(s, ()) for s in statuses))
+        if sectors is not None:
+            by_sector = set().union(self._by_sector.get("", ()), *(self._by_sector.get(s, ()) for s in sectors))
+            chosen = by_sector if chosen is None else chosen & by_sector
+        if due_on_or_before is not None or due_before is not None:
+            due = self._due_ids(due_on_or_before, due_before)
+            chosen = due if chosen is None else chosen & due
+        if chosen is None:
+            return self.recipients
+        if len(chosen) == len(self._by_id):
+            return self.recipients
+        return [r for key, r in self._by_id.items() if key in chosen]
+
+    @staticmethod
+    def batches(recipients, size):
+        return partition(recipients, size)
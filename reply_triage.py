@@ -0,0 +1,273 @@
+"""
+Batch reply triage for outreach responses.
+
+All trigger phrases are compiled into one trie-shaped regex, so each reply is
+scanned once no matter how many phrases there are. Intents are then picked
+in the same priority order handle_objection has always used:
+
+    book a call > not interested > warm interest > tell me more > how much
+    > send email > budget > call me later > fallback
+
+Replies can come from an mbox export or a CSV (one reply per row). They are
+matched to leads by sender email and turned into status changes.
+"""
+import csv
+import io
+import mailbox
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta, timezone
+from email.utils import parseaddr, parsedate_to_datetime
+
+# (intent, trigger phrases, phrases that veto the rule), in priority order
+RULES = [
+    # 1. Ready to book / strong positive — they want to proceed
+    ("book a call", ["let's do it", "let's go", "book a call", "book a chat", "set up a call",
+                     "arrange a call", "schedule a call", "when are you free", "when can we",
+                     "let's set something up", "put something in the diary", "get something booked",
+                     "happy to jump on a call", "i'm in", "count me in", "let's talk"], []),
+    # 2. Negative intent BEFORE warm interest (avoid "interested" matching "not interested")
+    ("not interested", ["not interested", "no thanks", "no thank you"], []),
+    # 3. Warm interest — positive but not yet committed to a call
+    ("warm interest", ["sounds good", "sounds great", "sounds interesting", "that sounds",
+                       "yes", "yeah", "yep", "sure", "absolutely", "definitely",
+                       "i'd be open", "open to", "i'm open", "why not", "go on",
+                       "interested", "love to", "would love", "i'd love",
+                       "sounds like a plan", "i like the sound", "great idea",
+                       "brilliant", "awesome", "amazing", "perfect",
+                       "thanks for reaching out", "glad you reached out",
+                       "could work", "might work", "worth a chat", "worth exploring"], []),
+    # 4. Tell me more — curious but needs info before committing
+    ("tell me more", ["tell me more", "more info", "more details", "more information",
+                      "what does it involve", "what's involved", "what would it look like",
+                      "how does it work", "how would it work", "what do you offer",
+                      "what are the options", "what packages", "what do partners get",
+                      "can you explain", "walk me through", "what exactly",
+                      "what would we get", "what's included", "what kind of"], []),
+    # 5. Price/Cost questions (strong buying signal)
+    ("how much", ["how much", "price"], []),
+    ("how much", ["cost"], ["expensive"]),
+    # 6. Standard Objections
+    ("send email", ["email", "send info"], []),
+    ("budget", ["budget", "expensive", "cost"], []),
+    ("call me later", ["busy", "later", "not a good time", "bad time"], []),
+]
+
+FALLBACK = "fallback"
+
+# Status change applied for each intent: (status, days until the next action)
+INTENT_ACTIONS = {
+    "book a call": ("Call Booked", 0),
+    "not interested": ("Not Interested", None),
+    "warm interest": ("Active", 0),
+    "tell me more": ("Active", 0),
+    "how much": ("Active", 0),
+    "send email": ("Active", 0),
+    "budget": ("Active", 0),
+    "call me later": ("Active", 7),
+}
+
+
+def _trie_pattern(phrases):
+    """Regex source matching any of phrases, factored by common prefix (longest first)."""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        ends = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if ends else body
+
+    return build(trie)
+
+
+class ReplyClassifier:
+    """Compiled matcher for RULES. classify() returns (intent, matched phrases)."""
+
+    def __init__(self, rules=RULES):
+        self.rules = [(intent, frozenset(p), frozenset(veto)) for intent, p, veto in rules]
+        phrases = sorted({p for _, ps, veto in self.rules for p in ps | veto})
+        # Lookahead, so overlapping phrases are all found in one scan
+        self._regex = re.compile(f"(?=({_trie_pattern(phrases)}))")
+        # The scan reports the longest phrase at each position; shorter phrases
+        # starting at the same place (its prefixes) are implied
+        self._prefixes = {p: [q for q in phrases if q != p and p.startswith(q)] for p in phrases}
+
+    def phrases_in(self, text):
+        found = set()
+        for phrase in self._regex.findall(text.lower()):
+            if phrase not in found:
+                found.add(phrase)
+                found.update(self._prefixes[phrase])
+        return found
+
+    def classify(self, text):
+        found = self.phrases_in(text or "")
+        for intent, phrases, veto in self.rules:
+            hits = phrases & found
+            if hits and not (veto & found):
+                return intent, sorted(hits)
+        return FALLBACK, []
+
+
+classifier = ReplyClassifier()
+
+
+def classify_reply(text):
+    """Intent of one reply (see RULES)."""
+    return classifier.classify(text)[0]
+
+
+# --- IMPORT ---
+_QUOTE_HEADER = re.compile(r"^\s*(On .+wrote:|-----Original Message-----|From: .+)\s*$", re.IGNORECASE)
+
+
+def strip_quoted(body):
+    """Keeps only the new text of a reply (drops '>' lines and the quoted thread)."""
+    lines = []
+    for line in body.splitlines():
+        if _QUOTE_HEADER.match(line):
+            break
+        if not line.lstrip().startswith(">"):
+            lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def _message_text(msg):
+    if msg.is_multipart():
+        for part in msg.walk():
+            if part.get_content_type() == "text/plain" and not part.get_filename():
+                payload = part.get_payload(decode=True) or b""
+                return payload.decode(part.get_content_charset() or "utf-8", "replace")
+        return ""
+    payload = msg.get_payload(decode=True) or b""
+    return payload.decode(msg.get_content_charset() or "utf-8", "replace")
+
+
+def read_mbox(data):
+    """Yields reply dicts {email, subject, date, text} from mbox bytes."""
+    fd, path = tempfile.mkstemp(suffix=".mbox")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        for msg in mailbox.mbox(path, create=False):
+            yield {
+                "email": parseaddr(msg.get("From", ""))[1].lower(),
+                "subject": msg.get("Subject", ""),
+                "date": msg.get("Date", ""),
+                "text": strip_quoted(_message_text(msg)),
+            }
+    finally:
+        os.remove(path)
+
+
+# CSV headers accepted for each reply field (lowercased)
+CSV_COLUMNS = {
+    "email": ("email", "from", "sender", "from email", "email address"),
+    "text": ("reply", "body", "message", "text", "content"),
+    "subject": ("subject",),
+    "date": ("date", "received", "sent"),
+}
+
+
+def read_csv(data):
+    """Yields reply dicts from CSV bytes/text with a header row (see CSV_COLUMNS)."""
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig", "replace")
+    reader = csv.DictReader(io.StringIO(data))
+    lookup = {}
+    for name in reader.fieldnames or []:
+        for field, aliases in CSV_COLUMNS.items():
+            if name.strip().lower() in aliases and field not in lookup:
+                lookup[field] = name
+    if "text" not in lookup:
+        raise ValueError("CSV needs a reply column (one of: " + ", ".join(CSV_COLUMNS["text"]) + ")")
+    for row in reader:
+        yield {
+            "email": parseaddr(row.get(lookup.get("email"), "") or "")[1].lower(),
+            "subject": row.get(lookup.get("subject"), "") or "",
+            "date": row.get(lookup.get("date"), "") or "",
+            "text": strip_quoted(row.get(lookup["text"], "") or ""),
+        }
+
+
+def read_replies(data, filename=""):
+    """Picks the reader from the file name (.csv, otherwise mbox)."""
+    if filename.lower().endswith(".csv"):
+        return read_csv(data)
+    return read_mbox(data)
+
+
+# --- TRIAGE ---
+def triage(replies, recipients):
+    """
+    Classifies replies and matches them to leads.
+    recipients: Bulk Mailer recipients (anything with id, name and all_emails).
+    Returns one dict per reply: email, subject, text, intent, matched, lead_id,
+    lead_name, status (the status it would get, or None).
+    """
+    by_email = {}
+    for r in recipients:
+        for address in r.get("all_emails") or [r.get("email")]:
+            if address:
+                by_email.setdefault(address.strip().lower(), r)
+
+    results = []
+    for reply in replies:
+        intent, matched = classifier.classify(reply["text"])
+        lead = by_email.get(reply["email"])
+        action = INTENT_ACTIONS.get(intent)
+        results.append(dict(
+            reply,
+            intent=intent,
+            matched=matched,
+            lead_id=lead["id"] if lead else None,
+            lead_name=lead["name"] if lead else "",
+            status=action[0] if action and lead else None,
+        ))
+    return results
+
+
+def _reply_date(value):
+    """Parses an RFC 2822 (mbox) or ISO (CSV export) date into an aware datetime, or None."""
+    if not value:
+        return None
+    try:
+        sent = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            sent = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    return sent if sent.tzinfo else sent.replace(tzinfo=timezone.utc)
+
+
+def apply_triage(results, lead_updates):
+    """
+    Queues the status changes for matched replies on a db.LeadUpdates batch.
+    The latest reply per lead wins, by its date when both replies have one,
+    otherwise by file order. Returns the number of leads changed.
+    """
+    latest = {}
+    for result in results:
+        if result["lead_id"] is None or result["intent"] not in INTENT_ACTIONS:
+            continue
+        sent = _reply_date(result.get("date"))
+        current = latest.get(result["lead_id"])
+        if current and sent and current[1] and sent < current[1]:
+            continue
+        latest[result["lead_id"]] = (result["intent"], sent)
+    today = datetime.now()
+    for lead_id, (intent, _) in latest.items():
+        status, days = INTENT_ACTIONS[intent]
+        next_date = (today + timedelta(days=days)).strftime("%Y-%m-%d") if days is not None else None
+        lead_updates.set_status(lead_id, status, next_date)
+    return len(latest)
@@ -1,25 +1,15 @@
-import os
-import pdfplumber
+import sys
+
+import doc_index
 
 def search(query):
     print(f"--- Searching for: {query} ---")
-    files = [f for f in os.listdir('.') if f.endswith('.pdf')]
-    for file in files:
-        try:
-            with pdfplumber.open(file) as pdf:
-                for i, p in enumerate(pdf.pages):
-                    text = p.extract_text() or ""
-                    if query.lower() in text.lower():
-                        print(f"FOUND in {file} (Page {i+1}):")
-                        # Print context
-                        lines = text.split('\n')
-                        for line in lines:
-                            if query.lower() in line.lower():
-                                print(f"  > {line.strip()}")
-        except:
-            pass
+    for hit in doc_index.search(query, limit=10, match_all=True):
+        print(f"FOUND in {hit['path']} ({doc_index.page_label(hit).capitalize()}):")
+        print(f"  > {hit['snippet']}")
 
 if __name__ == "__main__":
-    search("Module 1")
-    search("Social Media Audit")
-    search("Product Worksheet")
+    # Extracts only new or changed files; the first run indexes the whole library
+    doc_index.refresh()
+    for q in sys.argv[1:] or ["Module 1", "Social Media Audit", "Product Worksheet"]:
+        search(q)
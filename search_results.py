@@ -0,0 +1,221 @@
+"""
+Compact storage for a session's search results (st.session_state.leads).
+
+Search results used to live in a DataFrame with object columns (Social
+dicts, Emails lists, long Descriptions) and float64/int64 numbers, copied
+and re-sorted on every "Deeper Search". SearchResults keeps:
+
+- a table of the columns the results grid shows, with categorical Sector,
+  Source and Size (each distinct value stored once), float32
+  coordinates/distances/ratings, small ints for Reviews and Quality, and
+  pyarrow-backed strings (one buffer per column, no per-row str objects);
+- a side table of the nested, rarely read fields (Social, Emails,
+  Description) as zlib-compressed JSON, decoded only when a row needs them
+  (social icons for the grid, or adding the result to the user's leads).
+
+Rows have stable integer ids (the table index). extend() dedupes new rows
+by business name against a set and merges them in with a stable sort, so
+an append costs about the size of the batch plus one concat.
+"""
+import json
+import math
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Nested or long fields, kept out of the table
+DETAIL_FIELDS = ("Social", "Emails", "Description")
+
+CATEGORY_COLUMNS = ("Sector", "Source", "Size")
+FLOAT_COLUMNS = ("Rating", "Distance", "lat", "lon")
+INT_COLUMNS = {"Reviews": "int32", "Quality": "int8"}
+BOOL_COLUMNS = ("Is Chain",)
+STRING_DTYPE = pd.StringDtype("pyarrow")
+
+
+def _missing(value):
+    # np.float32 isn't a float subclass (np.float64 is), so numpy floats are checked separately
+    return value is None or (isinstance(value, (float, np.floating)) and math.isnan(value))
+
+
+def _number(value, default=math.nan):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return default if math.isnan(number) else number
+
+
+def _decode(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def _coerce(table):
+    """Compact dtypes for a results table (also re-applied after a concat that added columns)."""
+    for col in table.columns:
+        if col in CATEGORY_COLUMNS:
+            if not isinstance(table[col].dtype, pd.CategoricalDtype):
+                table[col] = table[col].astype(STRING_DTYPE).astype("category")
+        elif col in FLOAT_COLUMNS:
+            table[col] = pd.to_numeric(table[col], errors="coerce").astype("float32")
+        elif col in INT_COLUMNS:
+            table[col] = pd.to_numeric(table[col], errors="coerce").fillna(0).astype(INT_COLUMNS[col])
+        elif col in BOOL_COLUMNS:
+            table[col] = table[col].fillna(False).astype(bool)
+        elif table[col].dtype != STRING_DTYPE:
+            table[col] = table[col].astype(STRING_DTYPE)
+    return table
+
+
+class SearchResults:
+    """One session's search results: a compact table plus a side table of details."""
+
+    def __init__(self, rows=(), sort=False, limit=None):
+        self._table = pd.DataFrame()
+        self._details = {}   # row id -> zlib-compressed JSON of the row's detail fields
+        self._names = set()  # business names already held, for dedupe
+        self._next_id = 0
+        if len(rows):
+            self.extend(rows, sort=sort, limit=limit)
+
+    def __len__(self):
+        return len(self._table)
+
+    @property
+    def empty(self):
+        return self._table.empty
+
+    # --- BUILDING ---
+    def _column(self, col, values):
+        """Typed array for one column of a new batch."""
+        if col in CATEGORY_COLUMNS:
+            categories = list(self._table[col].cat.categories) if col in self._table.columns else []
+            code_of = {c: i for i, c in enumerate(categories)}
+            codes = []
+            for v in values:
+                if _missing(v):
+                    codes.append(-1)
+                    continue
+                v = str(v)
+                if v not in code_of:
+                    code_of[v] = len(categories)
+                    categories.append(v)
+                codes.append(code_of[v])
+            if col in self._table.columns and len(categories) > len(self._table[col].cat.categories):
+                self._table[col] = self._table[col].cat.set_categories(categories)
+            return pd.Categorical.from_codes(codes, categories=categories)
+        if col in FLOAT_COLUMNS:
+            return np.fromiter((_number(v) for v in values), dtype="float32", count=len(values))
+        if col in INT_COLUMNS:
+            return np.fromiter((_number(v, 0) for v in values), dtype=INT_COLUMNS[col], count=len(values))
+        if col in BOOL_COLUMNS:
+            return np.fromiter((bool(v) and not _missing(v) for v in values), dtype=bool, count=len(values))
+        return pd.array([None if _missing(v) else str(v) for v in values], dtype=STRING_DTYPE)
+
+    def _compact(self, rows):
+        """Table and detail map for a batch of row dicts (ids assigned here)."""
+        ids = range(self._next_id, self._next_id + len(rows))
+        self._next_id += len(rows)
+
+        details = {}
+        columns = {}
+        for rid, row in zip(ids, rows):
+            extra = {k: row[k] for k in DETAIL_FIELDS if row.get(k)}
+            if extra:
+                details[rid] = zlib.compress(json.dumps(extra, separators=(",", ":")).encode(), 1)
+            for col in row:
+                if col not in DETAIL_FIELDS:
+                    columns.setdefault(col, None)
+
+        table = pd.DataFrame({col: self._column(col, [row.get(col) for row in rows]) for col in columns},
+                             index=pd.Index(ids, dtype="int64"))
+        return table, details
+
+    def extend(self, rows, sort=False, limit=None):
+        """
+        Adds result dicts (or a DataFrame of them), skipping business names
+        already held. sort: keep the results ordered by Distance (the batch is
+        sorted first, so limit keeps its closest rows). limit: max new rows.
+        Returns the number of rows added.
+        """
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.to_dict("records")
+        fresh = []
+        for row in rows:
+            name = row.get("Business Name")
+            if name in self._names:
+                continue
+            self._names.add(name)
+            fresh.append(row)
+        if sort:
+            fresh.sort(key=lambda r: math.inf if _missing(r.get("Distance")) else r["Distance"])
+        if limit is not None:
+            for row in fresh[limit:]:
+                self._names.discard(row.get("Business Name"))
+            fresh = fresh[:limit]
+        if not fresh:
+            return 0
+
+        table, details = self._compact(fresh)
+        if self._table.empty:
+            self._table = table
+        else:
+            columns_match = list(table.columns) == list(self._table.columns)
+            self._table = pd.concat([self._table, table])
+            if not columns_match:
+                # A source without some columns (e.g. Google rows after Outscraper ones)
+                self._table = _coerce(self._table)
+        self._details.update(details)
+        if sort and "Distance" in self._table.columns:
+            # Both parts are already in order, so the stable sort is a cheap merge
+            self._table = self._table.sort_values("Distance", kind="stable", na_position="last")
+        return len(fresh)
+
+    # --- READING ---
+    def frame(self):
+        """The table (without detail fields), indexed by row id. Safe to add display columns to."""
+        return self._table.copy()
+
+    def social(self):
+        """Social links per row id (for the grid's icons), decoding only rows that have details."""
+        links = {}
+        for rid, blob in self._details.items():
+            social = _decode(blob).get("Social")
+            if social:
+                links[rid] = social
+        return pd.Series(links, dtype=object).reindex(self._table.index)
+
+    def record(self, rid):
+        """One result as a plain dict, detail fields included (missing text is "", missing numbers None)."""
+        row = {}
+        for col, value in self._table.loc[rid].items():
+            if _missing(value) or value is pd.NA:
+                value = None if col in FLOAT_COLUMNS else ""
+            elif isinstance(value, np.floating):
+                value = float(str(value))  # shortest repr: float32 0.6 -> 0.6, not 0.6000000238
+            elif isinstance(value, np.generic):
+                value = value.item()
+            row[col] = value
+        if rid in self._details:
+            row.update(_decode(self._details[rid]))
+        return row
+
+    def memory_bytes(self):
+        """Approximate memory held: the table (deep) plus the compressed details."""
+        table = int(self._table.memory_usage(deep=True).sum())
+        return table + sum(sys.getsizeof(blob) for blob in self._details.values())
+
+
+def dataframe_memory_bytes(df):
+    """Deep size of a plain results DataFrame, counting nested dicts/lists (for comparison)."""
+    total = int(df.memory_usage(deep=True).sum())
+    for col in df.columns:
+        if df[col].dtype == object:
+            for value in df[col]:
+                if isinstance(value, dict):
+                    total += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+                elif isinstance(value, list):
+                    total += sum(sys.getsizeof(v) for v in value)
+    return total
@@ -6,18 +6,261 @@ import json
 import urllib.parse
 import streamlit as st # Added for debug feedback
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from outscraper import OutscraperClient # [NEW] Use official SDK
 from enrichment_service import scrape_website_social_links
-from cache_manager import get_cached_search, set_cached_search, clear_cache # [NEW] Caching
+# The cache opens (and runs its one-time purge) on the first search, not on import
+from cache_manager import get_cached_search, set_cached_search # [NEW] Caching
+from provider_urls import base_url, outscraper_client
+import http_metrics
+
+# --- OUTSCRAPER POST-PROCESSING ---
+# Known national/international chains to filter out
+CHAIN_EXCLUSIONS = [
+    "DHL", "FEDEX", "UPS", "ROYAL MAIL", "HERMES", "TNT", "TESCO",
+    "SAINSBURY", "ASDA", "ALDI", "LIDL", "MORRISONS", "WAITROSE",
+    "MCDONALD", "BURGER KING", "KFC", "SUBWAY", "COSTA COFFEE",
+    "STARBUCKS", "GREGGS", "DOMINO", "PIZZA HUT", "PREMIER INN",
+    "TRAVELODGE", "HILTON", "MARRIOTT", "HSBC", "BARCLAYS",
+    "LLOYDS", "NATWEST", "SANTANDER", "NATIONWIDE", "POST OFFICE",
+    "AUTOTRADER", "HALFORDS", "KWIK FIT", "VODAFONE", "O2", "EE",
+    "THREE", "BT", "SKY", "VIRGIN MEDIA", "AMAZON"
+]
+
+# Junk categories (checked against category and name)
+EXCLUDED_TERMS = [
+    "TAXI", "AIRPORT SHUTTLE", "AMBULANCE", "CHAUFFEUR",
+    "CAB ", "MINICAB", "UBER", "CHURCH", "CEMETERY",
+    "GOVERNMENT OFFICE", "PUBLIC SCHOOL"
+]
+
+# Businesses that are clearly wrong regardless of search term
+NEGATIVE_KEYWORDS = {
+    "TAKEAWAY", "PIZZA", "CHINESE", "INDIAN", "KEBAB", "FISH AND CHIPS",
+    "FOOD DELIVERY", "FAST FOOD", "RESTAURANT", "CAFE", "COFFEE",
+    "CLEANING SERVICE", "NAIL SALON", "HAIR SALON", "BARBER",
+    "DENTIST", "PHARMACY", "OPTICIAN", "VETERINAR",
+    "CHARITY", "CHURCH", "SCHOOL", "NURSERY",
+}
+
+
+def relevance_words(search_terms):
+    """Words (longer than 3 chars) of which at least one must appear in a relevant result."""
+    words = set()
+    for term in search_terms or []:
+        for word in term.upper().split():
+            if len(word) > 3:  # Skip short words like "in", "and"
+                words.add(word)
+    return words
+
+
+def result_name(item):
+    """Business name from an Outscraper item (or Google Places displayName), None if missing."""
+    name = item.get("name")
+    if not name:
+        # Fallback: try displayName structure (Google Places format)
+        display_name = item.get("displayName")
+        if isinstance(display_name, dict):
+            name = display_name.get("text")
+    if not name or name == "Unknown":
+        return None
+    return name
+
+
+def result_distance(item, start_lat, start_lon):
+    lat = item.get("latitude")
+    lon = item.get("longitude")
+    if lat and lon:
+        return round(haversine_distance(start_lat, start_lon, lat, lon), 1)
+    return 0.0
+
+
+def filter_reason(item, name, dist_val, radius, rel_words=None):
+    """
+    Returns why a result should be dropped ("distance", "junk", "chain",
+    "irrelevant", "negative"), or None to keep it.
+    """
+    # ABSOLUTE FILTER: If result is outside radius, discard it.
+    if dist_val > radius:
+        return "distance"
+
+    cat_upper = (item.get("category") or "").upper()
+    name_upper = (name or "").upper()
+
+    if any(term in cat_upper for term in EXCLUDED_TERMS) or any(term in name_upper for term in EXCLUDED_TERMS):
+        return "junk"
+
+    # Chain/National filter — skip large corporations with no local decision-maker
+    if any(chain in name_upper for chain in CHAIN_EXCLUSIONS):
+        return "chain"
+
+    # --- RELEVANCE FILTER ---
+    # This prevents "Motorcycle Dealer" searches returning bakeries/pubs
+    if rel_words:
+        subtypes = item.get("subtypes") or []
+        if isinstance(subtypes, str):
+            subtypes = [subtypes]
+        subtypes_upper = " ".join([s.upper() for s in subtypes])
+        desc_upper = (item.get("description") or "").upper()
+        all_text = f"{cat_upper} {name_upper} {subtypes_upper} {desc_upper}"
+        if not any(word in all_text for word in rel_words):
+            return "irrelevant"
+
+    # --- NEGATIVE KEYWORD FILTER ---
+    neg_text = f"{name_upper} {cat_upper}"
+    if any(neg in neg_text for neg in NEGATIVE_KEYWORDS):
+        return "negative"
+    return None
+
+
+def estimate_company_size(employees, reviews_count):
+    """Uses employees count if available, otherwise estimates from reviews."""
+    if employees and isinstance(employees, (int, str)):
+        try:
+            emp_count = int(str(employees).replace("+", "").replace(",", ""))
+            if emp_count > 250: return "Large (250+)"
+            elif emp_count > 50: return f"Medium ({emp_count})"
+            elif emp_count > 10: return f"Small ({emp_count})"
+            else: return f"Micro ({emp_count})"
+        except:
+            return str(employees)
+    elif reviews_count > 500:
+        return "Large (est.)"
+    elif reviews_count > 100:
+        return "Medium (est.)"
+    elif reviews_count > 20:
+        return "Small (est.)"
+    elif reviews_count > 0:
+        return f"Local ({reviews_count} reviews)"
+    return "Unknown"
+
+
+def lead_quality_score(website, phone, dist_val, reviews_count, rating):
+    """1-5 stars, using only data available from search (not enrichment)."""
+    quality_score = 0
+    if website:
+        quality_score += 1  # Has a website (can be enriched)
+    if phone:
+        quality_score += 1  # Has phone number (contactable)
+    if dist_val <= 25:
+        quality_score += 1  # Very local (within 25 miles)
+    if 5 <= reviews_count <= 500:
+        quality_score += 1  # Right size (not too small, not a chain)
+    if (rating or 0) >= 4.0:
+        quality_score += 1  # Well-rated business
+    return quality_score
+
+
+def map_outscraper_item(item, name, dist_val):
+    """Maps a kept search-v3 item to the app's result dict."""
+    # Fix field names: search-v3 uses 'website' not 'site', 'reviews' may be None
+    reviews_per = item.get("reviews_per_score") or {}
+    if isinstance(reviews_per, dict):
+        reviews_count = sum(int(v or 0) for v in reviews_per.values())
+    else:
+        reviews_count = 0
+    raw_reviews = item.get("reviews")
+    if raw_reviews is not None:
+        try:
+            reviews_count = int(raw_reviews)
+        except:
+            pass
+
+    website = item.get("website", item.get("site", "")) or ""
+    phone = item.get("phone", "") or ""
+
+    # Description: 'about' is a dict of features, 'description' is text
+    description = item.get("description") or ""
+    if not description:
+        about = item.get("about")
+        if isinstance(about, dict):
+            # Extract readable features
+            parts = []
+            for cat, features in about.items():
+                if isinstance(features, dict):
+                    enabled = [k for k, v in features.items() if v]
+                    if enabled:
+                        parts.append(f"{cat}: {', '.join(enabled)}")
+            description = "; ".join(parts) if parts else ""
+
+    owner = item.get("owner_title", "") or ""
+
+    # Sector: 'category' often null, use 'type' or 'subtypes'
+    sector_val = item.get("category") or item.get("type") or item.get("subtypes") or "Search Result"
+
+    # --- Inline extraction (no extra API call — enrichment happens on "Add to Leads") ---
+    social_links = {}
+    emails = []
+
+    # Some Outscraper results may include these if the plan supports it
+    for social_key in ["facebook", "instagram", "twitter", "linkedin", "youtube"]:
+        val = item.get(social_key, "")
+        if val:
+            social_links[social_key] = val
+    for email_key in ["email_1", "email_2", "email_3", "email"]:
+        val = item.get(email_key, "")
+        if val and val not in emails:
+            emails.append(val)
+
+    return {
+        "Business Name": name,
+        "Address": item.get("address", item.get("full_address", "")),
+        "Rating": item.get("rating") or 0.0,
+        "Sector": sector_val,
+        "Website": website,
+        "Phone": phone,
+        "lat": item.get("latitude"),
+        "lon": item.get("longitude"),
+        "place_id": item.get("place_id", item.get("google_id")),
+        "Source": "Outscraper V3",
+        "Distance": dist_val,
+        # --- ENRICHED FIELDS ---
+        "Reviews": reviews_count,
+        "Size": estimate_company_size(item.get("employees"), reviews_count),
+        "Description": description or "",
+        "Owner": owner,
+        "Social": social_links,
+        "Email": emails[0] if emails else "",
+        "Emails": emails,
+        "Quality": lead_quality_score(website, item.get("phone"), dist_val, reviews_count, item.get("rating")),
+        "Is Chain": False
+    }
+
+
+def process_outscraper_results(raw_businesses, start_lat, start_lon, radius, search_terms=None):
+    """
+    Filters and maps raw search-v3 items (no network calls).
+    Returns (mapped_results, skipped_dist, skipped_chain).
+    """
+    rel_words = relevance_words(search_terms)
+    mapped_results = []
+    skipped_dist = 0
+    skipped_chain = 0
+    for item in raw_businesses:
+        # Skip None/non-dict items from API response
+        if not item or not isinstance(item, dict):
+            continue
+        name = result_name(item)
+        if not name:
+            continue
+
+        # Post-Verification Filter (CRITICAL)
+        dist_val = result_distance(item, start_lat, start_lon)
+        reason = filter_reason(item, name, dist_val, radius, rel_words)
+        if reason == "distance":
+            skipped_dist += 1
+        elif reason == "chain":
+            skipped_chain += 1
+        if reason:
+            continue
+
+        mapped_results.append(map_outscraper_item(item, name, dist_val))
+    return mapped_results, skipped_dist, skipped_chain
+
+
+def sort_search_results(results):
+    """Sorts in place by Quality (highest first), then Reviews (most first), then Distance (closest first)."""
+    results.sort(key=lambda x: (-x.get("Quality", 0), -x.get("Reviews", 0), x.get("Distance", 999.0)))
+    return results
 
-# One-time cache purge on deploy to flush old non-enriched results
-import os
-_cache_version_file = os.path.join(".cache", "_v4_socials")
-if not os.path.exists(_cache_version_file):
-    clear_cache()
-    os.makedirs(".cache", exist_ok=True)
-    with open(_cache_version_file, "w") as f:
-        f.write("cleared")
 
 def search_outscraper(api_key, query, location_str, radius=50, limit=100, skip=0, google_api_key=None, search_terms=None):
     """
@@ -91,8 +334,7 @@ def search_outscraper(api_key, query, location_str, radius=50, limit=100, skip=0
     st.toast(f"Strict Search: '{query}' within {radius} miles...", icon="🎯")
     
     try:
-        from outscraper import OutscraperClient
-        client = OutscraperClient(api_key=api_key)
+        client = outscraper_client(api_key)
         
         # V3 Direct Parameters for Strict Radius
         # --- STRATEGY 1: STRICT DROPOFF (Preferred) ---
@@ -150,216 +392,9 @@ def search_outscraper(api_key, query, location_str, radius=50, limit=100, skip=0
                  if len(data["data"]) > 0:
                      raw_businesses = data["data"][0]
 
-        mapped_results = []
-        skipped_dist = 0
-        skipped_chain = 0
-        
-        # Known national/international chains to filter out
-        CHAIN_EXCLUSIONS = [
-            "DHL", "FEDEX", "UPS", "ROYAL MAIL", "HERMES", "TNT", "TESCO",
-            "SAINSBURY", "ASDA", "ALDI", "LIDL", "MORRISONS", "WAITROSE",
-            "MCDONALD", "BURGER KING", "KFC", "SUBWAY", "COSTA COFFEE",
-            "STARBUCKS", "GREGGS", "DOMINO", "PIZZA HUT", "PREMIER INN",
-            "TRAVELODGE", "HILTON", "MARRIOTT", "HSBC", "BARCLAYS",
-            "LLOYDS", "NATWEST", "SANTANDER", "NATIONWIDE", "POST OFFICE",
-            "AUTOTRADER", "HALFORDS", "KWIK FIT", "VODAFONE", "O2", "EE",
-            "THREE", "BT", "SKY", "VIRGIN MEDIA", "AMAZON"
-        ]
-        
-        for item in raw_businesses:
-            # Skip None/non-dict items from API response
-            if not item or not isinstance(item, dict):
-                continue
-                
-            name = item.get("name")
-            if not name:
-                # Fallback: try displayName structure (Google Places format)
-                display_name = item.get("displayName")
-                if isinstance(display_name, dict):
-                    name = display_name.get("text")
-            if not name:
-                name = "Unknown"
-            if not name or name == "Unknown":
-                continue
-            
-            # Post-Verification Filter (CRITICAL)
-            lat = item.get("latitude")
-            lon = item.get("longitude")
-            dist_val = 0.0
-            
-            if lat and lon:
-                dist_val = round(haversine_distance(start_lat, start_lon, lat, lon), 1)
-                
-            # ABSOLUTE FILTER: If result is outside radius, discard it.
-            if dist_val > radius:
-                skipped_dist += 1
-                continue
-                
-            # [UPGRADED] Cleaning Filters
-            cat_upper = (item.get("category") or "").upper()
-            name_upper = (name or "").upper()
-            
-            # Junk category filter
-            excluded_terms = ["TAXI", "AIRPORT SHUTTLE", "AMBULANCE", "CHAUFFEUR", 
-                            "CAB ", "MINICAB", "UBER", "CHURCH", "CEMETERY",
-                            "GOVERNMENT OFFICE", "PUBLIC SCHOOL"]
-            if any(term in cat_upper for term in excluded_terms) or any(term in name_upper for term in excluded_terms):
-                continue
-            
-            # Chain/National filter — skip large corporations with no local decision-maker
-            is_chain = any(chain in name_upper for chain in CHAIN_EXCLUSIONS)
-            if is_chain:
-                skipped_chain += 1
-                continue
-            
-            # --- RELEVANCE FILTER ---
-            # If we have search terms, verify result is actually relevant
-            # This prevents "Motorcycle Dealer" searches returning bakeries/pubs
-            if search_terms:
-                subtypes = item.get("subtypes") or []
-                if isinstance(subtypes, str):
-                    subtypes = [subtypes]
-                subtypes_upper = " ".join([s.upper() for s in subtypes])
-                desc_upper = (item.get("description") or "").upper()
-                
-                # Build all text to check against
-                all_text = f"{cat_upper} {name_upper} {subtypes_upper} {desc_upper}"
-                
-                # Check if ANY search term word matches
-                # e.g. for "Motorcycle Dealer", check "MOTORCYCLE" and "DEALER"
-                relevance_words = set()
-                for term in search_terms:
-                    for word in term.upper().split():
-                        if len(word) > 3:  # Skip short words like "in", "and"
-                            relevance_words.add(word)
-                
-                if relevance_words and not any(word in all_text for word in relevance_words):
-                    continue  # Skip irrelevant result
-            
-            # --- NEGATIVE KEYWORD FILTER ---
-            # Exclude businesses that are clearly wrong regardless of search term
-            _NEGATIVE_KEYWORDS = {
-                "TAKEAWAY", "PIZZA", "CHINESE", "INDIAN", "KEBAB", "FISH AND CHIPS",
-                "FOOD DELIVERY", "FAST FOOD", "RESTAURANT", "CAFE", "COFFEE",
-                "CLEANING SERVICE", "NAIL SALON", "HAIR SALON", "BARBER",
-                "DENTIST", "PHARMACY", "OPTICIAN", "VETERINAR",
-                "CHARITY", "CHURCH", "SCHOOL", "NURSERY",
-            }
-            neg_text = f"{name_upper} {cat_upper}"
-            if any(neg in neg_text for neg in _NEGATIVE_KEYWORDS):
-                continue  # Skip obviously irrelevant business
-
-
-            # --- EXTRACT DATA FROM OUTSCRAPER SEARCH-V3 ---
-            # Fix field names: search-v3 uses 'website' not 'site', 'reviews' may be None
-            reviews_per = item.get("reviews_per_score") or {}
-            if isinstance(reviews_per, dict):
-                reviews_count = sum(int(v or 0) for v in reviews_per.values())
-            else:
-                reviews_count = 0
-            raw_reviews = item.get("reviews")
-            if raw_reviews is not None:
-                try:
-                    reviews_count = int(raw_reviews)
-                except:
-                    pass
-            
-            website = item.get("website", item.get("site", "")) or ""
-            phone = item.get("phone", "") or ""
-            
-            # Description: 'about' is a dict of features, 'description' is text
-            description = item.get("description") or ""
-            if not description:
-                about = item.get("about")
-                if isinstance(about, dict):
-                    # Extract readable features
-                    parts = []
-                    for cat, features in about.items():
-                        if isinstance(features, dict):
-                            enabled = [k for k, v in features.items() if v]
-                            if enabled:
-                                parts.append(f"{cat}: {', '.join(enabled)}")
-                    description = "; ".join(parts) if parts else ""
-                    
-            owner = item.get("owner_title", "") or ""
-            
-            # Sector: 'category' often null, use 'type' or 'subtypes'
-            sector_val = item.get("category") or item.get("type") or item.get("subtypes") or "Search Result"
-            
-            # --- Inline extraction (no extra API call — enrichment happens on "Add to Leads") ---
-            social_links = {}
-            emails = []
-            
-            # Some Outscraper results may include these if the plan supports it
-            for social_key in ["facebook", "instagram", "twitter", "linkedin", "youtube"]:
-                val = item.get(social_key, "")
-                if val:
-                    social_links[social_key] = val
-            for email_key in ["email_1", "email_2", "email_3", "email"]:
-                val = item.get(email_key, "")
-                if val and val not in emails:
-                    emails.append(val)
-            
-            # --- COMPANY SIZE ESTIMATION ---
-            # Use employees count if available, otherwise estimate from reviews
-            employees = item.get("employees")
-            if employees and isinstance(employees, (int, str)):
-                try:
-                    emp_count = int(str(employees).replace("+", "").replace(",", ""))
-                    if emp_count > 250: size_estimate = "Large (250+)"
-                    elif emp_count > 50: size_estimate = f"Medium ({emp_count})"
-                    elif emp_count > 10: size_estimate = f"Small ({emp_count})"
-                    else: size_estimate = f"Micro ({emp_count})"
-                except:
-                    size_estimate = str(employees)
-            elif reviews_count > 500:
-                size_estimate = "Large (est.)"
-            elif reviews_count > 100:
-                size_estimate = "Medium (est.)"
-            elif reviews_count > 20:
-                size_estimate = "Small (est.)"
-            elif reviews_count > 0:
-                size_estimate = f"Local ({reviews_count} reviews)"
-            else:
-                size_estimate = "Unknown"
-            
-            # --- LEAD QUALITY SCORE (1-5 stars) ---
-            # Only uses data available from search (not enrichment)
-            quality_score = 0
-            if website:
-                quality_score += 1  # Has a website (can be enriched)
-            if item.get("phone"):
-                quality_score += 1  # Has phone number (contactable)
-            if dist_val <= 25:
-                quality_score += 1  # Very local (within 25 miles)
-            if 5 <= reviews_count <= 500:
-                quality_score += 1  # Right size (not too small, not a chain)
-            if (item.get("rating") or 0) >= 4.0:
-                quality_score += 1  # Well-rated business
-            
-            mapped_results.append({
-                "Business Name": name,
-                "Address": item.get("address", item.get("full_address", "")),
-                "Rating": item.get("rating") or 0.0,
-                "Sector": sector_val,
-                "Website": website,
-                "Phone": phone,
-                "lat": lat,
-                "lon": lon,
-                "place_id": item.get("place_id", item.get("google_id")),
-                "Source": "Outscraper V3",
-                "Distance": dist_val,
-                # --- ENRICHED FIELDS ---
-                "Reviews": reviews_count,
-                "Size": size_estimate,
-                "Description": description or "",
-                "Owner": owner,
-                "Social": social_links,
-                "Email": emails[0] if emails else "",
-                "Emails": emails,
-                "Quality": quality_score,
-                "Is Chain": False
-            })
+        mapped_results, skipped_dist, skipped_chain = process_outscraper_results(
+            raw_businesses, start_lat, start_lon, radius, search_terms
+        )
             
         # --- PARALLEL WEBSITE SCAN FOR SOCIAL LINKS ---
         websites_to_scan = [(i, r['Website']) for i, r in enumerate(mapped_results) if r.get('Website')]
@@ -370,7 +405,7 @@ def search_outscraper(api_key, query, location_str, radius=50, limit=100, skip=0
                 return idx, scrape_website_social_links(url)
             
             with ThreadPoolExecutor(max_workers=8) as executor:
-                futures = {executor.submit(_scan, item): item for item in websites_to_scan}
+                futures = {executor.submit(http_metrics.bind(_scan), item): item for item in websites_to_scan}
                 for future in as_completed(futures):
                     try:
                         idx, socials = future.result()
@@ -379,8 +414,7 @@ def search_outscraper(api_key, query, location_str, radius=50, limit=100, skip=0
                     except:
                         pass
         
-        # Sort by Quality (highest first), then Reviews (most first), then Distance (closest first)
-        mapped_results.sort(key=lambda x: (-x.get("Quality", 0), -x.get("Reviews", 0), x.get("Distance", 999.0)))
+        sort_search_results(mapped_results)
             
         if skipped_dist > 0:
             print(f"Skipped {skipped_dist} results outside {radius} mile radius.")
@@ -418,7 +452,7 @@ def search_google_legacy_nearby(api_key, keyword, lat, lon, radius_miles):
     Uses the Legacy Nearby Search API which often returns more results 
     using 'keyword' matching rather than 'text' intent matching.
     """
-    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    url = f"{base_url('google_maps')}/maps/api/place/nearbysearch/json"
     
     radius_meters = int(radius_miles * 1609.34)
     
@@ -528,7 +562,7 @@ def get_lat_long(api_key, location_name):
     if "Middleton Cheney" in location_name:
          return 52.073, -1.274, "GB"
 
-    url = "https://places.googleapis.com/v1/places:searchText"
+    url = f"{base_url('places')}/v1/places:searchText"
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": api_key,
@@ -571,7 +605,7 @@ def search_google_places(api_key, query, location_ctx, radius_miles, sector_name
     Searches Google Places API (New Text Search).
     Returns (results_list, next_page_token).
     """
-    url = "https://places.googleapis.com/v1/places:searchText"
+    url = f"{base_url('places')}/v1/places:searchText"
     
     headers = {
         "Content-Type": "application/json",
@@ -1,8 +1,12 @@
-import gspread
 import pandas as pd
 import json
+import re
+import threading
+import time
 from datetime import datetime
-from google.oauth2.service_account import Credentials
+from itertools import islice
+
+from lead_model import project_lead
 
 # Scopes required for the API
 SCOPES = [
@@ -10,11 +14,41 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive"
 ]
 
+# Column indices (1-based) of the editable lead fields
+LEAD_COLUMN_INDEX = {
+    "Status": 6,
+    "Contact Name": 7,
+    "Last Contact": 8,
+    "Next Action": 9,
+    "Notes": 10,
+    "Value": 11,
+}
+
+# Row map older than this is re-read before writing (other devices may edit the sheet)
+ROW_INDEX_TTL = 120  # seconds
+
+# Bulk append: rows per append_rows request (keeps each request well under the
+# API payload limit) and retries per chunk before giving up
+APPEND_CHUNK_ROWS = 500
+APPEND_RETRIES = 3
+
+# Ranged reads: rows per page, and pages fetched per batch_get request
+READ_PAGE_ROWS = 1000
+READ_PAGES_PER_CALL = 5
+
 class SheetManager:
     def __init__(self):
         self.client = None
         self.sheet = None
         self.worksheet = None
+        self.sheet_url = None
+        # ID -> sheet row cache, so writes don't need worksheet.find()
+        self._row_for_id = None
+        self._max_id = 0
+        self._index_loaded_at = 0
+        self._index_lock = threading.Lock()
+        # Leads appended by the last add_leads_bulk call (pass as skip= to resume)
+        self.last_bulk_added = 0
         
     def connect(self, service_account_info, sheet_url):
         """
@@ -22,10 +56,18 @@ class SheetManager:
         and opens the sheet by URL.
         """
         try:
+            # gspread and google-auth take ~0.3s to import, so only Sheets users pay for them
+            import gspread
+            from google.oauth2.service_account import Credentials
+
             creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
             self.client = gspread.authorize(creds)
             self.sheet = self.client.open_by_url(sheet_url)
             self.worksheet = self.sheet.get_worksheet(0) # Default to first sheet
+            self.sheet_url = sheet_url
+            self._invalidate_index()
+            with _managers_lock:
+                _credentials[sheet_url] = service_account_info
             
             # Ensure headers exist immediately upon connection
             self._ensure_headers()
@@ -49,197 +91,445 @@ class SheetManager:
         # Optional: could check if headers match and update potential mismatches
         # For now, we assume if row 1 exists, it's set up or user-managed.
 
-    def get_leads(self):
+    # --- ROW INDEX ---
+    def _invalidate_index(self):
+        with self._index_lock:
+            self._row_for_id = None
+            self._max_id = 0
+            self._index_loaded_at = 0
+
+    def _set_index(self, ids):
+        """ids: values of column A for rows 2..n (header excluded)."""
+        row_for_id = {}
+        max_id = 0
+        for offset, value in enumerate(ids):
+            key = str(value).strip()
+            if not key:
+                continue
+            row_for_id[key] = offset + 2
+            if key.isdigit():
+                max_id = max(max_id, int(key))
+        with self._index_lock:
+            self._row_for_id = row_for_id
+            self._max_id = max_id
+            self._index_loaded_at = time.time()
+
+    def _ensure_index(self, force=False):
+        """Loads the ID column (one small read) when the map is missing or stale."""
+        stale = time.time() - self._index_loaded_at > ROW_INDEX_TTL
+        if force or self._row_for_id is None or stale:
+            self._set_index(self.worksheet.col_values(1)[1:])
+
+    def _row_of(self, lead_id):
+        self._ensure_index()
+        row_idx = self._row_for_id.get(str(lead_id))
+        if row_idx is None:
+            # Possibly added from another device since the last refresh
+            self._ensure_index(force=True)
+            row_idx = self._row_for_id.get(str(lead_id))
+        return row_idx
+
+    def _checked_rows(self, lead_ids):
+        """
+        Returns {lead_id: row} for the leads whose row still holds their ID,
+        checked with one batch_get of the ID cells. A mismatch (rows shifted
+        by another device) refreshes the map once and re-checks; leads still
+        unconfirmed are left out.
+        """
+        rows = {}
+        pending = list(lead_ids)
+        for attempt in range(2):
+            located = {lead_id: self._row_of(lead_id) for lead_id in pending}
+            located = {lead_id: row_idx for lead_id, row_idx in located.items() if row_idx}
+            if not located:
+                break
+            cells = self.worksheet.batch_get([f"A{row_idx}:A{row_idx}" for row_idx in located.values()])
+            pending = []
+            for (lead_id, row_idx), cell in zip(located.items(), cells):
+                value = cell[0][0] if cell and cell[0] else ""
+                if str(value).strip() == str(lead_id):
+                    rows[lead_id] = row_idx
+                else:
+                    pending.append(lead_id)
+            if not pending:
+                break
+            self._ensure_index(force=True)
+        return rows
+
+    def _next_ids(self, count):
+        """Reserves count new IDs after the current max."""
+        self._ensure_index()
+        with self._index_lock:
+            first = self._max_id + 1
+            self._max_id += count
+        return first
+
+    def reserve_id(self):
+        """
+        Reserves the ID for an add ahead of the append, so a retried add can
+        check whether it landed. Re-reads the ID column first: another
+        SheetManager of the same sheet may have appended since.
+        """
+        self._ensure_index(force=True)
+        return self._next_ids(1)
+
+    def _record_appended(self, response, ids):
+        """Adds appended rows to the map using the range the API reports."""
+        try:
+            updated = response["updates"]["updatedRange"]
+            first_row = int(re.search(r"!\$?[A-Z]+\$?(\d+)", updated).group(1))
+        except Exception:
+            self._invalidate_index()
+            return
+        with self._index_lock:
+            if self._row_for_id is None:
+                return
+            for offset, new_id in enumerate(ids):
+                self._row_for_id[str(new_id)] = first_row + offset
+
+    def _record_deleted(self, row_idx):
+        with self._index_lock:
+            if self._row_for_id is None:
+                return
+            self._row_for_id = {
+                key: (r - 1 if r > row_idx else r)
+                for key, r in self._row_for_id.items() if r != row_idx
+            }
+
+    @staticmethod
+    def _lead_row(new_id, lead):
+        return [
+            new_id,
+            lead.get("Business Name", ""),
+            lead.get("Sector", ""),
+            lead.get("Address", ""),
+            lead.get("Website", ""),
+            lead.get("Status", "Pipeline"),
+            lead.get("Contact Name", ""),
+            lead.get("Last Contact", "Never"),
+            lead.get("Next Action") or datetime.now().strftime("%Y-%m-%d"),
+            json.dumps(lead.get("Notes", {})),
+            lead.get("Value", 0)
+        ]
+
+    @staticmethod
+    def _row_to_lead(header, row, fields=None):
+        """Maps a raw sheet row to a lead, numericising cells like get_all_records."""
+        from gspread.utils import numericise
+        r = {}
+        for col, name in enumerate(header):
+            cell = row[col] if col < len(row) else ""
+            r[name] = cell if name == "Notes JSON" else numericise(cell, default_blank="")
+        values = {
+            "Business Name": r.get("Business Name"),
+            "Sector": r.get("Sector"),
+            "Address": r.get("Address"),
+            "Website": r.get("Website"),
+            "Status": r.get("Status"),
+            "Contact Name": r.get("Contact Name"),
+            "Last Contact": r.get("Last Contact"),
+            "Next Action": r.get("Next Action"),
+            "Value": r.get("Value", 0)
+        }
+        return project_lead(r.get("ID"), values, fields, str(r.get("Notes JSON") or "{}"))
+
+    def iter_lead_pages(self, fields=None, page_size=READ_PAGE_ROWS, pages_per_call=READ_PAGES_PER_CALL):
+        """
+        Streams leads in pages of up to page_size rows using ranged batch_get
+        reads, so a large sheet is never fetched or decoded in one request.
+        Yields lists of leads; Notes JSON is decoded lazily on first access.
+        The row map is rebuilt once the whole sheet has been read, which ends
+        with one batch_get that returns no rows.
+        """
+        if not self.worksheet:
+            return
+
+        header = None
+        ids = []
+        start = 2
+        while True:
+            ranges = [
+                f"{start + i * page_size}:{start + (i + 1) * page_size - 1}"
+                for i in range(pages_per_call)
+            ]
+            if header is None:
+                ranges.insert(0, "1:1")
+            value_ranges = self.worksheet.batch_get(ranges)
+            if header is None:
+                header_range = value_ranges.pop(0)
+                header = [str(h) for h in header_range[0]] if header_range else []
+                if not header:
+                    self._set_index([])
+                    return
+            id_col = header.index("ID") if "ID" in header else 0
+
+            # The API trims blank rows off the end of every range, so a short
+            # page can still have rows after it: only an empty call is the end
+            if not any(value_ranges):
+                self._set_index(ids)
+                return
+            for rows in value_ranges:
+                page = []
+                for row in rows:
+                    ids.append(row[id_col] if len(row) > id_col else "")
+                    if any(str(cell).strip() for cell in row):
+                        page.append(self._row_to_lead(header, row, fields))
+                # Pad the trimmed rows so later pages keep their sheet row numbers
+                ids.extend([""] * (page_size - len(rows)))
+                if page:
+                    yield page
+            start += page_size * pages_per_call
+
+    def get_leads(self, fields=None):
         """
         Fetch all leads as a list of dictionaries.
+        fields: optional list of app-level keys to keep on each lead.
+        Notes JSON is decoded lazily on first access.
         """
         if not self.worksheet:
             return []
             
         try:
-            records = self.worksheet.get_all_records()
+            # Paged reads also give us the row map for free
+            return [lead for page in self.iter_lead_pages(fields) for lead in page]
         except Exception as e:
             # st.error(f"Sheet Read Error: {e}") # Optional: propagate error?
             return []
 
-        # Clean up keys if necessary, ensure ID is int
-        leads = []
-        for r in records:
-            # Parse Notes JSON safely
-            notes_str = str(r.get("Notes JSON", "{}"))
-            try:
-                if not notes_str.strip():
-                     notes = {}
-                else:
-                    notes = json.loads(notes_str)
-            except:
-                notes = {}
-                
-            leads.append({
-                "id": r.get("ID"), # Make sure to generate IDs for new rows
-                "Business Name": r.get("Business Name"),
-                "Sector": r.get("Sector"),
-                "Address": r.get("Address"),
-                "Website": r.get("Website"),
-                "Status": r.get("Status"),
-                "Contact Name": r.get("Contact Name"),
-                "Last Contact": r.get("Last Contact"),
-                "Next Action": r.get("Next Action"),
-                "Notes": notes,
-                "Value": r.get("Value", 0)
-            })
-        return leads
-
-    def add_leads_bulk(self, leads_list):
-        """
-        Appends multiple leads efficiently.
-        leads_list: list of dicts
+    def get_lead(self, lead_id):
+        """
+        Reads one lead by ID: the row comes from the row map and the header
+        and that row are fetched in a single batch_get. Returns None if missing.
         """
         if not self.worksheet:
-            return False, "Not Connected"
-            
+            return None
+
         try:
-            # 1. Get max ID
-            records = self.worksheet.get_all_records()
-            if records:
-                ids = [int(r['ID']) for r in records if str(r['ID']).isdigit()]
-                current_max_id = max(ids) if ids else 0
-            else:
-                current_max_id = 0
-                self._ensure_headers()
+            for attempt in range(2):
+                row_idx = self._row_of(lead_id)
+                if not row_idx:
+                    return None
+                header_range, row_range = self.worksheet.batch_get(["1:1", f"{row_idx}:{row_idx}"])
+                header = [str(h) for h in header_range[0]] if header_range else []
+                row = row_range[0] if row_range else []
+                id_col = header.index("ID") if "ID" in header else 0
+                if len(row) > id_col and str(row[id_col]).strip() == str(lead_id):
+                    return self._row_to_lead(header, row)
+                # Rows shifted since the map was loaded (edited from another device)
+                self._ensure_index(force=True)
         except Exception as e:
-            return False, f"Failed to read sheet for ID gen: {e}"
-            
-        # 2. Prepare Rows
-        rows_to_add = []
-        for i, lead in enumerate(leads_list):
-            new_id = current_max_id + 1 + i
-            row = [
-                new_id,
-                lead.get("Business Name", ""),
-                lead.get("Sector", ""),
-                lead.get("Address", ""),
-                lead.get("Website", ""),
-                lead.get("Status", "Pipeline"),
-                lead.get("Contact Name", ""),
-                lead.get("Last Contact", "Never"),
-                lead.get("Next Action", datetime.now().strftime("%Y-%m-%d")),
-                json.dumps(lead.get("Notes", {}))
-            ]
-            rows_to_add.append(row)
-            
-        # 3. Bulk Append
-        if rows_to_add:
+            print(f"Sheet Read Error: {e}")
+        return None
+
+    def _append_chunk(self, rows, ids):
+        """
+        Appends one chunk, retrying with backoff. If a request fails after
+        the rows may have landed (e.g. a timeout), the ID column is re-read
+        first so the retry never duplicates them.
+        """
+        for attempt in range(APPEND_RETRIES):
+            try:
+                response = self.worksheet.append_rows(rows)
+                self._record_appended(response, ids)
+                return
+            except Exception:
+                self._ensure_index(force=True)
+                if str(ids[0]) in self._row_for_id:
+                    return
+                if attempt == APPEND_RETRIES - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def add_leads_bulk(self, leads_list, chunk_size=APPEND_CHUNK_ROWS, progress=None, skip=0):
+        """
+        Appends multiple leads in chunks of chunk_size rows (one append_rows
+        request each), so large imports stay under the API request size limit.
+        leads_list: list of dicts, or any iterable (consumed lazily)
+        progress: optional callback(added, total); total is None when leads_list has no len()
+        skip: leads at the start of leads_list already appended by an earlier,
+              interrupted call (see last_bulk_added)
+        """
+        self.last_bulk_added = skip
+        if not self.worksheet:
+            return False, "Not Connected"
+
+        total = len(leads_list) if hasattr(leads_list, "__len__") else None
+        leads_iter = islice(iter(leads_list), skip, None)
+        added = 0
+        while True:
+            chunk = list(islice(leads_iter, chunk_size))
+            if not chunk:
+                break
+
             try:
-                self.worksheet.append_rows(rows_to_add)
-                return True, f"Added {len(rows_to_add)} leads"
+                # 1. Reserve IDs (ID column only, cached between calls)
+                first_id = self._next_ids(len(chunk))
+                if first_id == 1:
+                    self._ensure_headers()
             except Exception as e:
-                return False, f"Failed to append rows: {e}"
-        return False, "No data to add"
+                return False, f"Failed to read sheet for ID gen: {e}"
+
+            # 2. Prepare Rows
+            new_ids = [first_id + i for i in range(len(chunk))]
+            rows_to_add = [self._lead_row(new_id, lead) for new_id, lead in zip(new_ids, chunk)]
+
+            # 3. Append this chunk
+            try:
+                self._append_chunk(rows_to_add, new_ids)
+            except Exception as e:
+                self._invalidate_index()
+                of_total = f" of {total}" if total else ""
+                return False, f"Failed to append rows after {skip + added}{of_total} leads: {e}. Re-run the import to resume."
+
+            added += len(chunk)
+            self.last_bulk_added = skip + added
+            _mark_others_stale(self)
+            if progress:
+                progress(skip + added, total)
+
+        if not added:
+            return (True, f"All {skip} leads were already added") if skip else (False, "No data to add")
+        return True, f"Added {added} leads"
+
+    def find_lead_id(self, business_name):
+        """
+        Returns the ID of the lead with this business name (case-insensitive), or None.
+        Reads the ID and Business Name columns in one batch_get; raises on read errors.
+        """
+        if not self.worksheet:
+            return None
+        wanted = str(business_name).strip().lower()
+        ids, names = self.worksheet.batch_get(["A2:A", "B2:B"])
+        for id_cell, name_cell in zip(ids, names):
+            if id_cell and name_cell and str(name_cell[0]).strip().lower() == wanted:
+                return int(id_cell[0]) if str(id_cell[0]).strip().isdigit() else id_cell[0]
+        return None
 
-    def add_lead(self, lead_data):
+    def add_lead(self, lead_data, new_id=None):
         """
-        Appends a new lead. Generates a new ID based on max ID found.
+        Appends a new lead. Generates a new ID based on max ID found,
+        unless new_id was reserved already (see reserve_id).
         lead_data: dict with keys matching headers (except ID)
+        Returns the new ID (truthy) or False.
         """
         if not self.worksheet:
             return False
             
         try:
             # Calc new ID
-            records = self.worksheet.get_all_records()
-            if records:
-                # Extract IDs, filter out empty ones
-                ids = [int(r['ID']) for r in records if str(r['ID']).isdigit()]
-                new_id = max(ids) + 1 if ids else 1
-            else:
-                new_id = 1
+            if new_id is None:
+                new_id = self._next_ids(1)
+            if new_id == 1:
                 self._ensure_headers() # Ensure headers if empty sheet
         except Exception:
             return False # Read failed
-            
-        row = [
-            new_id,
-            lead_data.get("Business Name", ""),
-            lead_data.get("Sector", ""),
-            lead_data.get("Address", ""),
-            lead_data.get("Website", ""),
-            lead_data.get("Status", "Pipeline"),
-            lead_data.get("Contact Name", ""),
-            lead_data.get("Last Contact", "Never"),
-            lead_data.get("Next Action", datetime.now().strftime("%Y-%m-%d")),
-            json.dumps(lead_data.get("Notes", {})),
-            lead_data.get("Value", 0)
-        ]
         
         try:
-            self.worksheet.append_row(row)
-            return True
+            response = self.worksheet.append_row(self._lead_row(new_id, lead_data))
+            self._record_appended(response, [new_id])
+            _mark_others_stale(self)
+            return new_id
         except Exception:
+            self._invalidate_index()
             return False
 
     def update_lead_status(self, lead_id, new_status, next_date=None):
-        """Find row by ID and update status."""
-        try:
-            cell = self.worksheet.find(str(lead_id), in_column=1)
-        except gspread.exceptions.CellNotFound:
-            return False
-            
-        row_idx = cell.row
-        
-        # Column indices (1-based):
-        # ID=1, BusName=2, Sect=3, Addr=4, Web=5, Stat=6, Cont=7, Last=8, Next=9, Notes=10
-        
-        # Update Status (Col 6)
-        self.worksheet.update_cell(row_idx, 6, new_status)
-        
-        # Update Last Contact (Col 8) to Today
-        self.worksheet.update_cell(row_idx, 8, datetime.now().strftime("%Y-%m-%d"))
-        
-        # Update Next Action (Col 9) if provided
+        """Update status, stamp Last Contact with today, optionally set Next Action."""
+        fields = {"Status": new_status, "Last Contact": datetime.now().strftime("%Y-%m-%d")}
         if next_date:
-            self.worksheet.update_cell(row_idx, 9, next_date)
-            
-        return True
+            fields["Next Action"] = next_date
+        return self.update_leads({lead_id: fields})
 
     def update_lead_notes(self, lead_id, notes_data):
-        try:
-            cell = self.worksheet.find(str(lead_id), in_column=1)
-        except gspread.exceptions.CellNotFound:
-            return False
-        
-        row_idx = cell.row
-        notes_json = json.dumps(notes_data)
-        self.worksheet.update_cell(row_idx, 10, notes_json) # Col 10
-        return True
+        return self.update_leads({lead_id: {"Notes": notes_data}})
 
     def update_lead_contact(self, lead_id, contact_name):
+        return self.update_leads({lead_id: {"Contact Name": contact_name}})
+
+    def update_lead_value(self, lead_id, value):
+        return self.update_leads({lead_id: {"Value": value}})
+
+    def update_leads(self, changes):
+        """
+        Applies field changes for one or more leads with a single batch_update.
+        Rows come from the cached ID map (no worksheet.find), confirmed
+        against the ID column before writing.
+        changes: {lead_id: {app_key: value}}
+        Returns False if any lead was not found, so the caller can retry it.
+        """
+        if not self.worksheet:
+            return False
+
+        from gspread.utils import rowcol_to_a1
+        data = []
         try:
-            cell = self.worksheet.find(str(lead_id), in_column=1)
-        except gspread.exceptions.CellNotFound:
+            rows = self._checked_rows(list(changes))
+            for lead_id, fields in changes.items():
+                row_idx = rows.get(lead_id)
+                if not row_idx:
+                    continue
+                for key, val in fields.items():
+                    col_idx = LEAD_COLUMN_INDEX.get(key)
+                    if not col_idx:
+                        continue
+                    if key == "Notes" and not isinstance(val, str):
+                        val = json.dumps(val)
+                    data.append({"range": rowcol_to_a1(row_idx, col_idx), "values": [[val]]})
+        except Exception:
             return False
-        
-        row_idx = cell.row
-        self.worksheet.update_cell(row_idx, 7, contact_name) # Col 7 is Contact Name
-        return True
 
-    def update_lead_value(self, lead_id, value):
+        if not data:
+            return False
         try:
-            cell = self.worksheet.find(str(lead_id), in_column=1)
-        except gspread.exceptions.CellNotFound:
+            # USER_ENTERED like the update_cell calls this replaced: dates and numbers stay typed cells
+            self.worksheet.batch_update(data, value_input_option="USER_ENTERED")
+            return len(rows) == len(changes)
+        except Exception:
+            self._invalidate_index()
             return False
-        
-        row_idx = cell.row
-        self.worksheet.update_cell(row_idx, 11, value) # Col 11 is Value
-        return True
 
     def delete_lead(self, lead_id):
-        try:
-            cell = self.worksheet.find(str(lead_id), in_column=1)
-        except gspread.exceptions.CellNotFound:
+        row_idx = self._checked_rows([lead_id]).get(lead_id)
+        if not row_idx:
             return False
-        self.worksheet.delete_rows(cell.row)
+        self.worksheet.delete_rows(row_idx)
+        self._record_deleted(row_idx)
+        _mark_others_stale(self)
         return True
 
 # Singleton instance
 sheet_manager = SheetManager()
+
+# Credentials each sheet was last connected with in this process, so background
+# work (the outbox sync) can open the right spreadsheet on a connection of its own
+_credentials = {}
+_managers = {}
+_managers_lock = threading.Lock()
+
+def manager_for(sheet_url):
+    """
+    A SheetManager of its own for sheet_url, connected with the credentials
+    the sheet was last connected with in this process. None if it never was,
+    or the connection fails.
+    """
+    with _managers_lock:
+        manager = _managers.get(sheet_url)
+        info = _credentials.get(sheet_url)
+    if manager is not None or info is None:
+        return manager
+    manager = SheetManager()
+    ok, msg = manager.connect(info, sheet_url)
+    if not ok:
+        print(f"Sheet connect error: {msg}")
+        return None
+    with _managers_lock:
+        return _managers.setdefault(sheet_url, manager)
+
+
+def _mark_others_stale(manager):
+    """Other managers of the same spreadsheet re-read their row map after manager changed its rows."""
+    with _managers_lock:
+        others = [sheet_manager, *_managers.values()]
+    for other in others:
+        if other is not manager and other.sheet_url == manager.sheet_url:
+            other._invalidate_index()
@@ -0,0 +1,708 @@
+"""
+Local HTTP stand-ins for the providers the app calls, so search, enrichment
+and CRM paths can be exercised and benchmarked without live services.
+
+One threaded server hosts every provider under its own path prefix:
+
+    /airtable         list / create / patch / delete, pageSize + offset, filterByFormula
+    /outscraper       /maps/search-v3, /emails-and-contacts (+ /requests/<id>), /google-search-v3
+    /apollo           /api/v1/mixed_people/api_search, /v1/people/match
+    /places           /v1/places:searchText (3 pages of 20 via nextPageToken)
+    /google_maps      /maps/api/place/nearbysearch/json
+    /companies_house  /search/companies, /company/<n>[/officers|/persons-with-significant-control]
+
+Each provider has its own latency, error rate and rate limit (429 + Retry-After).
+Responses are generated deterministically from the request, so repeated runs
+see the same data.
+
+Usage:
+    python standin_servers.py [--port 8765] [--latency-ms 80] [--error-rate 0.02] [--rate-limit 5]
+then point the app at it (printed on start), e.g.
+    export SF_AIRTABLE_BASE_URL=http://127.0.0.1:8765/airtable
+
+From Python:
+    with StandinServer(latency=0.05) as server:
+        server.export_env()   # sets SF_<PROVIDER>_BASE_URL for this process
+        ...
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from provider_urls import DEFAULT_BASE_URLS
+
+AIRTABLE_MAX_PAGE = 100
+AIRTABLE_MAX_BATCH = 10
+PLACES_PAGE_SIZE = 20
+PLACES_MAX_PAGES = 3
+
+TOWNS = [
+    ("Silverstone", 52.088, -1.025), ("Northampton", 52.240, -0.902), ("Banbury", 52.062, -1.340),
+    ("Brackley", 52.032, -1.147), ("Towcester", 52.134, -0.990), ("Milton Keynes", 52.041, -0.760),
+]
+FIRST_NAMES = ["James", "Sarah", "David", "Emma", "Mark", "Claire", "Paul", "Rachel", "Tom", "Laura"]
+LAST_NAMES = ["Smith", "Jones", "Taylor", "Brown", "Wilson", "Evans", "Walker", "Wright", "Hughes", "Green"]
+TITLES = ["Managing Director", "Owner", "Founder", "Director", "General Manager", "Marketing Manager", "Driver"]
+
+
+def _rng(*parts):
+    """Deterministic RNG seeded from the request, so the same query returns the same data."""
+    seed = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:12]
+    return random.Random(int(seed, 16))
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "", text.lower())[:24] or "business"
+
+
+def _business(rng, query, index):
+    town, lat, lon = rng.choice(TOWNS)
+    word = query.split()[0].title() if query.split() else "Local"
+    name = f"{rng.choice(LAST_NAMES)} {word} {['Ltd', 'Services', 'Group', '& Sons'][index % 4]}"
+    return {
+        "name": name,
+        "town": town,
+        "lat": round(lat + rng.uniform(-0.15, 0.15), 6),
+        "lon": round(lon + rng.uniform(-0.15, 0.15), 6),
+        "domain": f"{_slug(name)}.co.uk",
+        "rating": round(rng.uniform(3.2, 5.0), 1),
+        "reviews": rng.randint(0, 400),
+        "phone": f"+44 1327 {rng.randint(100000, 999999)}",
+    }
+
+
+class ProviderLimits:
+    """Latency, failure injection and a sliding-window rate limit for one provider."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit  # requests per second, None for unlimited
+        self._rng = random.Random(seed)
+        self._hits = deque()
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Sleeps for the configured latency; returns an error status to send, or None."""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate_limit:
+                while self._hits and now - self._hits[0] > 1.0:
+                    self._hits.popleft()
+                if len(self._hits) >= self.rate_limit:
+                    return 429
+                self._hits.append(now)
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+            failed = self.error_rate and self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return 500 if failed else None
+
+
+# --- AIRTABLE FORMULAS ---
+_TOKEN_RE = re.compile(r"\s*(?:(\{[^}]*\})|('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")|(-?\d+(?:\.\d+)?)|([A-Za-z_]+)|(!=|[=(),<>&]))")
+
+
+def _tokenize(formula):
+    tokens, pos = [], 0
+    formula = formula.strip()
+    while pos < len(formula):
+        m = _TOKEN_RE.match(formula, pos)
+        if not m:
+            raise ValueError(f"Unsupported formula near: {formula[pos:pos + 20]}")
+        pos = m.end()
+        field, string, number, name, op = m.groups()
+        if field:
+            tokens.append(("field", field[1:-1]))
+        elif string:
+            tokens.append(("str", re.sub(r"\\(.)", r"\1", string[1:-1])))
+        elif number:
+            tokens.append(("num", float(number)))
+        elif name:
+            tokens.append(("name", name.upper()))
+        else:
+            tokens.append(("op", op))
+    return tokens
+
+
+def _parse_time(value):
+    text = str(value).replace("Z", "+00:00")
+    parsed = datetime.fromisoformat(text)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _to_str(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+_FUNCTIONS = {
+    "LOWER": lambda rec, a: _to_str(a[0]).lower(),
+    "UPPER": lambda rec, a: _to_str(a[0]).upper(),
+    "TRIM": lambda rec, a: _to_str(a[0]).strip(),
+    "AND": lambda rec, a: all(a),
+    "OR": lambda rec, a: any(a),
+    "NOT": lambda rec, a: not a[0],
+    "RECORD_ID": lambda rec, a: rec["id"],
+    "LAST_MODIFIED_TIME": lambda rec, a: rec["modified"],
+    "CREATED_TIME": lambda rec, a: rec["createdTime"],
+    "DATETIME_PARSE": lambda rec, a: _parse_time(a[0]).isoformat(),
+    "IS_AFTER": lambda rec, a: _parse_time(a[0]) > _parse_time(a[1]),
+    "IS_BEFORE": lambda rec, a: _parse_time(a[0]) < _parse_time(a[1]),
+    "FIND": lambda rec, a: _to_str(a[1]).find(_to_str(a[0])) + 1,
+    "TRUE": lambda rec, a: True,
+    "FALSE": lambda rec, a: False,
+}
+
+
+class _Formula:
+    """
+    Evaluates the subset of Airtable's formula language the app sends:
+    {Field} refs, string/number literals, = != < > comparisons, & concatenation
+    and the functions in _FUNCTIONS.
+    """
+
+    def __init__(self, formula):
+        self.tokens = _tokenize(formula)
+
+    def matches(self, record):
+        self.pos = 0
+        self.record = record
+        value = self._expr()
+        return bool(value)
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self):
+        token = self._peek()
+        self.pos += 1
+        return token
+
+    def _expr(self):
+        left = self._concat()
+        kind, op = self._peek()
+        if kind == "op" and op in ("=", "!=", "<", ">"):
+            self._take()
+            right = self._concat()
+            if op in ("<", ">"):
+                left, right = float(left or 0), float(right or 0)
+                return left < right if op == "<" else left > right
+            equal = _to_str(left) == _to_str(right)
+            return equal if op == "=" else not equal
+        return left
+
+    def _concat(self):
+        value = self._atom()
+        while self._peek() == ("op", "&"):
+            self._take()
+            value = _to_str(value) + _to_str(self._atom())
+        return value
+
+    def _atom(self):
+        kind, value = self._take()
+        if kind == "field":
+            return self.record["fields"].get(value)
+        if kind in ("str", "num"):
+            return value
+        if kind == "op" and value == "(":
+            inner = self._expr()
+            self._take()
+            return inner
+        if kind == "name":
+            func = _FUNCTIONS.get(value)
+            if func is None:
+                raise ValueError(f"Unsupported function {value}")
+            args = []
+            if self._peek() == ("op", "("):
+                self._take()
+                while self._peek() != ("op", ")"):
+                    args.append(self._expr())
+                    if self._peek() == ("op", ","):
+                        self._take()
+                self._take()
+            return func(self.record, args)
+        raise ValueError(f"Unexpected token {value!r}")
+
+
+class AirtableStore:
+    """In-memory Airtable bases: {table name: {record id: record}}, insertion ordered."""
+
+    def __init__(self):
+        self.tables = {}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._offsets = {}
+
+    def _now(self):
+        return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+    def _public(self, record, fields=None):
+        out = {k: v for k, v in record["fields"].items() if v not in ("", None, [])}
+        if fields:
+            out = {k: v for k, v in out.items() if k in fields}
+        return {"id": record["id"], "createdTime": record["createdTime"], "fields": out}
+
+    def list(self, table, params):
+        formula = params.get("filterByFormula", [None])[0]
+        fields = params.get("fields[]") or params.get("fields")
+        page_size = min(int(params.get("pageSize", [AIRTABLE_MAX_PAGE])[0]), AIRTABLE_MAX_PAGE)
+        max_records = int(params.get("maxRecords", [0])[0]) or None
+        offset_token = params.get("offset", [None])[0]
+
+        with self.lock:
+            rows = list(self.tables.get(table, {}).values())
+            if offset_token:
+                start = self._offsets.pop(offset_token, None)
+                if start is None:
+                    return 422, {"error": {"type": "LIST_RECORDS_ITERATOR_NOT_AVAILABLE"}}
+            else:
+                start = 0
+        if formula:
+            try:
+                matcher = _Formula(formula)
+                rows = [r for r in rows if matcher.matches(r)]
+            except (ValueError, IndexError, TypeError) as e:
+                return 422, {"error": {"type": "INVALID_FILTER_BY_FORMULA", "message": str(e)}}
+        if max_records:
+            rows = rows[:max_records]
+
+        page = rows[start:start + page_size]
+        body = {"records": [self._public(r, fields) for r in page]}
+        if start + page_size < len(rows):
+            token = f"itr{next(self._ids):08d}/rec{start + page_size:08d}"
+            with self.lock:
+                self._offsets[token] = start + page_size
+            body["offset"] = token
+        return 200, body
+
+    def create(self, table, payload):
+        records = payload.get("records")
+        single = records is None
+        if single:
+            records = [{"fields": payload.get("fields", {})}]
+        if len(records) > AIRTABLE_MAX_BATCH:
+            return 422, {"error": {"type": "INVALID_RECORDS", "message": "At most 10 records per request"}}
+        created = []
+        with self.lock:
+            table_rows = self.tables.setdefault(table, {})
+            for rec in records:
+                now = self._now()
+                record = {
+                    "id": f"rec{next(self._ids):014d}",
+                    "createdTime": now,
+                    "modified": now,
+                    "fields": dict(rec.get("fields", {})),
+                }
+                table_rows[record["id"]] = record
+                created.append(self._public(record))
+        return 200, created[0] if single else {"records": created}
+
+    def patch(self, table, payload, record_id=None):
+        records = payload.get("records") or [{"id": record_id, "fields": payload.get("fields", {})}]
+        if len(records) > AIRTABLE_MAX_BATCH:
+            return 422, {"error": {"type": "INVALID_RECORDS", "message": "At most 10 records per request"}}
+        updated = []
+        with self.lock:
+            table_rows = self.tables.get(table, {})
+            for rec in records:
+                record = table_rows.get(rec.get("id"))
+                if record is None:
+                    return 404, {"error": "NOT_FOUND"}
+                record["fields"].update(rec.get("fields", {}))
+                record["modified"] = self._now()
+                updated.append(self._public(record))
+        return 200, updated[0] if record_id else {"records": updated}
+
+    def delete(self, table, record_ids):
+        if len(record_ids) > AIRTABLE_MAX_BATCH:
+            return 422, {"error": {"type": "INVALID_RECORDS", "message": "At most 10 records per request"}}
+        with self.lock:
+            table_rows = self.tables.get(table, {})
+            if any(rid not in table_rows for rid in record_ids):
+                return 404, {"error": "NOT_FOUND"}
+            for rid in record_ids:
+                del table_rows[rid]
+        return 200, {"records": [{"id": rid, "deleted": True} for rid in record_ids]}
+
+
+# --- PROVIDER HANDLERS ---
+# Each takes (server, method, path, params, body, headers) and returns (status, json)
+
+def _airtable(server, method, path, params, body, headers):
+    if not headers.get("Authorization", "").startswith("Bearer "):
+        return 401, {"error": "AUTHENTICATION_REQUIRED"}
+    parts = [unquote(p) for p in path.strip("/").split("/")]
+    if len(parts) < 3 or parts[0] != "v0":
+        return 404, {"error": "NOT_FOUND"}
+    table = parts[2]
+    record_id = parts[3] if len(parts) > 3 else None
+    store = server.airtable
+    if method == "GET":
+        if record_id:
+            record = store.tables.get(table, {}).get(record_id)
+            return (200, store._public(record)) if record else (404, {"error": "NOT_FOUND"})
+        return store.list(table, params)
+    if method == "POST":
+        return store.create(table, body)
+    if method == "PATCH":
+        return store.patch(table, body, record_id)
+    if method == "DELETE":
+        return store.delete(table, [record_id] if record_id else params.get("records[]", []))
+    return 405, {"error": "METHOD_NOT_ALLOWED"}
+
+
+def _outscraper(server, method, path, params, body, headers):
+    if not headers.get("X-API-KEY"):
+        return 401, {"error": True, "errorMessage": "Missing API key"}
+
+    if path == "/maps/search-v3":
+        query = params.get("query", [""])[0]
+        limit = int(params.get("limit", [20])[0])
+        skip = int(params.get("skip", [0])[0])
+        coords = params.get("coordinates", ["52.088,-1.025"])[0]
+        rng = _rng("maps", query, coords)
+        total = rng.randint(limit // 2, limit * 2)
+        items = []
+        for i in range(skip, min(skip + limit, total)):
+            b = _business(_rng("maps", query, coords, i), query, i)
+            items.append({
+                "name": b["name"], "full_address": f"{i + 1} High Street, {b['town']}, UK",
+                "latitude": b["lat"], "longitude": b["lon"], "category": query.title(),
+                "subtypes": query.title(), "site": f"https://{b['domain']}", "phone": b["phone"],
+                "rating": b["rating"], "reviews": b["reviews"], "place_id": f"ChIJ{_slug(b['name'])}{i}",
+                "description": f"{b['name']} serves {b['town']} and surrounding areas.",
+                "email_1": f"info@{b['domain']}" if i % 3 else "",
+                "facebook": f"https://facebook.com/{_slug(b['name'])}" if i % 2 else "",
+                "owner_title": b["name"],
+            })
+        return 200, {"id": f"req-{next(server.request_ids)}", "status": "Success", "data": [items]}
+
+    if path == "/emails-and-contacts":
+        queries = params.get("query", [])
+        request_id = f"req-{next(server.request_ids)}"
+        data = []
+        for domain in queries:
+            rng = _rng("contacts", domain)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            data.append({
+                "query": domain, "email_1": f"info@{domain}", "email_2": f"{first.lower()}@{domain}",
+                "phone_1": f"+44 1327 {rng.randint(100000, 999999)}",
+                "facebook": f"https://facebook.com/{domain.split('.')[0]}",
+                "linkedin": f"https://www.linkedin.com/company/{domain.split('.')[0]}",
+                "title": f"{domain.split('.')[0].title()} | Home", "description": f"Welcome to {domain}",
+            })
+        server.outscraper_results[request_id] = data
+        return 200, {"id": request_id, "status": "Pending"}
+
+    if path.startswith("/requests/"):
+        request_id = path.rsplit("/", 1)[-1]
+        data = server.outscraper_results.pop(request_id, None)
+        if data is None:
+            return 404, {"error": True, "errorMessage": "Request not found"}
+        return 200, {"id": request_id, "status": "Success", "data": data}
+
+    if path == "/google-search-v3":
+        query = params.get("query", [""])[0]
+        name = re.search(r'"([^"]+)"', query)
+        name = name.group(1) if name else query
+        results = [
+            {"link": f"https://www.linkedin.com/company/{_slug(name)}", "title": f"{name} | LinkedIn"},
+            {"link": f"https://{_slug(name)}.co.uk", "title": name},
+        ]
+        return 200, {"data": [{"query": query, "organic_results": results}]}
+
+    return 404, {"error": True, "errorMessage": f"Unknown endpoint {path}"}
+
+
+def _apollo_person(rng, domain, index):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return {
+        "id": f"apl{_slug(domain)}{index}",
+        "first_name": first,
+        "last_name_obfuscated": last[0] + "***",
+        "title": TITLES[index % len(TITLES)],
+        "headline": f"{TITLES[index % len(TITLES)]} at {domain}",
+        "organization": {
+            "name": domain.split(".")[0].title(), "website_url": f"https://{domain}",
+            "linkedin_url": f"https://www.linkedin.com/company/{domain.split('.')[0]}",
+            "estimated_num_employees": rng.randint(5, 250), "industry": "Automotive",
+            "annual_revenue_printed": f"{rng.randint(1, 40)}M", "city": "Silverstone", "country": "United Kingdom",
+        },
+    }
+
+
+def _apollo(server, method, path, params, body, headers):
+    if not headers.get("X-Api-Key") and not (body or {}).get("api_key"):
+        return 401, {"error": "Invalid access credentials."}
+    if path == "/api/v1/mixed_people/api_search":
+        domain = (body.get("q_organization_domains_list") or [""])[0]
+        rng = _rng("apollo", domain)
+        count = rng.randint(0, 6) if body.get("person_seniorities") else rng.randint(1, 6)
+        people = [_apollo_person(_rng("apollo", domain, i), domain, i) for i in range(count)]
+        return 200, {"people": people[:int(body.get("per_page", 10))], "pagination": {"total_entries": count}}
+    if path == "/v1/people/match":
+        person_id = body.get("id", "")
+        rng = _rng("apollo-match", person_id or body.get("first_name"))
+        domain = body.get("organization_domain") or "example.co.uk"
+        person = _apollo_person(rng, domain, 0)
+        person.update({
+            "id": person_id or person["id"],
+            "last_name": rng.choice(LAST_NAMES),
+            "email": f"{person['first_name'].lower()}@{domain}",
+            "linkedin_url": f"https://www.linkedin.com/in/{person['first_name'].lower()}-{rng.randint(100, 999)}",
+            "phone_numbers": [{"sanitized_number": f"+4477{rng.randint(10000000, 99999999)}"}],
+        })
+        return 200, {"person": person}
+    return 404, {"error": f"Unknown endpoint {path}"}
+
+
+def _places(server, method, path, params, body, headers):
+    if not headers.get("X-Goog-Api-Key"):
+        return 403, {"error": {"code": 403, "message": "API key required"}}
+    if path != "/v1/places:searchText":
+        return 404, {"error": {"code": 404, "message": f"Unknown endpoint {path}"}}
+
+    page_token = body.get("pageToken")
+    if page_token:
+        query, page = server.places_tokens.get(page_token, (None, None))
+        if query is None:
+            return 400, {"error": {"code": 400, "message": "Invalid page token"}}
+    else:
+        query, page = body.get("textQuery", ""), 0
+    size = min(int(body.get("maxResultCount", PLACES_PAGE_SIZE)), PLACES_PAGE_SIZE)
+
+    places = []
+    for i in range(page * size, (page + 1) * size):
+        b = _business(_rng("places", query, i), query, i)
+        places.append({
+            "displayName": {"text": b["name"], "languageCode": "en"},
+            "formattedAddress": f"{i + 1} High Street, {b['town']}, UK",
+            "location": {"latitude": b["lat"], "longitude": b["lon"]},
+            "rating": b["rating"], "businessStatus": "OPERATIONAL", "websiteUri": f"https://{b['domain']}",
+        })
+    result = {"places": places}
+    if page + 1 < PLACES_MAX_PAGES:
+        token = hashlib.sha1(f"{query}|{page + 1}".encode()).hexdigest()
+        server.places_tokens[token] = (query, page + 1)
+        result["nextPageToken"] = token
+    return 200, result
+
+
+def _google_maps(server, method, path, params, body, headers):
+    if path != "/maps/api/place/nearbysearch/json":
+        return 404, {"status": "NOT_FOUND"}
+    if not params.get("key"):
+        return 200, {"status": "REQUEST_DENIED", "error_message": "You must use an API key."}
+    keyword = params.get("keyword", [""])[0]
+    location = params.get("location", ["52.088,-1.025"])[0]
+    results = []
+    for i in range(PLACES_PAGE_SIZE):
+        b = _business(_rng("nearby", keyword, location, i), keyword, i)
+        results.append({
+            "name": b["name"], "vicinity": f"{i + 1} High Street, {b['town']}", "rating": b["rating"],
+            "geometry": {"location": {"lat": b["lat"], "lng": b["lon"]}},
+        })
+    return 200, {"status": "OK", "results": results}
+
+
+def _companies_house(server, method, path, params, body, headers):
+    if not headers.get("Authorization", "").startswith("Basic "):
+        return 401, {"errors": [{"error": "invalid-authorization-header"}]}
+    if path == "/search/companies":
+        query = params.get("q", [""])[0]
+        rng = _rng("ch", query)
+        items = []
+        for i in range(min(int(params.get("items_per_page", [5])[0]), rng.randint(0, 5))):
+            items.append({
+                "title": f"{query.upper()} {'LIMITED' if i == 0 else f'HOLDINGS {i} LTD'}",
+                "company_number": f"{rng.randint(1000000, 9999999):08d}",
+                "company_status": "active" if rng.random() > 0.2 else "dissolved",
+            })
+        return 200, {"items": items, "total_results": len(items)}
+
+    m = re.match(r"^/company/([^/]+)(/officers|/persons-with-significant-control)?$", path)
+    if not m:
+        return 404, {"errors": [{"error": "not-found"}]}
+    number, sub = m.groups()
+    rng = _rng("ch-company", number)
+    if not sub:
+        return 200, {
+            "company_number": number, "sic_codes": [str(rng.choice([45112, 49410, 25620, 46719]))],
+            "registered_office_address": {
+                "address_line_1": f"{rng.randint(1, 200)} Station Road", "locality": rng.choice(TOWNS)[0],
+                "postal_code": f"NN{rng.randint(1, 18)} {rng.randint(1, 9)}AB",
+            },
+        }
+    people = []
+    for i in range(rng.randint(1, 4)):
+        name = f"{rng.choice(LAST_NAMES).upper()}, {rng.choice(FIRST_NAMES)}"
+        if sub == "/officers":
+            people.append({
+                "name": name, "officer_role": "secretary" if i == 3 else "director",
+                "appointed_on": f"20{rng.randint(0, 23):02d}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+                **({"resigned_on": "2023-01-01"} if i == 2 else {}),
+            })
+        else:
+            people.append({
+                "name": f"Mr {name.split(', ')[1]} {name.split(', ')[0].title()}",
+                "kind": "individual-person-with-significant-control",
+                "natures_of_control": ["ownership-of-shares-75-to-100-percent"],
+            })
+    return 200, {"items": people}
+
+
+HANDLERS = {
+    "airtable": _airtable,
+    "outscraper": _outscraper,
+    "apollo": _apollo,
+    "places": _places,
+    "google_maps": _google_maps,
+    "companies_house": _companies_house,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _dispatch(self):
+        parsed = urlparse(self.path)
+        provider, _, rest = parsed.path.lstrip("/").partition("/")
+        handler = HANDLERS.get(provider)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if handler is None:
+            return self._send(404, {"error": f"Unknown provider '{provider}'"})
+
+        limits = self.server.limits[provider]
+        failure = limits.check()
+        self.server.counts[provider] += 1
+        if failure == 429:
+            return self._send(429, {"error": {"type": "RATE_LIMIT_REACHED"}}, {"Retry-After": "1"})
+        if failure:
+            return self._send(failure, {"error": {"type": "SERVER_ERROR", "message": "Injected failure"}})
+
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            return self._send(400, {"error": "Invalid JSON body"})
+        params = parse_qs(parsed.query, keep_blank_values=True)
+        try:
+            status, payload = handler(self.server, self.command, "/" + rest, params, body, self.headers)
+        except Exception as e:
+            status, payload = 500, {"error": {"type": "STANDIN_ERROR", "message": str(e)}}
+        self._send(status, payload)
+
+    def _send(self, status, payload, extra_headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+
+class StandinServer:
+    """
+    Runs every provider stand-in on one local port in a background thread.
+    latency / jitter (seconds), error_rate (0-1) and rate_limit (requests per
+    second) apply to every provider unless overridden per provider, e.g.
+    StandinServer(latency=0.05, overrides={"airtable": {"rate_limit": 5}}).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit=None, overrides=None, verbose=False, seed=0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.verbose = verbose
+        self.httpd.airtable = AirtableStore()
+        self.httpd.outscraper_results = {}
+        self.httpd.places_tokens = {}
+        self.httpd.request_ids = itertools.count(1)
+        self.httpd.counts = {name: 0 for name in HANDLERS}
+        self.httpd.limits = {}
+        for index, name in enumerate(HANDLERS):
+            settings = {"latency": latency, "jitter": jitter, "error_rate": error_rate, "rate_limit": rate_limit}
+            settings.update((overrides or {}).get(name, {}))
+            self.httpd.limits[name] = ProviderLimits(seed=seed + index, **settings)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def airtable(self):
+        return self.httpd.airtable
+
+    @property
+    def counts(self):
+        return self.httpd.counts
+
+    def base_urls(self):
+        return {name: f"{self.url}/{name}" for name in DEFAULT_BASE_URLS}
+
+    def export_env(self):
+        """Points provider_urls at this server for the current process."""
+        for name, url in self.base_urls().items():
+            os.environ[f"SF_{name.upper()}_BASE_URL"] = url
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests per second per provider")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = StandinServer(args.host, args.port, args.latency_ms / 1000, args.jitter_ms / 1000,
+                           args.error_rate, args.rate_limit, verbose=args.verbose)
+    print(f"Stand-in providers listening on {server.url}\n")
+    for name, url in server.base_urls().items():
+        print(f"export SF_{name.upper()}_BASE_URL={url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,219 @@
+"""
+Typeform survey ingestion (Social Media Audit and "I'm a Product" exports).
+
+A responses-*.csv export holds one row per rider. SurveyExport parses the
+whole file once: follower counts are coerced to numbers column by column
+("1,057", "22k", "925 friends", "O" for zero...), answers like "NA" or "Not
+old enough" become blanks with a reason, offer lists are split into items,
+and each row gets a name and email key so it can be matched to a user.
+Parsed exports are cached by file hash, so a cohort file is read once and
+per-rider lookups are dictionary hits.
+"""
+import hashlib
+import io
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+FOLLOWER_COLUMN = re.compile(r"number of followers on (.+?)\s*\?", re.IGNORECASE)
+OFFER_COLUMN = "list 10 things"
+
+# A count: digits (with an optional decimal part) and an optional k/m suffix
+COUNT = r"(?<![\w.])(\d+(?:\.\d+)?)\s*([km])?(?!\w)"
+MULTIPLIERS = {"k": 1_000, "m": 1_000_000}
+
+# Answers that mean "no answer" rather than zero
+NA_ANSWERS = {"", "na", "n/a", "nan", "none", "-", "--"}
+INELIGIBLE = "not old enough"
+
+# Item separators in free-text lists: numbering ("1. ...  2) ...") or line breaks
+LIST_ITEM = r"(?:^|\s)\d{1,2}[.)]\s+|\s*\n\s*"
+
+PARSE_CACHE_SIZE = 16
+
+_parse_cache = OrderedDict()  # sha256 of file bytes -> SurveyExport
+_parse_lock = threading.Lock()
+
+
+def parse_counts(values):
+    """
+    Follower counts for a Series of free-text answers.
+    Returns (counts, status): counts is float (NaN when there is no number);
+    status is "count", "blank", "ineligible" or "other" (e.g. "I don't have it").
+    """
+    text = values.astype("string").fillna("").str.strip().str.lower()
+    text = text.str.replace(",", "", regex=False).mask(text == "o", "0")  # "O" typed for zero
+    parts = text.str.extract(COUNT)
+    counts = pd.to_numeric(parts[0], errors="coerce").astype(float)
+    counts = counts * parts[1].map(MULTIPLIERS).fillna(1).astype(float)
+
+    status = np.select(
+        [counts.notna().to_numpy(), text.isin(NA_ANSWERS).to_numpy(),
+         text.str.contains(INELIGIBLE, regex=False).to_numpy()],
+        ["count", "blank", "ineligible"], default="other")
+    return counts, pd.Series(status, index=values.index)
+
+
+def _plain(series):
+    """Lowercase, accent-free, single-spaced keys (for name/email matching)."""
+    text = series.astype("string").fillna("").str.normalize("NFKD")
+    text = text.str.encode("ascii", "ignore").str.decode("ascii")
+    text = text.str.replace(r"\(.*?\)", " ", regex=True)  # "Olivier Tabone (v2)"
+    return text.str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def _plain_one(value):
+    """_plain for a single value (lookups)."""
+    text = unicodedata.normalize("NFKD", str(value or "")).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"\(.*?\)", " ", text).lower().split())
+
+
+def _column(columns, *names):
+    for col in columns:
+        if str(col).strip().lower() in names:
+            return col
+    return None
+
+
+class SurveyExport:
+    """
+    One parsed Typeform export.
+
+    followers: DataFrame of follower counts, one float column per platform
+    (NaN where there was no number); follower_status holds the reason.
+    offers: Series of offer lists (first items from each "List 10 things"
+    question). Rows keep the export's order; lookups return the latest
+    submission for a rider.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        columns = list(df.columns)
+
+        self.platforms = {}
+        for col in columns:
+            match = FOLLOWER_COLUMN.search(str(col))
+            if match:
+                self.platforms[match.group(1).strip()] = col
+        self.offer_columns = [c for c in columns if OFFER_COLUMN in str(c).lower()]
+
+        counts, statuses = {}, {}
+        for platform, col in self.platforms.items():
+            counts[platform], statuses[platform] = parse_counts(df[col])
+        self.followers = pd.DataFrame(counts, index=df.index)
+        self.follower_status = pd.DataFrame(statuses, index=df.index)
+        self.total_followers = self.followers.sum(axis=1, min_count=1).fillna(0).astype(int)
+        self.offers = self._parse_offers()
+
+        # Rider keys
+        name_col = _column(columns, "name", "full name", "your name")
+        first_col = _column(columns, "first name")
+        last_col = _column(columns, "last name")
+        email_col = _column(columns, "email", "email address", "your email")
+        if name_col is not None:
+            names = df[name_col].astype("string").fillna("")
+        elif first_col is not None:
+            last = df[last_col].astype("string").fillna("") if last_col is not None else ""
+            names = (df[first_col].astype("string").fillna("") + " " + last)
+        else:
+            names = pd.Series("", index=df.index, dtype="string")
+        self.names = names.str.strip()
+        self.emails = df[email_col].astype("string").fillna("").str.strip() if email_col is not None \
+            else pd.Series("", index=df.index, dtype="string")
+
+        # Latest submission wins: walk rows oldest first so newer ones overwrite
+        order = df.index
+        submitted = _column(columns, "submit date (utc)")
+        if submitted is not None:
+            order = pd.to_datetime(df[submitted], errors="coerce").sort_values(na_position="first").index
+        self._by_name = {}
+        self._by_email = {}
+        name_keys, email_keys = _plain(self.names), _plain(self.emails)
+        for idx in order:
+            if name_keys[idx]:
+                self._by_name[name_keys[idx]] = idx
+            if email_keys[idx]:
+                self._by_email[email_keys[idx]] = idx
+
+    def _parse_offers(self):
+        if not self.offer_columns:
+            return pd.Series([[] for _ in range(len(self.df))], index=self.df.index, dtype=object)
+        per_column = []
+        for col in self.offer_columns:
+            items = self.df[col].astype("string").fillna("").str.split(LIST_ITEM, regex=True)
+            per_column.append(items.map(lambda xs: [x.strip().rstrip(".").strip() for x in xs if len(x.strip()) > 5]))
+        # First three from each question, in question order
+        return pd.Series([sum((items[:3] for items in row), []) for row in zip(*per_column)],
+                         index=self.df.index, dtype=object)
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def kind(self):
+        if self.platforms:
+            return "audit"
+        if self.offer_columns:
+            return "product"
+        return "unknown"
+
+    def find(self, name=None, email=None):
+        """Row label of a rider's latest response, by email then name (None if absent)."""
+        if email:
+            idx = self._by_email.get(_plain_one(email))
+            if idx is not None:
+                return idx
+        if name:
+            return self._by_name.get(_plain_one(name))
+        return None
+
+    def audit_stats(self, idx):
+        """(total followers, "Platform: n, ..." breakdown) for one row."""
+        counts = self.followers.loc[idx].dropna()
+        breakdown = ", ".join(f"{platform}: {int(n)}" for platform, n in counts.items())
+        return int(self.total_followers.loc[idx]), breakdown
+
+    def product_offers(self, idx, limit=5):
+        return "; ".join(self.offers.loc[idx][:limit])
+
+    def summary(self):
+        """One row per response: rider, email, total followers and each platform."""
+        out = pd.DataFrame({"Rider": self.names, "Email": self.emails}, index=self.df.index)
+        if self.platforms:
+            out["Total Followers"] = self.total_followers
+            out = out.join(self.followers.astype("Int64"))
+        if self.offer_columns:
+            out["Offers"] = self.offers.map(lambda xs: "; ".join(xs[:5]))
+        return out
+
+    def match_users(self, users):
+        """
+        Maps users to their responses: users is an iterable of dicts with
+        id, email and name. Returns {user id: row label} for those found.
+        """
+        matched = {}
+        for user in users:
+            idx = self.find(name=user.get("name"), email=user.get("email"))
+            if idx is not None:
+                matched[user.get("id")] = idx
+        return matched
+
+
+def load_export(data):
+    """SurveyExport for CSV bytes, parsed once per distinct file (cached by SHA-256)."""
+    key = hashlib.sha256(data).hexdigest()
+    with _parse_lock:
+        hit = _parse_cache.get(key)
+        if hit is not None:
+            _parse_cache.move_to_end(key)
+            return hit
+    export = SurveyExport(pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False))
+    with _parse_lock:
+        _parse_cache[key] = export
+        while len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return export
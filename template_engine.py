@@ -0,0 +1,200 @@
+"""
+Mail-merge engine for the outreach templates.
+
+Each template is parsed once into literal text and [Placeholder] slots.
+MailMerge then binds the sender-level values (rider, championship, greeting,
+representative wording...) into that, leaving only the per-lead slots, so
+rendering a lead is a single join. Rendered messages are cached by a hash of
+their inputs, and whole campaigns can be streamed out as .eml files (zipped)
+or a single mbox.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from email.generator import BytesGenerator
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from functools import lru_cache
+
+PLACEHOLDER = re.compile(r"\[([A-Za-z][^\[\]\n]*)\]")
+
+# Same slot, two spellings
+ALIASES = {"Contact Name/Business Name": "Contact Name"}
+
+# Templates are written with a morning greeting; it becomes a slot
+GREETING = "Good morning"
+
+# The first [Rider Name] is the full name, later ones use RIDER_FIRST
+RIDER_NAME = "Rider Name"
+RIDER_FIRST = "Rider First"
+
+RENDER_CACHE_SIZE = 4096
+
+_render_cache = OrderedDict()  # (merge key, lead inputs) -> rendered message
+_render_lock = threading.Lock()
+
+
+class Slot(str):
+    """A placeholder in a compiled template (a plain str is literal text)."""
+    __slots__ = ()
+
+
+@lru_cache(maxsize=256)
+def compile_template(text):
+    """Parses template text into a tuple of literal strings and Slots."""
+    segments = []
+    seen_rider = False
+    pos = 0
+    for match in PLACEHOLDER.finditer(text):
+        segments.extend(_split_greeting(text[pos:match.start()]))
+        name = ALIASES.get(match.group(1), match.group(1))
+        if name == RIDER_NAME:
+            name = RIDER_FIRST if seen_rider else RIDER_NAME
+            seen_rider = True
+        segments.append(Slot(name))
+        pos = match.end()
+    segments.extend(_split_greeting(text[pos:]))
+    return tuple(s for s in segments if s != "")
+
+
+def _split_greeting(literal):
+    parts = literal.split(GREETING)
+    out = [parts[0]]
+    for part in parts[1:]:
+        out.extend([Slot("Greeting"), part])
+    return out
+
+
+def _fill(segments, values):
+    """Replaces the slots found in values; keeps the rest as Slots and merges literals."""
+    out = []
+    for seg in segments:
+        if isinstance(seg, Slot):
+            if seg not in values:
+                out.append(seg)
+                continue
+            seg = str(values[seg])
+        if out and not isinstance(out[-1], Slot):
+            out[-1] += seg
+        else:
+            out.append(seg)
+    return out
+
+
+@lru_cache(maxsize=256)
+def _bind(text, values, replacements, signature):
+    segments = _fill(compile_template(text), dict(values))
+    for i, seg in enumerate(segments):
+        if isinstance(seg, Slot):
+            continue
+        for old, new in replacements:
+            seg = seg.replace(old, new)
+        segments[i] = seg
+    # Signature: swap the name at the very end of the message
+    if signature and signature[0] and segments and not isinstance(segments[-1], Slot):
+        old, new = signature
+        if segments[-1].rstrip().endswith(old):
+            segments[-1] = new.join(segments[-1].rsplit(old, 1))
+    return tuple(segments)
+
+
+def _freeze(mapping):
+    return tuple(sorted((str(k), str(v)) for k, v in (mapping or {}).items()))
+
+
+def _digest(*parts):
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+class MailMerge:
+    """
+    One template bound to one sender's values, ready to render many leads.
+
+    values: sender-level slot values ({"Rider Name": ..., "Greeting": ...}).
+    replacements: (old, new) phrase swaps applied to the template text
+    around the lead slots (e.g. first person -> representative wording).
+    signature: optional (old, new) swap for a name the message ends with.
+    lead_slots: callable mapping one lead to its slot values; only called
+    when the lead's message isn't cached yet.
+    """
+
+    def __init__(self, template, values=None, replacements=(), signature=None, lead_slots=None, name=""):
+        frozen = _freeze(values)
+        replacements = tuple(tuple(r) for r in replacements)
+        signature = tuple(signature) if signature else None
+        self.segments = _bind(template, frozen, replacements, signature)
+        self.lead_slots = lead_slots or (lambda lead: lead)
+        self.key = _digest(name, template, frozen, replacements, signature)
+
+    def fill(self, slots):
+        """Renders from already-computed slot values (no caching)."""
+        parts = []
+        for seg in self.segments:
+            if isinstance(seg, Slot):
+                # Unfilled placeholders stay visible, as before
+                seg = str(slots[seg]) if seg in slots else f"[{seg}]"
+            parts.append(seg)
+        return "".join(parts)
+
+    def render(self, lead):
+        try:
+            key = (self.key, lead)
+            hash(key)
+        except TypeError:  # e.g. a dict lead
+            key = _digest(self.key, lead)
+        with _render_lock:
+            hit = _render_cache.get(key)
+            if hit is not None:
+                _render_cache.move_to_end(key)
+                return hit
+        message = self.fill(self.lead_slots(lead))
+        with _render_lock:
+            _render_cache[key] = message
+            while len(_render_cache) > RENDER_CACHE_SIZE:
+                _render_cache.popitem(last=False)
+        return message
+
+    def render_batch(self, leads):
+        """Renders every lead in one pass; returns the messages in order."""
+        return [self.render(lead) for lead in leads]
+
+
+# --- CAMPAIGN EXPORT ---
+def build_email(from_addr, to_addr, subject, body):
+    msg = EmailMessage()
+    msg["From"] = from_addr or ""
+    msg["To"] = to_addr
+    msg["Subject"] = subject
+    msg["Date"] = formatdate(localtime=True)
+    msg["Message-ID"] = make_msgid()
+    msg["X-Unsent"] = "1"  # Outlook / Apple Mail open it as a draft
+    msg.set_content(body)
+    return msg
+
+
+def _eml_name(index, msg):
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", str(msg["To"]).split("@")[0]).strip("-") or "message"
+    return f"{index:04d}-{slug[:40]}.eml"
+
+
+def write_eml_zip(messages, fileobj):
+    """Streams EmailMessages into a zip of .eml files, one message at a time. Returns the count."""
+    count = 0
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as zf:
+        for count, msg in enumerate(messages, 1):
+            zf.writestr(_eml_name(count, msg), msg.as_bytes())
+    return count
+
+
+def write_mbox(messages, fileobj):
+    """Streams EmailMessages into one mbox file (binary file object). Returns the count."""
+    count = 0
+    for count, msg in enumerate(messages, 1):
+        fileobj.write(f"From MAILER-DAEMON {time.asctime()}\n".encode())
+        BytesGenerator(fileobj, mangle_from_=True).flatten(msg)
+        fileobj.write(b"\n")
+    return count
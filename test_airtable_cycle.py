@@ -4,6 +4,8 @@ import json
 import os
 from datetime import datetime
 
+from provider_urls import base_url
+
 SECRETS_PATH = ".streamlit/secrets.toml"
 
 # Mock the AirtableManager logic with the mapping we just deployed
@@ -38,7 +40,7 @@ def test_cycle():
         "Content-Type": "application/json"
     }
 
-    url = f"https://api.airtable.com/v0/{base_id}/{table_name}"
+    url = f"{base_url('airtable')}/v0/{base_id}/{table_name}"
 
     # 1. ADD SCRIPT
     test_user_email = "test@example.com"